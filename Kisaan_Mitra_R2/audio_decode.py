@@ -0,0 +1,186 @@
+# audio_decode.py
+"""
+In-process decoding of the audio formats we receive, to 16 kHz float32
+
+- WAV parsed directly: PCM 8/16/24/32-bit, float, G.711 μ-law / A-law
+  (Twilio recordings and Media Streams are 8 kHz μ-law or PCM)
+- raw μ-law frames (Media Streams payloads)
+- OGG/Opus (WhatsApp voice notes) and other containers via libsndfile
+  (soundfile); ffmpeg over pipes only as a last resort
+
+Resampling is polyphase FIR filtering (scipy.signal.resample_poly), so
+8 kHz -> 16 kHz is a single vectorized upsample-by-2.
+"""
+import io
+import struct
+import subprocess
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+from scipy.signal import resample_poly
+
+TARGET_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_FLOAT = 0x0003
+WAVE_FORMAT_ALAW = 0x0006
+WAVE_FORMAT_MULAW = 0x0007
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _mulaw_table() -> np.ndarray:
+    """G.711 μ-law code -> float sample"""
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = ((((u & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return (np.where(u & 0x80, -magnitude, magnitude) / 32768.0).astype(np.float32)
+
+
+def _alaw_table() -> np.ndarray:
+    """G.711 A-law code -> float sample"""
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (a >> 4) & 0x07
+    mantissa = a & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0)
+    )
+    return (np.where(a & 0x80, magnitude, -magnitude) / 32768.0).astype(np.float32)
+
+
+MULAW_TABLE = _mulaw_table()
+ALAW_TABLE = _alaw_table()
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = TARGET_RATE) -> np.ndarray:
+    """Polyphase resampling of a mono float signal"""
+    if rate == target_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    divisor = gcd(rate, target_rate)
+    return resample_poly(samples, target_rate // divisor, rate // divisor).astype(np.float32)
+
+
+def decode_mulaw(data: bytes, rate: int = 8000, target_rate: int = TARGET_RATE) -> np.ndarray:
+    """Raw μ-law bytes -> float32 at target_rate"""
+    return resample(MULAW_TABLE[np.frombuffer(data, dtype=np.uint8)], rate, target_rate)
+
+
+def encode_mulaw(samples: np.ndarray) -> bytes:
+    """Float samples in [-1, 1] -> G.711 μ-law bytes (same rate)"""
+    pcm = np.clip(np.asarray(samples, dtype=np.float32) * 32768.0, -32768, 32767).astype(np.int32) >> 2
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), 8158) + 33
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    mantissa = (magnitude >> (exponent + 1)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def read_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Parse a RIFF/WAVE file
+
+    Returns:
+        (float32 samples shaped (frames, channels), sample rate)
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a WAV file")
+
+    fmt, payload = None, None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = data[offset:offset + 4], struct.unpack_from("<I", data, offset + 4)[0]
+        body = data[offset + 8:offset + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = body
+        elif chunk_id == b"data":
+            payload = body
+            if fmt is not None:
+                break
+        offset += 8 + size + (size & 1)
+
+    if fmt is None or payload is None:
+        raise ValueError("WAV file without fmt/data chunk")
+
+    format_tag, channels, rate = struct.unpack_from("<HHI", fmt, 0)
+    bits = struct.unpack_from("<H", fmt, 14)[0]
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack_from("<H", fmt, 24)[0]
+
+    width = max(1, bits // 8)
+    frames = len(payload) // (width * channels)
+    payload = payload[:frames * width * channels]
+
+    if format_tag == WAVE_FORMAT_MULAW:
+        samples = MULAW_TABLE[np.frombuffer(payload, dtype=np.uint8)]
+    elif format_tag == WAVE_FORMAT_ALAW:
+        samples = ALAW_TABLE[np.frombuffer(payload, dtype=np.uint8)]
+    elif format_tag == WAVE_FORMAT_FLOAT:
+        samples = np.frombuffer(payload, dtype="<f4" if width == 4 else "<f8").astype(np.float32)
+    elif format_tag == WAVE_FORMAT_PCM:
+        if width == 1:
+            samples = (np.frombuffer(payload, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+        elif width == 2:
+            samples = np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32768.0
+        elif width == 3:
+            raw = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+            samples = (np.where(values & 0x800000, values - 0x1000000, values) / 8388608.0).astype(np.float32)
+        elif width == 4:
+            samples = (np.frombuffer(payload, dtype="<i4") / 2147483648.0).astype(np.float32)
+        else:
+            raise ValueError(f"unsupported PCM width {bits} bits")
+    else:
+        raise ValueError(f"unsupported WAV format 0x{format_tag:04x}")
+
+    return samples.reshape(-1, channels), rate
+
+
+def _read_soundfile(data: bytes) -> Tuple[np.ndarray, int]:
+    import soundfile
+
+    samples, rate = soundfile.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return samples, rate
+
+
+def _read_ffmpeg(data: bytes) -> np.ndarray:
+    """Decode anything ffmpeg understands over pipes (no temp files)"""
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+        input=data, capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype="<f4").copy()
+
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    return samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1)
+
+
+def decode_audio(data: bytes, target_rate: int = TARGET_RATE) -> np.ndarray:
+    """
+    Encoded audio bytes -> mono float32 at target_rate
+
+    Raises:
+        ValueError: if no decoder can read the data
+    """
+    if data[:4] == b"RIFF":
+        samples, rate = read_wav(data)
+        return resample(to_mono(samples), rate, target_rate)
+
+    try:
+        samples, rate = _read_soundfile(data)
+        return resample(to_mono(samples), rate, target_rate)
+    except Exception as e:
+        soundfile_error = e
+
+    try:
+        samples = _read_ffmpeg(data)
+        return resample(samples, TARGET_RATE, target_rate)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ValueError(f"cannot decode audio ({soundfile_error}; ffmpeg: {e})") from e
+
+
+def decode_audio_file(path: str, target_rate: int = TARGET_RATE) -> np.ndarray:
+    with open(path, "rb") as f:
+        return decode_audio(f.read(), target_rate)
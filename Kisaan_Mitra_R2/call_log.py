@@ -0,0 +1,240 @@
+# call_log.py
+"""
+Call-log sink for the IVR: non-blocking, batched, queryable
+
+record() only puts the entry on an in-memory queue, so logging adds no
+I/O to the call path. A writer thread drains the queue into SQLite (WAL
+mode), one transaction per batch; close() - app shutdown, or exit -
+writes whatever is still queued and checkpoints the WAL.
+
+Tables:
+    calls          one row per log entry (answer given, or form choice)
+    call_schemes   one row per scheme in an entry, for offered vs accepted
+
+Environment:
+    KM_CALL_LOG_DB         database file (default call_logs/calls.db)
+    KM_CALL_LOG_BATCH      max entries per transaction (default 500)
+    KM_CALL_LOG_FLUSH_MS   longest wait before a partial batch is written (default 1000)
+    KM_CALL_LOG_QUEUE      queue bound; entries beyond it are dropped and counted (default 100000)
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    call_sid TEXT,
+    phone TEXT,
+    query TEXT,
+    intent TEXT,
+    disaster TEXT,
+    user_choice TEXT,
+    schemes TEXT
+);
+CREATE TABLE IF NOT EXISTS call_schemes (
+    call_id INTEGER NOT NULL REFERENCES calls (id),
+    day TEXT NOT NULL,
+    scheme TEXT NOT NULL,
+    user_choice TEXT
+);
+CREATE INDEX IF NOT EXISTS calls_day ON calls (day, user_choice);
+CREATE INDEX IF NOT EXISTS calls_intent ON calls (intent, day);
+CREATE INDEX IF NOT EXISTS calls_disaster ON calls (disaster, day);
+CREATE INDEX IF NOT EXISTS call_schemes_scheme ON call_schemes (day, scheme, user_choice);
+"""
+
+_STOP = object()
+
+
+class CallLogSink:
+    """
+    Args:
+        path: SQLite database file
+        batch_size: Max entries per transaction
+        flush_seconds: Longest wait before a partial batch is written
+        max_queue: Entries queued beyond this are dropped (and counted)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+        max_queue: Optional[int] = None,
+    ):
+        self.path = path or os.getenv("KM_CALL_LOG_DB", os.path.join("call_logs", "calls.db"))
+        self.batch_size = batch_size or int(os.getenv("KM_CALL_LOG_BATCH", "500"))
+        self.flush_seconds = flush_seconds or float(os.getenv("KM_CALL_LOG_FLUSH_MS", "1000")) / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue or int(os.getenv("KM_CALL_LOG_QUEUE", "100000")))
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self._closed = False
+        self._reader = threading.local()
+        self._thread = threading.Thread(target=self._write_loop, name="call-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # Writing
+
+    def record(self, entry: Dict) -> bool:
+        """Queue one entry; never blocks (returns False if it was dropped)"""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _write_loop(self):
+        db = self._connect()
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+
+            batch: List[Dict] = []
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(db, batch)
+
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.close()
+
+    def _write(self, db: sqlite3.Connection, batch: List[Dict]):
+        try:
+            with db:
+                for entry in batch:
+                    ts = entry.get("ts") or time.time()
+                    day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+                    schemes = entry.get("schemes") or []
+                    cursor = db.execute(
+                        "INSERT INTO calls (ts, day, call_sid, phone, query, intent, disaster, user_choice, schemes) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (ts, day, entry.get("call_sid"), entry.get("phone"), entry.get("query"),
+                         entry.get("intent"), entry.get("disaster"), entry.get("user_choice"),
+                         json.dumps(schemes, ensure_ascii=False))
+                    )
+                    db.executemany(
+                        "INSERT INTO call_schemes (call_id, day, scheme, user_choice) VALUES (?, ?, ?, ?)",
+                        [(cursor.lastrowid, day, str(scheme), entry.get("user_choice")) for scheme in schemes]
+                    )
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.errors += len(batch)
+            print(f"❌ Call log write failed ({len(batch)} entries lost): {e}")
+
+    def close(self, timeout: float = 10.0):
+        """Write everything queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # Reading
+
+    def _read(self) -> sqlite3.Connection:
+        db = getattr(self._reader, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10.0)
+            db.row_factory = sqlite3.Row
+            self._reader.db = db
+        return db
+
+    def _rows(self, sql: str, params: tuple) -> List[Dict]:
+        return [dict(row) for row in self._read().execute(sql, params).fetchall()]
+
+    def summary(self, days: int = 7) -> Dict:
+        """
+        Aggregates over the last `days` days
+
+        A question answered is one "pending" entry; form choices are the
+        "yes"/"no" entries for the scheme that was offered.
+        """
+        since = datetime.fromtimestamp(time.time() - max(0, days - 1) * 86400).strftime("%Y-%m-%d")
+        params = (since,)
+        return {
+            "since": since,
+            "per_day": self._rows(
+                "SELECT day, COUNT(DISTINCT call_sid) AS calls, SUM(user_choice = 'pending') AS questions, "
+                "SUM(user_choice = 'yes') AS forms_accepted, SUM(user_choice = 'no') AS forms_declined "
+                "FROM calls WHERE day >= ? GROUP BY day ORDER BY day", params
+            ),
+            "per_intent": self._rows(
+                "SELECT intent, day, COUNT(*) AS questions FROM calls "
+                "WHERE day >= ? AND user_choice = 'pending' GROUP BY intent, day ORDER BY day, questions DESC", params
+            ),
+            "per_disaster": self._rows(
+                "SELECT disaster, day, COUNT(*) AS questions FROM calls "
+                "WHERE day >= ? AND user_choice = 'pending' GROUP BY disaster, day ORDER BY day, questions DESC", params
+            ),
+            "schemes": self._rows(
+                "SELECT scheme, SUM(user_choice = 'pending') AS recommended, "
+                "SUM(user_choice IN ('yes', 'no')) AS offered, SUM(user_choice = 'yes') AS accepted "
+                "FROM call_schemes WHERE day >= ? GROUP BY scheme ORDER BY recommended DESC", params
+            ),
+            "sink": self.stats(),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "path": self.path,
+        }
+
+
+_sink: Optional[CallLogSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_call_log() -> CallLogSink:
+    """Process-wide sink, created on first use"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = CallLogSink()
+    return _sink
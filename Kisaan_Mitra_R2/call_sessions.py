@@ -0,0 +1,172 @@
+# call_sessions.py
+"""
+Per-call IVR state, keyed by CallSid
+
+What the pipeline worked out for a call (transcript, intent, ranked
+schemes, which scheme is on offer, synthesized prompts) is kept so
+follow-up turns - "send the form", "next scheme" - are answered from it
+instead of recording and running STT, retrieval and the LLM again.
+
+Sessions are plain JSON-serializable dicts:
+
+    {"call_sid", "from", "transcript", "intent", "disaster", "schemes", "offered",
+     "audio": {prompt text: audio path}, "updated_at"}
+
+Environment:
+    KM_SESSION_TTL   seconds a call is kept after its last update (default 1800)
+    KM_SESSION_DB    SQLite file shared by all workers; unset = in-process memory
+"""
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def new_session(call_sid: str) -> Dict:
+    return {
+        "call_sid": call_sid,
+        "from": None,
+        "transcript": None,
+        "intent": None,
+        "disaster": None,
+        "schemes": [],
+        "offered": 0,
+        "audio": {},
+        "updated_at": time.time(),
+    }
+
+
+def offered_scheme(session: Optional[Dict]) -> Optional[Dict]:
+    """The scheme currently offered to the caller, if any"""
+    if not session:
+        return None
+    schemes, index = session.get("schemes") or [], session.get("offered", 0)
+    return schemes[index] if index < len(schemes) else None
+
+
+class MemorySessionStore:
+    """
+    In-process sessions with a TTL (single worker)
+
+    Args:
+        ttl_seconds: Lifetime after the last save
+        max_sessions: Oldest sessions are dropped beyond this
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def get(self, call_sid: str) -> Optional[Dict]:
+        with self._lock:
+            session = self._sessions.get(call_sid)
+            if session is None:
+                return None
+            if time.time() - session["updated_at"] > self.ttl_seconds:
+                del self._sessions[call_sid]
+                return None
+            return copy.deepcopy(session)
+
+    def save(self, session: Dict):
+        session["updated_at"] = time.time()
+        with self._lock:
+            self._sessions[session["call_sid"]] = copy.deepcopy(session)
+            self._sessions.move_to_end(session["call_sid"])
+            self._expire()
+
+    def delete(self, call_sid: str):
+        with self._lock:
+            self._sessions.pop(call_sid, None)
+
+    def _expire(self):
+        """Drop expired and excess sessions, oldest first (lock held)"""
+        cutoff = time.time() - self.ttl_seconds
+        while self._sessions:
+            call_sid, session = next(iter(self._sessions.items()))
+            if session["updated_at"] >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[call_sid]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite file, so every uvicorn worker sees the same calls
+
+    Args:
+        path: Database file
+        ttl_seconds: Lifetime after the last save
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 1800):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._saves = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "call_sid TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared)"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, call_sid: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE call_sid = ? AND updated_at >= ?",
+            (call_sid, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session: Dict):
+        session["updated_at"] = time.time()
+        with self._connection() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO sessions (call_sid, data, updated_at) VALUES (?, ?, ?)",
+                (session["call_sid"], json.dumps(session, ensure_ascii=False), session["updated_at"])
+            )
+            self._saves += 1
+            if self._saves % 100 == 0:
+                db.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+
+    def delete(self, call_sid: str):
+        with self._connection() as db:
+            db.execute("DELETE FROM sessions WHERE call_sid = ?", (call_sid,))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide store, SQLite when KM_SESSION_DB is set"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                ttl = float(os.getenv("KM_SESSION_TTL", "1800"))
+                path = os.getenv("KM_SESSION_DB")
+                _store = SQLiteSessionStore(path, ttl) if path else MemorySessionStore(ttl)
+    return _store
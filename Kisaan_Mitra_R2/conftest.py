@@ -0,0 +1,18 @@
+# conftest.py
+"""
+pytest setup for the Kisaan Mitra unit tests
+
+    cd Kisaan_Mitra_R2 && python -m pytest -q
+
+The R2 modules and the shared root modules (audio_spool, response_cache,
+...) are imported the way the apps import them. test_pipeline.py and
+test_voice_query.py are manual scripts needing Whisper/Ollama, not tests.
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.dirname(HERE))
+
+collect_ignore = ["test_pipeline.py", "test_voice_query.py", "media_stream_sim.py"]
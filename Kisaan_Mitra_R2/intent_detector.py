@@ -14,3 +14,27 @@ def detect_intent(text: str) -> str:
         return "subsidy"
 
     return "general_query"
+
+
+DISASTER_KEYWORDS = {
+    "flood": ["बाढ़", "जलभराव", "flood", "waterlogging"],
+    "drought": ["सूखा", "सूखे", "पानी की कमी", "drought"],
+    "hail": ["ओलावृष्टि", "ओले", "ओला", "hail"],
+    "heavy_rain": ["भारी बारिश", "अत्यधिक बारिश", "heavy rain", "excessive rain"],
+    "frost": ["पाला", "हिमपात", "frost"],
+    "wind_damage": ["आंधी", "तूफान", "storm", "cyclone"],
+    "landslide": ["भूस्खलन", "landslide"],
+    "pest_infestation": ["कीट", "कीड़े", "pest", "insects"],
+    "disease": ["रोग", "बीमारी", "disease", "blight"],
+}
+
+
+def detect_disaster(text: str) -> str:
+    """Disaster named in the query, with the labels of the root intent detector"""
+    text = text.lower()
+
+    for disaster, keywords in DISASTER_KEYWORDS.items():
+        if any(k in text for k in keywords):
+            return disaster
+
+    return "unspecified"
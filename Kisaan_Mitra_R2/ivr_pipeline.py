@@ -0,0 +1,266 @@
+# ivr_pipeline.py
+"""
+Sentence-pipelined LLM -> TTS replies for the Twilio IVR
+
+The LLM token stream is cut at sentence boundaries and every finished
+sentence is handed to TTS straight away, so the caller hears the first
+sentence while the rest of the answer is still being generated.
+
+Twilio gets the reply in pieces: each webhook response plays whatever
+sentences are ready and <Redirect>s to a continuation webhook, which
+waits for the next ones. Replies live in this process's memory, so the
+continuation webhooks must reach the worker that started the reply
+(see lock_single_worker).
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Sentence ends: Devanagari danda (unambiguous), or . ! ? followed by space
+_BOUNDARY = re.compile(r"[।॥]+\s*|[.!?]+[\"')\]]*\s+|\n+")
+
+
+def _find_cut(buffer: str, min_chars: int, max_chars: int) -> Optional[int]:
+    """Index to cut the buffer at, or None to keep waiting for tokens"""
+    for match in _BOUNDARY.finditer(buffer):
+        if len(buffer[:match.end()].strip()) >= min_chars:
+            return match.end()
+
+    # No sentence end in a long run of text: cut at the last comma/space
+    if len(buffer) > max_chars:
+        space = max(buffer.rfind(", ", 0, max_chars), buffer.rfind(" ", 0, max_chars))
+        return space + 1 if space > 0 else max_chars
+    return None
+
+
+async def sentences(
+    tokens: AsyncIterator[str],
+    min_chars: int = 12,
+    max_chars: int = 240
+) -> AsyncIterator[str]:
+    """
+    Group a token stream into sentences
+
+    Args:
+        tokens: LLM token stream
+        min_chars: Shorter fragments are merged into the next sentence
+        max_chars: Longer runs without punctuation are cut at a space
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        while True:
+            cut = _find_cut(buffer, min_chars, max_chars)
+            if cut is None:
+                break
+            sentence, buffer = buffer[:cut].strip(), buffer[cut:]
+            if sentence:
+                yield sentence
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class SpokenReply:
+    """
+    One streamed IVR reply
+
+    Sentences are queued in order as TTS tasks; consumers take the
+    segments ({"text", "audio_path"}) that are ready.
+
+    Args:
+        tokens: LLM token stream
+        synthesize: async text -> audio path (None plays text with <Say>)
+        context: Call data needed when the reply finishes (schemes, ...)
+    """
+
+    def __init__(
+        self,
+        tokens: AsyncIterator[str],
+        synthesize: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+        context: Optional[Dict] = None,
+    ):
+        self.synthesize = synthesize
+        self.context = context or {}
+        self.created_at = time.monotonic()
+        self.text_parts: List[str] = []
+        self.first_sentence_seconds: Optional[float] = None
+        self.finished = False
+
+        # Segment tasks in sentence order, not yet handed out
+        self._pending: Deque[asyncio.Task] = deque()
+        # Side work started for this reply (e.g. form offer TTS)
+        self._tasks: Set[asyncio.Task] = set()
+        self._generated = False
+        self._new_segment = asyncio.Event()
+        self._task = asyncio.create_task(self._run(tokens))
+
+    async def _run(self, tokens: AsyncIterator[str]):
+        try:
+            async for sentence in sentences(tokens):
+                if self.first_sentence_seconds is None:
+                    self.first_sentence_seconds = time.monotonic() - self.created_at
+                    print(f"🗣️ First sentence after {self.first_sentence_seconds:.2f}s")
+                self.text_parts.append(sentence)
+                self._pending.append(asyncio.create_task(self._segment(sentence)))
+                self._new_segment.set()
+        except Exception as e:
+            print(f"❌ Reply pipeline error: {e}")
+        finally:
+            self._generated = True
+            self._new_segment.set()
+
+    async def _segment(self, text: str) -> Dict:
+        audio_path = None
+        if self.synthesize is not None:
+            try:
+                audio_path = await self.synthesize(text)
+            except Exception as e:
+                print(f"❌ TTS error, falling back to <Say>: {e}")
+        return {"text": text, "audio_path": audio_path}
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.text_parts)
+
+    async def next_segments(self, timeout: float) -> Tuple[List[Dict], bool]:
+        """
+        Segments ready within `timeout`
+
+        Waits for the next segment, then also takes every following one
+        that is already synthesized.
+
+        Returns:
+            (segments, finished) - segments may be empty on timeout
+        """
+        segments: List[Dict] = []
+        deadline = time.monotonic() + timeout
+        try:
+            while not self.finished:
+                remaining = max(0.0, deadline - time.monotonic())
+                if not self._pending:
+                    if self._generated:
+                        self.finished = True
+                    elif segments:
+                        break
+                    else:
+                        self._new_segment.clear()
+                        await asyncio.wait_for(self._new_segment.wait(), remaining)
+                    continue
+
+                head = self._pending[0]
+                if segments and not head.done():
+                    break
+                segments.append(await asyncio.wait_for(asyncio.shield(head), remaining))
+                self._pending.popleft()
+        except asyncio.TimeoutError:
+            pass
+        return segments, self.finished
+
+    def track(self, task: asyncio.Task) -> asyncio.Task:
+        """Keep a reference to side work, cancelled if the reply is abandoned"""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @property
+    def tracked(self) -> Set[asyncio.Task]:
+        return set(self._tasks)
+
+    def cancel(self, tracked: bool = True):
+        """Stop generation and TTS; tracked side work too unless `tracked` is False"""
+        self._task.cancel()
+        for task in self._pending:
+            task.cancel()
+        self._pending.clear()
+        if tracked:
+            for task in list(self._tasks):
+                task.cancel()
+            self._tasks.clear()
+
+
+class ReplyRegistry:
+    """Replies in progress, by CallSid (abandoned ones expire)"""
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._replies: Dict[str, SpokenReply] = {}
+        # Side work of completed replies, still running
+        self._side_tasks: Set[asyncio.Task] = set()
+
+    def start(self, call_sid: str, tokens: AsyncIterator[str], synthesize=None, context: Optional[Dict] = None) -> SpokenReply:
+        self._expire()
+        previous = self._replies.pop(call_sid, None)
+        if previous is not None:
+            previous.cancel()
+        reply = SpokenReply(tokens, synthesize, context)
+        self._replies[call_sid] = reply
+        return reply
+
+    def get(self, call_sid: str) -> Optional[SpokenReply]:
+        return self._replies.get(call_sid)
+
+    def finish(self, call_sid: str, abandon: bool = False):
+        """
+        Drop a reply
+
+        A completed reply's tracked side work (e.g. form offer TTS) runs
+        on; an abandoned one's (expired, replaced, given up) is cancelled.
+        """
+        reply = self._replies.pop(call_sid, None)
+        if reply is None:
+            return
+        if not abandon:
+            for task in reply.tracked:
+                self._side_tasks.add(task)
+                task.add_done_callback(self._side_tasks.discard)
+        reply.cancel(tracked=abandon)
+
+    def _expire(self):
+        now = time.monotonic()
+        for call_sid, reply in list(self._replies.items()):
+            if now - reply.created_at > self.ttl_seconds:
+                self.finish(call_sid, abandon=True)
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+
+def lock_single_worker(path: str):
+    """
+    Hold an exclusive lock on `path` for the life of the process
+
+    A second worker started with the same lock file fails instead of
+    silently losing the replies whose polls it receives.
+
+    Returns:
+        The open lock file (keep a reference to it)
+
+    Raises:
+        RuntimeError: if another process holds the lock
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handle = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        raise RuntimeError(
+            f"another worker holds {path}: the hold/poll IVR keeps replies in memory and needs a "
+            f"single worker (set KM_IVR_RECORD_FLOW=0 to run several workers in real-time mode)"
+        )
+    return handle
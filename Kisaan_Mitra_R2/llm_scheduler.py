@@ -0,0 +1,279 @@
+# llm_scheduler.py
+"""
+Priority scheduler for LLM calls
+
+All Mistral generations share the same CPU, so only KM_LLM_CONCURRENCY
+(default 1) run at a time. Waiting jobs are started by priority class:
+
+    IVR    live phone calls        deadline KM_LLM_DEADLINE_IVR   (6 s)
+    WEB    web / app queries       deadline KM_LLM_DEADLINE_WEB   (30 s)
+    BATCH  offline and bulk jobs   deadline KM_LLM_DEADLINE_BATCH (600 s)
+
+A deadline is when the caller needs the answer (for streams: the first
+token). A job that can no longer start early enough to meet it, going by
+the observed generation times, gets the template answer instead.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+IVR, WEB, BATCH = 0, 1, 2
+PRIORITY_NAMES = {IVR: "ivr", WEB: "web", BATCH: "batch"}
+
+DEFAULT_DEADLINES = {
+    IVR: float(os.getenv("KM_LLM_DEADLINE_IVR", "6")),
+    WEB: float(os.getenv("KM_LLM_DEADLINE_WEB", "30")),
+    BATCH: float(os.getenv("KM_LLM_DEADLINE_BATCH", "600")),
+}
+
+
+def template_answer(user_query: str, schemes: Optional[List[Dict]] = None) -> str:
+    """
+    Fast deterministic answer from the retrieved schemes (no LLM)
+
+    Same content as response_builder.generate_response, phrased to be
+    spoken: no numbering or URLs, short sentences.
+    """
+    if not schemes:
+        return "क्षमा करें, अभी विस्तृत उत्तर उपलब्ध नहीं है। कृपया नजदीकी कृषि कार्यालय से संपर्क करें।"
+
+    names = [s.get("scheme_name") or s.get("name") or "योजना" for s in schemes[:3]]
+    answer = f"आपके लिए {len(schemes)} योजनाएं उपलब्ध हैं। मुख्य योजनाएं हैं: {', '.join(names)}।"
+    fields = schemes[0].get("required_fields") or []
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fields = [f.strip().replace("_", " ") for f in fields if f and f.strip()][:3]
+    if fields:
+        answer += f" आवेदन के लिए ज़रूरी: {', '.join(fields)}।"
+    return answer
+
+
+class _Waiter:
+    """A queued job; `granted` is set once (True = run, False = fall back)"""
+
+    __slots__ = ("priority", "deadline", "kind", "granted", "notify")
+
+    def __init__(self, priority: int, deadline: float, kind: str, notify: Callable[[bool], None]):
+        self.priority = priority
+        self.deadline = deadline
+        self.kind = kind
+        self.granted: Optional[bool] = None
+        self.notify = notify
+
+
+class LLMScheduler:
+    """
+    Concurrency-limited, priority-ordered LLM job runner
+
+    Usable from async code (run, stream) and from threads (run_sync).
+
+    Args:
+        concurrency: Generations allowed to run at once
+        deadlines: Default deadline (s) per priority class
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, deadlines: Optional[Dict[int, float]] = None):
+        self.concurrency = concurrency or int(os.getenv("KM_LLM_CONCURRENCY", "1"))
+        self.deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queue: List = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+
+        # Observed seconds until a job delivers (EMA): full answer / first token
+        self._expected = {"generate": 0.0, "stream": 0.0}
+
+        self._metrics = {
+            p: {"submitted": 0, "started": 0, "deadline_missed": 0, "queued": 0,
+                "max_queued": 0, "wait_seconds": 0.0}
+            for p in PRIORITY_NAMES
+        }
+
+    # Slots
+
+    def _enter(self, priority: int, deadline: float, kind: str, notify) -> Optional[_Waiter]:
+        """Take a free slot (returns None) or queue a waiter"""
+        with self._lock:
+            self._metrics[priority]["submitted"] += 1
+            if self._running < self.concurrency and not self._queue:
+                self._running += 1
+                self._metrics[priority]["started"] += 1
+                return None
+
+            waiter = _Waiter(priority, deadline, kind, notify)
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+            m = self._metrics[priority]
+            m["queued"] += 1
+            m["max_queued"] = max(m["max_queued"], m["queued"])
+            return waiter
+
+    def _wait_budget(self, waiter: _Waiter) -> float:
+        """Seconds the waiter can still wait and meet its deadline"""
+        return max(0.0, waiter.deadline - self._expected[waiter.kind] - time.monotonic())
+
+    def _settle(self, waiter: _Waiter, granted: bool):
+        """Resolve a waiter (lock held)"""
+        waiter.granted = granted
+        m = self._metrics[waiter.priority]
+        m["queued"] -= 1
+        if granted:
+            m["started"] += 1
+        else:
+            m["deadline_missed"] += 1
+        waiter.notify(granted)
+
+    def _give_up(self, waiter: _Waiter) -> bool:
+        """Waiting timed out; returns True if a slot was granted meanwhile"""
+        with self._lock:
+            if waiter.granted is None:
+                self._settle(waiter, False)
+            return waiter.granted
+
+    def _release(self):
+        """Free a slot and start the best waiter that can still make its deadline"""
+        with self._lock:
+            self._running -= 1
+            now = time.monotonic()
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.granted is not None:
+                    continue  # Already gave up
+                if now + self._expected[waiter.kind] > waiter.deadline:
+                    self._settle(waiter, False)
+                    continue
+                self._running += 1
+                self._settle(waiter, True)
+                break
+
+    def _observe(self, kind: str, seconds: float):
+        with self._lock:
+            previous = self._expected[kind]
+            self._expected[kind] = seconds if previous == 0.0 else 0.8 * previous + 0.2 * seconds
+
+    def _deadline(self, priority: int, deadline_s: Optional[float]) -> float:
+        return time.monotonic() + (deadline_s if deadline_s is not None else self.deadlines[priority])
+
+    async def _acquire(self, priority: int, deadline: float, kind: str) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify(granted: bool):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(granted))
+
+        started = time.monotonic()
+        waiter = self._enter(priority, deadline, kind, notify)
+        if waiter is None:
+            return True
+        try:
+            granted = await asyncio.wait_for(asyncio.shield(future), self._wait_budget(waiter))
+        except asyncio.TimeoutError:
+            granted = self._give_up(waiter)
+        except asyncio.CancelledError:
+            if self._give_up(waiter):
+                self._release()
+            raise
+        with self._lock:
+            self._metrics[priority]["wait_seconds"] += time.monotonic() - started
+        return granted
+
+    def _acquire_sync(self, priority: int, deadline: float, kind: str) -> bool:
+        event = threading.Event()
+        started = time.monotonic()
+        waiter = self._enter(priority, deadline, kind, lambda granted: event.set())
+        if waiter is None:
+            return True
+        if event.wait(self._wait_budget(waiter)):
+            granted = waiter.granted
+        else:
+            granted = self._give_up(waiter)
+        with self._lock:
+            self._metrics[priority]["wait_seconds"] += time.monotonic() - started
+        return granted
+
+    # Jobs
+
+    async def run(
+        self,
+        job: Callable[[], Awaitable],
+        fallback: Callable[[], object],
+        priority: int = WEB,
+        deadline_s: Optional[float] = None
+    ):
+        """Await job() in a slot, or return fallback() if the deadline can't be met"""
+        if not await self._acquire(priority, self._deadline(priority, deadline_s), "generate"):
+            return fallback()
+        started = time.monotonic()
+        try:
+            return await job()
+        finally:
+            self._observe("generate", time.monotonic() - started)
+            self._release()
+
+    async def stream(
+        self,
+        job: Callable[[], AsyncIterator[str]],
+        fallback: Callable[[], str],
+        priority: int = IVR,
+        deadline_s: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Stream job() in a slot (held until the stream ends), or yield fallback()"""
+        if not await self._acquire(priority, self._deadline(priority, deadline_s), "stream"):
+            yield fallback()
+            return
+        started, first = time.monotonic(), True
+        try:
+            async for piece in job():
+                if first:
+                    self._observe("stream", time.monotonic() - started)
+                    first = False
+                yield piece
+        finally:
+            self._release()
+
+    def run_sync(
+        self,
+        job: Callable[[], object],
+        fallback: Callable[[], object],
+        priority: int = BATCH,
+        deadline_s: Optional[float] = None
+    ):
+        """Blocking version of run() for threads and scripts"""
+        if not self._acquire_sync(priority, self._deadline(priority, deadline_s), "generate"):
+            return fallback()
+        started = time.monotonic()
+        try:
+            return job()
+        finally:
+            self._observe("generate", time.monotonic() - started)
+            self._release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            classes = {}
+            for priority, m in self._metrics.items():
+                waited = m["started"] + m["deadline_missed"]
+                classes[PRIORITY_NAMES[priority]] = {
+                    "submitted": m["submitted"],
+                    "started": m["started"],
+                    "deadline_missed": m["deadline_missed"],
+                    "queue_depth": m["queued"],
+                    "max_queue_depth": m["max_queued"],
+                    "avg_wait_ms": round(m["wait_seconds"] / waited * 1000, 1) if waited else 0.0,
+                    "deadline_s": self.deadlines[priority],
+                }
+            return {
+                "concurrency": self.concurrency,
+                "running": self._running,
+                "queue_depth": sum(m["queued"] for m in self._metrics.values()),
+                "expected_generate_s": round(self._expected["generate"], 3),
+                "expected_first_token_s": round(self._expected["stream"], 3),
+                "classes": classes,
+            }
+
+
+scheduler = LLMScheduler()
@@ -1,27 +1,56 @@
 # main.py
 from fastapi import FastAPI, UploadFile, File
-from speech_to_text_free import transcribe_audio_local
-from text_to_speech_free import synthesize_speech
-from ollama_llm import call_mistral
-import os, shutil
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_to_speech_free import AUDIO_DIR
+from audio_spool import get_spool
+from backends import stub_enabled
+from trace_capture import install_trace_capture
+
+# Heavy backends can be swapped for local stubs (KM_STUB_BACKENDS, see backends.py)
+if stub_enabled("stt"):
+    from backends import stub_transcribe_audio_local as transcribe_audio_local
+else:
+    from speech_to_text_free import transcribe_audio_local, warmup as stt_warmup
+if stub_enabled("tts"):
+    from backends import stub_synthesize_speech as synthesize_speech
+else:
+    from text_to_speech_free import synthesize_speech
+if stub_enabled("llm"):
+    from backends import stub_acall_mistral as acall_mistral
+else:
+    from ollama_llm import acall_mistral
 
 app = FastAPI(title="Voice-first AI Assistant")
-os.makedirs("temp_audio", exist_ok=True)
+install_trace_capture(app)  # KM_TRACE_CAPTURE, see trace_capture.py
+audio_spool = get_spool(AUDIO_DIR)
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load the STT model before the first call arrives (KM_STT_WARMUP=0 to skip)"""
+    if not stub_enabled("stt") and os.getenv("KM_STT_WARMUP", "1") != "0":
+        await asyncio.to_thread(stt_warmup)
+
 
 @app.post("/voice-query")
 async def voice_query(audio: UploadFile = File(...)):
-    # Save uploaded audio
-    audio_path = f"temp_audio/{audio.filename}"
-    with open(audio_path, "wb") as f:
-        shutil.copyfileobj(audio.file, f)
+    # Save uploaded audio (unique spool name, never the client's filename)
+    suffix = os.path.splitext(audio.filename or "")[1] or ".wav"
+    audio_path = audio_spool.write(await audio.read(), prefix="upload", suffix=suffix)
 
     # STT
-    user_text = await transcribe_audio_local(audio_path)
+    try:
+        user_text = await transcribe_audio_local(audio_path)
+    finally:
+        audio_spool.release(audio_path)
     if not user_text:
         return {"error": "Failed to transcribe audio."}
 
     # LLM
-    bot_text = call_mistral(user_text)
+    bot_text = await acall_mistral(user_text)
 
     # TTS
     audio_out = await synthesize_speech(bot_text)
@@ -33,3 +62,25 @@ async def voice_query(audio: UploadFile = File(...)):
         "bot_text": bot_text,
         "audio_path": audio_out
     }
+
+
+@app.get("/llm-cache/stats")
+async def llm_cache_stats():
+    """Semantic LLM answer cache statistics"""
+    from ollama_llm import get_answer_cache
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.get("/llm/prompt-stats")
+async def llm_prompt_stats():
+    """Prompt token estimates vs Ollama-reported prefill"""
+    from prompt_builder import prompt_stats
+    return prompt_stats.stats()
+
+
+@app.get("/llm/scheduler-stats")
+async def llm_scheduler_stats():
+    """LLM queue depth, waits and deadline misses per priority class"""
+    from llm_scheduler import scheduler
+    return scheduler.stats()
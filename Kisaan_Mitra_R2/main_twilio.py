@@ -1,33 +1,117 @@
-from fastapi import FastAPI, UploadFile, File, Request, Form
-from fastapi.responses import HTMLResponse
-from speech_to_text_free import transcribe_audio_local
-from text_to_speech_free import synthesize_speech
-from ollama_llm import call_mistral
-from intent_detector import detect_intent
+from fastapi import BackgroundTasks, FastAPI, UploadFile, File, Request, Form, WebSocket
+from fastapi.responses import FileResponse, HTMLResponse, Response
+from text_to_speech_free import AUDIO_DIR
+from intent_detector import detect_disaster, detect_intent
 from multilingual_retriever import retrieve_schemes
-from twilio_integration import create_ivr_response, send_sms_with_form_link, record_call_log
+from twilio_integration import record_call_log
+from call_log import get_call_log
+from ivr_pipeline import ReplyRegistry, lock_single_worker
+from recording_fetch import RecordingFetchError, get_recording_fetcher
+from media_stream import MediaStreamCall
+from call_sessions import get_session_store, new_session, offered_scheme
+import asyncio
+import json
 import os
-import shutil
-from twilio.twiml.voice_response import VoiceResponse
+import sys
+import time
+from twilio.twiml.voice_response import Connect, VoiceResponse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_spool import get_spool
+from backends import stub_enabled
+from trace_capture import install_trace_capture
+
+# Heavy backends can be swapped for local stubs (KM_STUB_BACKENDS, see backends.py)
+if stub_enabled("stt"):
+    from backends import stub_transcribe_audio_local as transcribe_audio_local, stub_transcribe_audio as transcribe_audio
+else:
+    from speech_to_text_free import transcribe_audio, transcribe_audio_local, warmup as stt_warmup
+if stub_enabled("tts"):
+    from backends import stub_synthesize_speech as synthesize_speech
+else:
+    from text_to_speech_free import synthesize_speech
+if stub_enabled("llm"):
+    from backends import stub_acall_mistral as acall_mistral, stub_astream_mistral as astream_mistral
+else:
+    from ollama_llm import acall_mistral, astream_mistral
+if stub_enabled("twilio"):
+    from backends import stub_send_sms_with_form_link as send_sms_with_form_link
+else:
+    from twilio_integration import send_sms_with_form_link
 
 app = FastAPI(title="Voice-first AI Assistant - Kisaan Mitra")
-os.makedirs("temp_audio", exist_ok=True)
-os.makedirs("call_logs", exist_ok=True)
+install_trace_capture(app)  # KM_TRACE_CAPTURE, see trace_capture.py
+audio_spool = get_spool(AUDIO_DIR)
+
+# IVR replies are streamed sentence by sentence (see ivr_pipeline.py)
+#   KM_IVR_TTS=say    Twilio <Say> per sentence (default)
+#   KM_IVR_TTS=local  synthesize_speech per sentence, played with <Play>
+IVR_TTS = os.getenv("KM_IVR_TTS", "say")
+#
+# The recording webhook only starts the pipeline and plays a hold prompt;
+# Twilio then polls /twilio-continue-reply, which waits up to
+# KM_IVR_NEXT_SENTENCE_TIMEOUT for sentences (keep it under Twilio's 15 s
+# webhook timeout). Callers are let go after KM_IVR_MAX_WAIT seconds.
+#
+# The replies being polled live in this process (ivr_replies), so this
+# flow needs a single worker: at startup the worker takes an exclusive
+# lock on KM_IVR_LOCK_FILE and a second one refuses to start. To run
+# several workers (KM_SESSION_DB), set KM_IVR_RECORD_FLOW=0: incoming
+# calls are then answered in real-time mode, whose WebSocket stays on
+# the worker that accepted it.
+IVR_RECORD_FLOW = os.getenv("KM_IVR_RECORD_FLOW", "1") != "0"
+# Outside AUDIO_DIR: the audio spool would sweep the lock file away
+IVR_LOCK_FILE = os.getenv("KM_IVR_LOCK_FILE", os.path.join("call_logs", "ivr_worker.lock"))
+IVR_NEXT_SENTENCE_TIMEOUT = float(os.getenv("KM_IVR_NEXT_SENTENCE_TIMEOUT", "8"))
+IVR_MAX_WAIT = float(os.getenv("KM_IVR_MAX_WAIT", "120"))
+IVR_HOLD_PROMPT = os.getenv("KM_IVR_HOLD_PROMPT", "कृपया प्रतीक्षा करें, हम आपके प्रश्न का उत्तर तैयार कर रहे हैं।")
+ivr_replies = ReplyRegistry()
+ivr_worker_lock = None
+
+# Real-time mode (see media_stream.py): wss:// URL of /twilio-media-stream,
+# derived from the incoming webhook's host when not set
+STREAM_URL = os.getenv("KM_STREAM_URL")
+recording_fetcher = get_recording_fetcher()
+
+# Per-call state for follow-up turns (KM_SESSION_DB to share it between workers)
+sessions = get_session_store()
+# Offer TTS running past the media-stream reply that started it
+offer_tasks = set()
+
+@app.on_event("startup")
+async def claim_record_flow():
+    """Make sure this is the only worker serving the hold/poll flow"""
+    global ivr_worker_lock
+    if IVR_RECORD_FLOW:
+        ivr_worker_lock = lock_single_worker(IVR_LOCK_FILE)
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load the STT model before the first call arrives (KM_STT_WARMUP=0 to skip)"""
+    if not stub_enabled("stt") and os.getenv("KM_STT_WARMUP", "1") != "0":
+        await asyncio.to_thread(stt_warmup)
+
+@app.on_event("shutdown")
+async def close_clients():
+    await recording_fetcher.aclose()
+    # Write out the queued call logs
+    await asyncio.to_thread(get_call_log().close)
 
 # ==================== ORIGINAL ENDPOINTS (UNCHANGED) ====================
 
 @app.post("/voice-query")
 async def voice_query(audio: UploadFile = File(...)):
     """Original endpoint - unchanged"""
-    audio_path = f"temp_audio/{audio.filename}"
-    with open(audio_path, "wb") as f:
-        shutil.copyfileobj(audio.file, f)
-    
-    user_text = await transcribe_audio_local(audio_path)
+    suffix = os.path.splitext(audio.filename or "")[1] or ".wav"
+    audio_path = audio_spool.write(await audio.read(), prefix="upload", suffix=suffix)
+    try:
+        user_text = await transcribe_audio_local(audio_path)
+    finally:
+        audio_spool.release(audio_path)
     if not user_text:
         return {"error": "Failed to transcribe audio."}
     
-    bot_text = call_mistral(user_text)
+    bot_text = await acall_mistral(user_text)
     audio_out = await synthesize_speech(bot_text)
     if not audio_out:
         return {"error": "Failed to generate speech."}
@@ -45,7 +129,11 @@ async def twilio_incoming_call(request: Request):
     """
     Twilio webhook for incoming calls
     Greet farmer and ask them to start speaking
+    (real-time mode when KM_IVR_RECORD_FLOW=0)
     """
+    if not IVR_RECORD_FLOW:
+        return await twilio_incoming_stream(request)
+    
     response = VoiceResponse()
     response.say(
         "नमस्कार! किसान मित्र में आपका स्वागत है। कृपया अपना प्रश्न बताएं।",
@@ -67,12 +155,11 @@ async def twilio_incoming_call(request: Request):
 async def twilio_process_voice(request: Request):
     """
     Process recorded voice from Twilio
-    - Get audio URL
-    - Transcribe with Whisper
-    - Detect intent
-    - Retrieve schemes
-    - Generate response
-    - Ask about form
+    
+    Acknowledges at once with a hold prompt and starts the pipeline
+    (download, Whisper, intent, retrieval, Mistral) in the background,
+    keyed by CallSid; /twilio-continue-reply picks up the answer. Slow
+    inference then never runs into Twilio's webhook timeout.
     """
     form_data = await request.form()
     recording_url = form_data.get('RecordingUrl')
@@ -81,73 +168,336 @@ async def twilio_process_voice(request: Request):
     
     print(f"📞 Call SID: {call_sid}, From: {from_number}, Recording: {recording_url}")
     
-    # Download and transcribe audio
-    import requests
+    context = {}
+    ivr_replies.start(
+        call_sid,
+        ivr_answer(call_sid, recording_url, from_number, context),
+        synthesize=synthesize_speech if IVR_TTS == "local" else None,
+        context=context
+    )
+    
+    response = VoiceResponse()
+    response.say(IVR_HOLD_PROMPT, voice='alice', language='hi-IN')
+    response.redirect('/twilio-continue-reply', method='POST')
+    return HTMLResponse(content=str(response), media_type="application/xml")
+
+async def ivr_answer(call_sid: str, recording_url: str, from_number: str, context: dict):
+    """
+    Background IVR pipeline for one recording, as a stream of reply text
+    
+    Problems are spoken as the reply; context["schemes"] is set only
+    when schemes were found (the form is offered then), and the call's
+    session is updated for the follow-up turns.
+    """
+    # Download the recording into memory and transcribe it (no temp file)
     try:
-        audio_response = requests.get(recording_url)
-        audio_path = f"temp_audio/twilio_{call_sid}.wav"
-        with open(audio_path, 'wb') as f:
-            f.write(audio_response.content)
-        
-        # Transcribe with Whisper (UNCHANGED)
-        user_text = await transcribe_audio_local(audio_path)
-        if not user_text:
-            return create_ivr_response("खेद है, आपके प्रश्न को समझ नहीं सके। कृपया फिर से कोशिश करें।")
-        
-        # Detect intent (UNCHANGED)
-        intent = detect_intent(user_text)
-        
-        # Retrieve schemes (UNCHANGED)
-        schemes = retrieve_schemes(user_text, intent)
-        
-        if not schemes:
-            return create_ivr_response("खेद है, इस समय कोई उपयुक्त योजना नहीं मिली।")
-        
-        # Generate LLM response (UNCHANGED)
-        llm_response = call_mistral(user_text, schemes)
-        
-        # Log the interaction
-        scheme_names = [s.get('scheme_name', 'Unknown') for s in schemes]
-        record_call_log(from_number, user_text, scheme_names, "pending")
+        audio_data = await recording_fetcher.fetch(recording_url)
+    except RecordingFetchError as e:
+        print(f"❌ {e}")
+        yield "खेद है, आपकी रिकॉर्डिंग नहीं मिल सकी। कृपया फिर से कोशिश करें।"
+        return
+    
+    user_text = await transcribe_audio(audio_data)
+    if not user_text:
+        yield "खेद है, आपके प्रश्न को समझ नहीं सके। कृपया फिर से कोशिश करें।"
+        return
+    
+    # Detect intent (UNCHANGED)
+    intent = detect_intent(user_text)
+    disaster = detect_disaster(user_text)
+    
+    # Retrieve schemes (UNCHANGED)
+    schemes = retrieve_schemes(user_text, intent)
+    
+    if not schemes:
+        yield "खेद है, इस समय कोई उपयुक्त योजना नहीं मिली।"
+        return
+    
+    # Log the interaction
+    scheme_names = [s.get('scheme_name', 'Unknown') for s in schemes]
+    record_call_log(from_number, user_text, scheme_names, "pending", call_sid, intent, disaster)
+    context["schemes"] = schemes
+    remember_answer(call_sid, from_number, user_text, intent, disaster, schemes)
+    reply = ivr_replies.get(call_sid)
+    if IVR_TTS == "local" and reply is not None:
+        reply.track(asyncio.create_task(precompute_offers(call_sid)))
+    
+    # Stream the LLM answer: the first sentence plays while the rest is generated
+    async for token in astream_mistral(user_text, schemes):
+        yield token
+
+def remember_answer(call_sid: str, from_number: str, user_text: str, intent: str, disaster: str, schemes: list) -> dict:
+    """Start the call's session over with a new question and its ranked schemes"""
+    session = sessions.get(call_sid) or new_session(call_sid)
+    session.update({
+        "from": from_number,
+        "transcript": user_text,
+        "intent": intent,
+        "disaster": disaster,
+        "schemes": schemes,
+        "offered": 0,
+        "audio": {},
+    })
+    sessions.save(session)
+    return session
+
+def offer_prompt(session: dict) -> str:
+    """Form offer for the scheme currently on offer"""
+    name = offered_scheme(session).get('scheme_name', 'इस योजना')
+    if session.get("offered", 0) == 0:
+        return f"क्या आप {name} के लिए फॉर्म भरना चाहते हैं?"
+    return f"ठीक है। एक और योजना है: {name}। क्या आप इसके लिए फॉर्म भरना चाहते हैं?"
+
+async def precompute_offers(call_sid: str, first: int = 0):
+    """Synthesize the form offers for the ranked schemes (from `first`) before the caller gets to them"""
+    session = sessions.get(call_sid)
+    if not session:
+        return
+    for index in range(first, len(session["schemes"])):
+        text = offer_prompt({**session, "offered": index})
+        try:
+            audio_path = await synthesize_speech(text)
+        except Exception as e:
+            print(f"❌ Offer TTS error: {e}")
+            return
+        if not audio_path:
+            continue
         
-        # Create Twilio response with scheme info + form offer
+        # Saved one by one, so the offers ready so far are used even if
+        # this is cancelled; re-read, the caller may have moved on
+        current = sessions.get(call_sid)
+        if not current:
+            return
+        current["audio"][text] = audio_path
+        sessions.save(current)
+
+def log_choice(session: dict, scheme: dict, user_choice: str):
+    """Log the caller's answer to the form offer for `scheme`"""
+    record_call_log(
+        session["from"], session["transcript"], [scheme.get('scheme_name', 'Unknown')], user_choice,
+        session["call_sid"], session["intent"], session.get("disaster")
+    )
+
+def cached_audio(session: dict, text: str):
+    """Precomputed audio for a prompt, if it is still on disk"""
+    audio_path = (session.get("audio") or {}).get(text)
+    return audio_path if audio_path and os.path.isfile(audio_path) else None
+
+def add_form_offer(request: Request, response: VoiceResponse, session: dict):
+    """Offer the form for the scheme on offer and gather 1=yes, 2=no"""
+    text = offer_prompt(session)
+    audio_path = cached_audio(session, text)
+    if audio_path:
+        response.play(str(request.url_for("ivr_audio", file_name=os.path.basename(audio_path))))
+    else:
+        response.say(text, voice='alice', language='hi-IN')
+    
+    gather = response.gather(
+        num_digits=1,
+        action='/twilio-handle-choice',
+        method='POST',
+        timeout=5
+    )
+    gather.say(
+        "1 दबाएं हाँ के लिए, 2 दबाएं नहीं के लिए",
+        voice='alice',
+        language='hi-IN'
+    )
+
+async def ivr_reply_response(request: Request, call_sid: str, reply, timeout: float) -> HTMLResponse:
+    """
+    TwiML for the next ready part of a streamed reply
+    
+    Plays the sentences ready within `timeout`, then redirects to
+    /twilio-continue-reply; once the reply is complete, offers the form.
+    """
+    segments, finished = await reply.next_segments(timeout)
+    
+    response = VoiceResponse()
+    for segment in segments:
+        if segment["audio_path"]:
+            response.play(str(request.url_for("ivr_audio", file_name=os.path.basename(segment["audio_path"]))))
+        else:
+            response.say(segment["text"], voice='alice', language='hi-IN')
+    
+    if not finished and time.monotonic() - reply.created_at > IVR_MAX_WAIT:
+        print(f"❌ Reply for {call_sid} not ready after {IVR_MAX_WAIT:.0f}s, giving up")
+        ivr_replies.finish(call_sid, abandon=True)
+        response.say("खेद है, अभी उत्तर तैयार नहीं हो सका। कृपया बाद में फिर से कॉल करें।", voice='alice', language='hi-IN')
+        response.hangup()
+        return HTMLResponse(content=str(response), media_type="application/xml")
+    
+    if not finished:
+        if not segments:
+            response.pause(length=1)
+        response.redirect('/twilio-continue-reply', method='POST')
+        return HTMLResponse(content=str(response), media_type="application/xml")
+    
+    ivr_replies.finish(call_sid)
+    print(f"📞 Reply for {call_sid} complete ({len(reply.text_parts)} sentences)")
+    session = sessions.get(call_sid)
+    if not reply.context.get("schemes") or offered_scheme(session) is None:
+        if not segments and not reply.text_parts:
+            response.say("खेद है, कुछ गड़बड़ हो गई। कृपया फिर से कोशिश करें।", voice='alice', language='hi-IN')
+        return HTMLResponse(content=str(response), media_type="application/xml")
+    
+    # Form offer, user choice 1=yes, 2=no
+    add_form_offer(request, response, session)
+    
+    return HTMLResponse(content=str(response), media_type="application/xml")
+
+@app.post("/twilio-continue-reply")
+async def twilio_continue_reply(request: Request):
+    """
+    Twilio poll target while a reply is being prepared or streamed
+    Plays the next sentences as soon as they are ready
+    """
+    form_data = await request.form()
+    call_sid = form_data.get('CallSid')
+    
+    reply = ivr_replies.get(call_sid)
+    if reply is None:
         response = VoiceResponse()
-        response.say(llm_response, voice='alice', language='hi-IN')
-        response.say(
-            f"क्या आप {schemes[0].get('scheme_name', 'इस योजना')} के लिए फॉर्म भरना चाहते हैं?",
-            voice='alice',
-            language='hi-IN'
-        )
-        
-        # Gather user choice (1=yes, 2=no)
-        gather = response.gather(
-            num_digits=1,
-            action='/twilio-handle-choice',
-            method='POST',
-            timeout=5
-        )
-        gather.say(
-            "1 दबाएं हाँ के लिए, 2 दबाएं नहीं के लिए",
-            voice='alice',
-            language='hi-IN'
-        )
-        
+        response.say("खेद है, कृपया फिर से कोशिश करें।", voice='alice', language='hi-IN')
+        response.redirect('/twilio-incoming-call', method='POST')
         return HTMLResponse(content=str(response), media_type="application/xml")
     
+    return await ivr_reply_response(request, call_sid, reply, IVR_NEXT_SENTENCE_TIMEOUT)
+
+# ==================== REAL-TIME MEDIA STREAM ====================
+
+@app.post("/twilio-incoming-stream")
+async def twilio_incoming_stream(request: Request):
+    """
+    Twilio webhook for incoming calls, real-time mode
+    Greets the farmer, then streams the call audio to /twilio-media-stream
+    """
+    form_data = await request.form()
+    
+    response = VoiceResponse()
+    response.say(
+        "नमस्कार! किसान मित्र में आपका स्वागत है। कृपया अपना प्रश्न बताएं।",
+        voice='alice',
+        language='hi-IN'
+    )
+    
+    stream_url = STREAM_URL or str(request.url_for("twilio_media_stream")).replace("http", "ws", 1)
+    connect = Connect()
+    stream = connect.stream(url=stream_url)
+    stream.parameter(name="from", value=form_data.get('From') or "")
+    response.append(connect)
+    
+    return HTMLResponse(content=str(response), media_type="application/xml")
+
+async def answer_stream_utterance(call: MediaStreamCall, user_text: str):
+    """Reply to one utterance heard on a media stream"""
+    intent = detect_intent(user_text)
+    disaster = detect_disaster(user_text)
+    schemes = retrieve_schemes(user_text, intent)
+    
+    if not schemes:
+        await call.say("खेद है, इस समय कोई उपयुक्त योजना नहीं मिली।")
+        return
+    
+    scheme_names = [s.get('scheme_name', 'Unknown') for s in schemes]
+    record_call_log(call.from_number, user_text, scheme_names, "pending", call.call_sid, intent, disaster)
+    remember_answer(call.call_sid, call.from_number, user_text, intent, disaster, schemes)
+    # The first offer is synthesized when it is due; the others in the
+    # background, for when the caller declines (2)
+    offers = asyncio.create_task(precompute_offers(call.call_sid, first=1))
+    offer_tasks.add(offers)
+    offers.add_done_callback(offer_tasks.discard)
+    
+    try:
+        await call.play_reply(astream_mistral(user_text, schemes))
+        await stream_form_offer(call, sessions.get(call.call_sid))
+    except asyncio.CancelledError:
+        # Barge-in: the caller asked something else
+        offers.cancel()
+        raise
+
+async def stream_form_offer(call: MediaStreamCall, session: dict):
+    text = offer_prompt(session)
+    audio_path = cached_audio(session, text)
+    if audio_path:
+        await call.play_file(audio_path)
+    else:
+        await call.say(text)
+    await call.say("1 दबाएं हाँ के लिए, 2 दबाएं नहीं के लिए")
+
+async def answer_stream_dtmf(call: MediaStreamCall, digit: str):
+    """Form offer answer (1=yes, 2=no) on a media stream, from the call's session"""
+    session = sessions.get(call.call_sid)
+    scheme = offered_scheme(session)
+    if scheme is None:
+        return
+    
+    if digit == '1':
+        form_url = f"https://yourapp.com/form?phone={call.from_number}"
+        log_choice(session, scheme, "yes")
+        await call.say("आपके फोन पर एक एसएमएस भेजा जा रहा है जिसमें फॉर्म की लिंक है।")
+        if call.from_number:
+            await asyncio.to_thread(
+                send_sms_with_form_link, call.from_number, scheme.get('scheme_name', 'योजना'), form_url
+            )
+    elif digit == '2':
+        log_choice(session, scheme, "no")
+        session["offered"] += 1
+        sessions.save(session)
+        if offered_scheme(session) is not None:
+            await stream_form_offer(call, session)
+        else:
+            await call.say("ठीक है। आप अपना अगला प्रश्न बता सकते हैं।")
+
+@app.websocket("/twilio-media-stream")
+async def twilio_media_stream(websocket: WebSocket):
+    """
+    Bidirectional Twilio Media Stream: live caller audio in,
+    reply audio out (8 kHz μ-law both ways)
+    """
+    await websocket.accept()
+    
+    async def send(message: dict):
+        await websocket.send_text(json.dumps(message))
+    
+    call = MediaStreamCall(
+        send,
+        transcribe=transcribe_audio,
+        synthesize=synthesize_speech,
+        on_utterance=answer_stream_utterance,
+        on_dtmf=answer_stream_dtmf
+    )
+    try:
+        async for message in websocket.iter_text():
+            await call.handle(json.loads(message))
     except Exception as e:
-        print(f"❌ Error processing voice: {e}")
-        return create_ivr_response(f"त्रुटि: {str(e)}")
+        print(f"❌ Media stream error: {e}")
+    finally:
+        await call.close()
+
+@app.get("/ivr-audio/{file_name}", name="ivr_audio")
+async def ivr_audio(file_name: str):
+    """Serve synthesized reply sentences to Twilio <Play>"""
+    path = os.path.join(AUDIO_DIR, os.path.basename(file_name))
+    if not os.path.isfile(path):
+        return Response(status_code=404)
+    return FileResponse(path, media_type="audio/mpeg")
 
 @app.post("/twilio-handle-choice")
-async def twilio_handle_choice(request: Request):
+async def twilio_handle_choice(request: Request, background_tasks: BackgroundTasks):
     """
     Handle user's DTMF choice (1=yes, 2=no)
-    Send form link via SMS or offer other schemes
+    Send form link via SMS or offer the next ranked scheme,
+    from the call's session (nothing is recomputed)
     """
     form_data = await request.form()
     digits = form_data.get('Digits')
+    call_sid = form_data.get('CallSid')
     from_number = form_data.get('From')
     
+    session = sessions.get(call_sid)
+    scheme = offered_scheme(session)
+    
     response = VoiceResponse()
     
     if digits == '1':  # User wants form
@@ -160,24 +510,37 @@ async def twilio_handle_choice(request: Request):
             language='hi-IN'
         )
         
-        # Send SMS with form link
-        # send_sms_with_form_link(from_number, scheme_name, form_url)
+        if scheme is not None:
+            log_choice(session, scheme, "yes")
+            # Send SMS with form link (after the TwiML is returned)
+            if from_number:
+                scheme_name = scheme.get('scheme_name', 'योजना')
+                background_tasks.add_task(send_sms_with_form_link, from_number, scheme_name, form_url)
         
         response.hangup()
     
     elif digits == '2':  # User doesn't want form
-        response.say(
-            "ठीक है। आप किसी अन्य योजना के बारे में जानना चाहते हैं?",
-            voice='alice',
-            language='hi-IN'
-        )
-        response.gather(
-            num_digits=1,
-            action='/twilio-incoming-call',
-            method='POST',
-            timeout=5
-        ).say("1 दबाएं हाँ के लिए, 2 दबाएं नहीं के लिए")
-        response.hangup()
+        if scheme is not None:
+            log_choice(session, scheme, "no")
+            session["offered"] += 1
+            sessions.save(session)
+        
+        if offered_scheme(session) is not None:
+            # Next ranked scheme for the same question
+            add_form_offer(request, response, session)
+        else:
+            response.say(
+                "ठीक है। आप किसी अन्य योजना के बारे में जानना चाहते हैं?",
+                voice='alice',
+                language='hi-IN'
+            )
+            response.gather(
+                num_digits=1,
+                action='/twilio-incoming-call',
+                method='POST',
+                timeout=5
+            ).say("1 दबाएं हाँ के लिए, 2 दबाएं नहीं के लिए")
+            response.hangup()
     
     else:
         response.say("खेद है, समझ नहीं आया। कृपया फिर से कोशिश करें।")
@@ -191,6 +554,30 @@ async def twilio_handle_choice(request: Request):
 async def health():
     return {"status": "ok", "service": "Kisaan Mitra - Twilio Integration"}
 
+@app.get("/call-logs/stats")
+async def call_log_stats(days: int = 7):
+    """Calls per day / intent / disaster and schemes offered vs accepted"""
+    return await asyncio.to_thread(get_call_log().summary, days)
+
+@app.get("/llm-cache/stats")
+async def llm_cache_stats():
+    """Semantic LLM answer cache statistics"""
+    from ollama_llm import get_answer_cache
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+@app.get("/llm/prompt-stats")
+async def llm_prompt_stats():
+    """Prompt token estimates vs Ollama-reported prefill"""
+    from prompt_builder import prompt_stats
+    return prompt_stats.stats()
+
+@app.get("/llm/scheduler-stats")
+async def llm_scheduler_stats():
+    """LLM queue depth, waits and deadline misses per priority class"""
+    from llm_scheduler import scheduler
+    return scheduler.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
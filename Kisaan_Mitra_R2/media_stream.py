@@ -0,0 +1,338 @@
+# media_stream.py
+"""
+Real-time IVR over Twilio Media Streams
+
+With <Record>, every turn waits for the caller to finish, for Twilio to
+finalize and host the recording, and for the download. With a
+bidirectional <Connect><Stream>, the call audio arrives over a WebSocket
+as 20 ms frames of 8 kHz μ-law, and we can answer on the same socket:
+
+    frames -> energy VAD -> phrases transcribed while the caller talks
+           -> end of utterance -> intent / retrieval / streamed LLM reply
+           -> TTS sentences sent back as μ-law
+
+A short pause closes a phrase, which goes to STT straight away; a longer
+pause ends the utterance, so by then only the last phrase is still being
+transcribed. Speaking while a reply plays interrupts it (barge-in).
+
+Environment:
+    KM_STREAM_PHRASE_SILENCE_MS  pause that closes a phrase (default 400)
+    KM_STREAM_MIN_PHRASE_S       shorter phrases wait for more speech (default 1.0)
+    KM_STREAM_END_SILENCE_MS     pause that ends the utterance (default 800)
+    KM_STREAM_MAX_UTTERANCE_S    longest utterance (default 30)
+    KM_STREAM_VAD_THRESHOLD      minimum speech RMS, full scale = 1 (default 0.01)
+
+Replay WAV files against the endpoint with media_stream_sim.py.
+"""
+import asyncio
+import base64
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_decode import MULAW_TABLE, decode_audio_file, encode_mulaw, resample
+from ivr_pipeline import SpokenReply
+
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+OUTBOUND_CHUNK_BYTES = SAMPLE_RATE  # 1 s of μ-law per outbound media message
+
+
+def _frames(ms: float) -> int:
+    return max(1, int(round(ms / FRAME_MS)))
+
+
+class EnergyVAD:
+    """
+    Frame-level speech detector with an adaptive noise floor
+
+    Args:
+        threshold: Minimum RMS counted as speech
+        ratio: Speech must also be this many times louder than the noise floor
+    """
+
+    def __init__(self, threshold: Optional[float] = None, ratio: float = 3.0):
+        self.threshold = threshold or float(os.getenv("KM_STREAM_VAD_THRESHOLD", "0.01"))
+        self.ratio = ratio
+        self.noise_floor = self.threshold / ratio
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(samples)))) if len(samples) else 0.0
+        speech = rms > max(self.threshold, self.noise_floor * self.ratio)
+        if not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+
+class UtteranceDetector:
+    """
+    Cuts a live frame stream into phrases and utterances
+
+    push() returns the events a frame triggers:
+        ("start", None)        speech began
+        ("phrase", samples)    a phrase ended (8 kHz float32, ready for STT)
+        ("end", None)          the utterance ended
+
+    Args:
+        vad: Frame classifier
+        start_ms: Continuous speech needed to start an utterance
+        preroll_ms: Audio kept from before the start
+    """
+
+    def __init__(self, vad: Optional[EnergyVAD] = None, start_ms: float = 60, preroll_ms: float = 200):
+        self.vad = vad or EnergyVAD()
+        self.start_frames = _frames(start_ms)
+        self.phrase_frames = _frames(float(os.getenv("KM_STREAM_PHRASE_SILENCE_MS", "400")))
+        self.min_phrase_frames = _frames(float(os.getenv("KM_STREAM_MIN_PHRASE_S", "1.0")) * 1000)
+        self.end_frames = _frames(float(os.getenv("KM_STREAM_END_SILENCE_MS", "800")))
+        self.max_frames = _frames(float(os.getenv("KM_STREAM_MAX_UTTERANCE_S", "30")) * 1000)
+
+        self._preroll: deque = deque(maxlen=_frames(preroll_ms))
+        self.active = False
+        self._reset()
+
+    def _reset(self):
+        self._phrase: List[np.ndarray] = []
+        self._phrase_has_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._utterance_frames = 0
+
+    def _flush(self) -> Tuple[str, np.ndarray]:
+        samples = np.concatenate(self._phrase)
+        self._phrase = []
+        self._phrase_has_speech = False
+        return "phrase", samples
+
+    def push(self, frame: np.ndarray) -> List[Tuple[str, Optional[np.ndarray]]]:
+        speech = self.vad.is_speech(frame)
+
+        if not self.active:
+            self._preroll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run < self.start_frames:
+                return []
+            self.active = True
+            self._phrase = list(self._preroll)
+            self._phrase_has_speech = True
+            self._utterance_frames = len(self._phrase)
+            self._preroll.clear()
+            return [("start", None)]
+
+        events = []
+        self._phrase.append(frame)
+        self._utterance_frames += 1
+        if speech:
+            self._silence_run = 0
+            self._phrase_has_speech = True
+        else:
+            self._silence_run += 1
+
+        if (self._silence_run == self.phrase_frames and self._phrase_has_speech
+                and len(self._phrase) >= self.min_phrase_frames):
+            events.append(self._flush())
+
+        if self._silence_run >= self.end_frames or self._utterance_frames >= self.max_frames:
+            if self._phrase_has_speech:
+                events.append(self._flush())
+            events.append(("end", None))
+            self.active = False
+            self._reset()
+        return events
+
+
+class MediaStreamCall:
+    """
+    One Media Streams connection (one phone call)
+
+    Feed it the JSON messages Twilio sends with handle(); it answers
+    through `send`.
+
+    Args:
+        send: async callable sending one JSON message to Twilio
+        transcribe: async 16 kHz float32 array -> text (or None)
+        synthesize: async text -> audio file path
+        on_utterance: async (call, text) -> None, answers one utterance
+        on_dtmf: async (call, digit) -> None
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict], Awaitable[None]],
+        transcribe: Callable[[np.ndarray], Awaitable[Optional[str]]],
+        synthesize: Callable[[str], Awaitable[Optional[str]]],
+        on_utterance: Callable[["MediaStreamCall", str], Awaitable[None]],
+        on_dtmf: Optional[Callable[["MediaStreamCall", str], Awaitable[None]]] = None,
+    ):
+        self.send = send
+        self.transcribe = transcribe
+        self.synthesize = synthesize
+        self.on_utterance = on_utterance
+        self.on_dtmf = on_dtmf
+
+        self.stream_sid: Optional[str] = None
+        self.call_sid: Optional[str] = None
+        self.parameters: Dict[str, str] = {}
+
+        self.detector = UtteranceDetector()
+        self._phrases: List[asyncio.Task] = []
+        self._answering: List[asyncio.Task] = []  # Phrases of the utterance being answered
+        self._played = False
+        self._reply: Optional[asyncio.Task] = None
+        self._marks: set = set()
+        self._mark_seq = 0
+        self._utterance_ended_at: Optional[float] = None
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def from_number(self) -> Optional[str]:
+        return self.parameters.get("from")
+
+    @property
+    def speaking(self) -> bool:
+        """A reply is being prepared or still playing on the caller's side"""
+        return bool(self._marks) or (self._reply is not None and not self._reply.done())
+
+    # Inbound
+
+    async def handle(self, message: Dict):
+        event = message.get("event")
+        if event == "media":
+            media = message.get("media", {})
+            if media.get("track", "inbound") == "inbound":
+                await self._on_audio(base64.b64decode(media.get("payload", "")))
+        elif event == "start":
+            start = message.get("start", {})
+            self.stream_sid = message.get("streamSid") or start.get("streamSid")
+            self.call_sid = start.get("callSid")
+            self.parameters = start.get("customParameters") or {}
+            print(f"📞 Media stream started: {self.call_sid} ({self.stream_sid})")
+        elif event == "mark":
+            self._marks.discard(message.get("mark", {}).get("name"))
+        elif event == "dtmf":
+            if self.on_dtmf is not None:
+                if self.speaking:
+                    await self.interrupt()
+                self._start_reply(self.on_dtmf(self, message.get("dtmf", {}).get("digit", "")))
+        elif event == "stop":
+            print(f"📞 Media stream stopped: {self.call_sid}")
+            await self.close()
+
+    async def _on_audio(self, payload: bytes):
+        samples = MULAW_TABLE[np.frombuffer(payload, dtype=np.uint8)]
+        for kind, phrase in self.detector.push(samples):
+            if kind == "start":
+                if self._answering and not self._played and self.speaking:
+                    self._resume_utterance()
+                elif self.speaking:
+                    await self.interrupt()
+            elif kind == "phrase":
+                self._phrases.append(asyncio.create_task(self.transcribe(resample(phrase, SAMPLE_RATE))))
+            elif kind == "end":
+                self._answering, self._phrases = self._phrases, []
+                self._played = False
+                self._utterance_ended_at = time.monotonic()
+                self._start_reply(self._answer(self._answering))
+
+    def _resume_utterance(self):
+        """The caller went on before hearing anything: answer it all as one utterance"""
+        self._reply.cancel()
+        self._phrases = self._answering + self._phrases
+        self._answering = []
+
+    async def _answer(self, phrases: List[asyncio.Task]):
+        # Shielded: the phrase tasks are reused if this answer is cancelled
+        texts = await asyncio.gather(*(asyncio.shield(task) for task in phrases))
+        text = " ".join(t.strip() for t in texts if t and t.strip())
+        if not text:
+            return
+        waited = time.monotonic() - self._utterance_ended_at
+        print(f"🎙️ Utterance ({len(phrases)} phrases, final STT wait {waited:.2f}s): {text}")
+        await self.on_utterance(self, text)
+
+    def _start_reply(self, coroutine):
+        if self._reply is not None and not self._reply.done():
+            self._reply.cancel()
+        self._reply = asyncio.create_task(self._run_reply(coroutine))
+
+    async def _run_reply(self, coroutine):
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Media stream reply error: {e}")
+
+    # Outbound
+
+    async def _send(self, message: Dict):
+        # The reply task and barge-in both write to the socket
+        async with self._send_lock:
+            await self.send(message)
+
+    async def interrupt(self):
+        """Barge-in: stop the reply and drop the audio Twilio has buffered"""
+        if self._reply is not None and not self._reply.done():
+            self._reply.cancel()
+        if self._marks:
+            self._marks.clear()
+            await self._send({"event": "clear", "streamSid": self.stream_sid})
+        print(f"✋ Caller interrupted the reply ({self.call_sid})")
+
+    async def play_file(self, audio_path: str):
+        """Send an audio file as 8 kHz μ-law, followed by a mark"""
+        samples = await asyncio.to_thread(decode_audio_file, audio_path, SAMPLE_RATE)
+        payload = encode_mulaw(samples)
+        for offset in range(0, len(payload), OUTBOUND_CHUNK_BYTES):
+            chunk = payload[offset:offset + OUTBOUND_CHUNK_BYTES]
+            await self._send({
+                "event": "media",
+                "streamSid": self.stream_sid,
+                "media": {"payload": base64.b64encode(chunk).decode("ascii")},
+            })
+
+        if not self._played and self._utterance_ended_at is not None:
+            print(f"🔊 First reply audio {time.monotonic() - self._utterance_ended_at:.2f}s after the caller stopped")
+
+        self._played = True
+        self._mark_seq += 1
+        name = f"reply-{self._mark_seq}"
+        self._marks.add(name)
+        await self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+
+    async def say(self, text: str):
+        """Synthesize one message and play it"""
+        audio_path = await self.synthesize(text)
+        if audio_path:
+            await self.play_file(audio_path)
+        else:
+            print(f"❌ TTS failed, nothing played: {text}")
+
+    async def play_reply(self, tokens, timeout: float = 30.0) -> SpokenReply:
+        """
+        Play a streamed LLM answer sentence by sentence
+
+        Each sentence is synthesized as soon as it is generated and sent
+        as soon as it and the ones before it are ready.
+        """
+        reply = SpokenReply(tokens, synthesize=self.synthesize)
+        try:
+            finished = False
+            while not finished:
+                segments, finished = await reply.next_segments(timeout)
+                for segment in segments:
+                    if segment["audio_path"]:
+                        await self.play_file(segment["audio_path"])
+        finally:
+            reply.cancel()
+        return reply
+
+    async def close(self):
+        for task in self._phrases + self._answering:
+            task.cancel()
+        self._phrases, self._answering = [], []
+        if self._reply is not None:
+            self._reply.cancel()
@@ -0,0 +1,209 @@
+# media_stream_sim.py
+"""
+Replay WAV files into /twilio-media-stream the way Twilio would
+
+Each file is one caller turn: it is converted to 8 kHz μ-law and sent
+as 20 ms media frames at real-time pace, followed by silence while the
+reply plays. Reply audio is collected, marks are echoed back once the
+audio before them would have finished playing, and the time from the
+end of each turn to its first reply audio is reported.
+
+    cd Kisaan_Mitra_R2 && KM_STUB_BACKENDS=all uvicorn main_twilio:app --port 8001
+    python media_stream_sim.py --url ws://localhost:8001/twilio-media-stream \\
+        question1.wav question2.wav --save reply.wav
+
+Options:
+    --speed 2       send frames twice as fast as real time
+    --gap 2         seconds of silence after each turn (then the reply is awaited)
+    --dtmf 1        key pressed after the last turn
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+import wave
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from audio_decode import MULAW_TABLE, decode_audio_file, encode_mulaw
+
+SAMPLE_RATE = 8000
+FRAME_BYTES = 160  # 20 ms
+SILENCE_FRAME = b"\xff" * FRAME_BYTES  # μ-law zero
+
+
+def wav_to_frames(path: str) -> List[bytes]:
+    """Audio file -> 20 ms frames of 8 kHz μ-law"""
+    payload = encode_mulaw(decode_audio_file(path, SAMPLE_RATE))
+    payload += SILENCE_FRAME[:(-len(payload)) % FRAME_BYTES]
+    return [payload[i:i + FRAME_BYTES] for i in range(0, len(payload), FRAME_BYTES)]
+
+
+class SimulatedCall:
+    """
+    Twilio's side of one media stream
+
+    Args:
+        ws: Open WebSocket connection (websockets client)
+        speed: Frame pacing relative to real time
+        from_number: Caller number passed as the "from" parameter
+    """
+
+    def __init__(self, ws, speed: float = 1.0, from_number: str = "+910000000000"):
+        self.ws = ws
+        self.speed = speed
+        self.from_number = from_number
+        self.stream_sid = "MZ" + uuid.uuid4().hex
+        self.call_sid = "CA" + uuid.uuid4().hex
+        self.sequence = 0
+        self.chunk = 0
+
+        self.reply_audio = bytearray()
+        self.turns: List[Dict] = []
+        self._turn_ended_at: Optional[float] = None
+        self._last_media_at = 0.0
+        self._playback_until = 0.0  # When the received audio would finish playing
+        self._pending_marks = 0
+
+    async def _send(self, message: Dict):
+        self.sequence += 1
+        message["sequenceNumber"] = str(self.sequence)
+        await self.ws.send(json.dumps(message))
+
+    async def start(self):
+        await self.ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        await self._send({
+            "event": "start",
+            "streamSid": self.stream_sid,
+            "start": {
+                "streamSid": self.stream_sid,
+                "callSid": self.call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": SAMPLE_RATE, "channels": 1},
+                "customParameters": {"from": self.from_number},
+            },
+        })
+
+    async def send_frames(self, frames: List[bytes]):
+        started = time.monotonic()
+        for i, frame in enumerate(frames):
+            self.chunk += 1
+            await self._send({
+                "event": "media",
+                "streamSid": self.stream_sid,
+                "media": {
+                    "track": "inbound",
+                    "chunk": str(self.chunk),
+                    "timestamp": str(self.chunk * 20),
+                    "payload": base64.b64encode(frame).decode("ascii"),
+                },
+            })
+            delay = started + (i + 1) * 0.02 / self.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def turn(self, path: str, gap_s: float):
+        """Speak one file, then stay silent for gap_s"""
+        frames = wav_to_frames(path)
+        self.turns.append({"file": path, "speech_s": len(frames) * 0.02, "first_reply_ms": None, "reply_s": 0.0})
+        await self.send_frames(frames)
+        self._turn_ended_at = time.monotonic()
+        await self.send_frames([SILENCE_FRAME] * int(gap_s / 0.02))
+
+    async def dtmf(self, digit: str):
+        self.turns.append({"dtmf": digit, "first_reply_ms": None, "reply_s": 0.0})
+        self._turn_ended_at = time.monotonic()
+        await self._send({"event": "dtmf", "streamSid": self.stream_sid, "dtmf": {"track": "inbound_track", "digit": digit}})
+
+    async def stop(self):
+        await self._send({"event": "stop", "streamSid": self.stream_sid, "stop": {"callSid": self.call_sid}})
+
+    async def _echo_mark(self, name: str, at: float):
+        await asyncio.sleep(max(0.0, at - time.monotonic()))
+        self._pending_marks -= 1
+        await self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+
+    async def receive(self):
+        """Collect reply audio and echo marks (run as a task)"""
+        async for raw in self.ws:
+            message = json.loads(raw)
+            event = message.get("event")
+            now = time.monotonic()
+            if event == "media":
+                audio = base64.b64decode(message["media"]["payload"])
+                self.reply_audio += audio
+                self._last_media_at = now
+                turn = self.turns[-1] if self.turns else None
+                if turn is not None:
+                    if turn["first_reply_ms"] is None and self._turn_ended_at is not None:
+                        turn["first_reply_ms"] = round((now - self._turn_ended_at) * 1000, 1)
+                    turn["reply_s"] += len(audio) / SAMPLE_RATE
+                self._playback_until = max(now, self._playback_until) + len(audio) / SAMPLE_RATE / self.speed
+            elif event == "mark":
+                self._pending_marks += 1
+                asyncio.create_task(self._echo_mark(message["mark"]["name"], self._playback_until))
+            elif event == "clear":
+                self._playback_until = now
+
+    async def wait_reply(self, timeout: float = 30.0, quiet_s: float = 1.5):
+        """Wait until the reply to the last turn has arrived and played"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            now = time.monotonic()
+            if (self._last_media_at > (self._turn_ended_at or 0) and now - self._last_media_at > quiet_s
+                    and not self._pending_marks and now >= self._playback_until):
+                return
+            await asyncio.sleep(0.05)
+
+
+def save_mulaw_wav(path: str, payload: bytes):
+    """Write μ-law audio as a 16-bit PCM WAV"""
+    pcm = (MULAW_TABLE[np.frombuffer(payload, dtype=np.uint8)] * 32767).astype("<i2")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+
+
+async def simulate(url: str, files: List[str], speed: float, gap_s: float, dtmf: Optional[str], save: Optional[str]) -> List[Dict]:
+    import websockets
+
+    async with websockets.connect(url) as ws:
+        call = SimulatedCall(ws, speed=speed)
+        receiver = asyncio.create_task(call.receive())
+        await call.start()
+        for path in files:
+            await call.turn(path, gap_s)
+            await call.wait_reply()
+        if dtmf:
+            await call.dtmf(dtmf)
+            await call.wait_reply()
+        await call.stop()
+        receiver.cancel()
+
+    if save:
+        save_mulaw_wav(save, bytes(call.reply_audio))
+        print(f"💾 Reply audio saved to {save}")
+    return call.turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay WAV files as a Twilio media stream")
+    parser.add_argument("files", nargs="+", help="One audio file per caller turn")
+    parser.add_argument("--url", default="ws://localhost:8000/twilio-media-stream")
+    parser.add_argument("--speed", type=float, default=1.0, help="Frame pacing relative to real time")
+    parser.add_argument("--gap", type=float, default=2.0, help="Silence after each turn (s)")
+    parser.add_argument("--dtmf", help="Key pressed after the last turn")
+    parser.add_argument("--save", help="Write the received reply audio to this WAV file")
+    args = parser.parse_args()
+
+    turns = asyncio.run(simulate(args.url, args.files, args.speed, args.gap, args.dtmf, args.save))
+    print(json.dumps(turns, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,174 @@
+# multilingual_retriever.py
+"""
+Keyword retrieval over the scheme catalog for the IVR
+
+The catalog is loaded once and re-read only when the file changes
+(mtime/size). Loading builds an inverted index over scheme name, intent
+and disasters, so a lookup only touches the postings of the query words
+and returns the top_k schemes by BM25 score.
+
+Farmers speak Hindi while the catalog is in English, so query words and
+the detected intent are mapped to catalog vocabulary first.
+"""
+import heapq
 import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+DATA_PATH = os.getenv(
+    "KM_R2_SCHEMES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "uttarakhand_schemes.json")
+)
+
+# Hindi words (or word stems) -> catalog terms
+HINDI_TERMS = {
+    "बाढ़": ["flood"],
+    "सूखा": ["drought"],
+    "सूखे": ["drought"],
+    "ओला": ["hailstorm"],
+    "ओले": ["hailstorm"],
+    "भूस्खलन": ["landslide"],
+    "तूफान": ["cyclone"],
+    "चक्रवात": ["cyclone"],
+    "कीट": ["pest"],
+    "कीड़": ["pest"],
+    "रोग": ["disease"],
+    "बीमारी": ["disease"],
+    "फसल": ["crop", "fasal"],
+    "बीमा": ["insurance", "bima"],
+    "ऋण": ["credit", "loan"],
+    "लोन": ["credit", "loan"],
+    "कर्ज": ["credit", "loan"],
+    "पेंशन": ["pension"],
+    "सिंचाई": ["irrigation", "sinchai"],
+    "पानी": ["irrigation", "water"],
+    "मिट्टी": ["soil"],
+    "जैविक": ["organic"],
+    "प्राकृतिक": ["natural"],
+    "मशीन": ["mechanization"],
+    "ट्रैक्टर": ["mechanization"],
+    "यंत्र": ["mechanization"],
+    "डिजिटल": ["digital"],
+    "गोदाम": ["infrastructure"],
+    "भंडारण": ["infrastructure"],
+    "सम्मान": ["samman"],
+    "निधि": ["nidhi"],
+    "आय": ["income"],
+    "पोषण": ["nutrition"],
+    "खाद्य": ["food"],
+    "प्रशिक्षण": ["extension"],
+}
+
+# detect_intent labels -> catalog terms
+INTENT_TERMS = {
+    "crop_loss": ["crop", "insurance"],
+    "insurance": ["insurance", "bima"],
+    "loan": ["credit", "loan"],
+    "subsidy": ["development", "mechanization", "infrastructure"],
+    "general_query": [],
+}
+
+# Words with Devanagari vowel signs stay whole (danda and double danda split)
+_TOKEN = re.compile(r"[\w\u0900-\u0963\u0966-\u097f]+")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower().replace("_", " "))
+
+
+def _scheme_terms(scheme: Dict) -> List[str]:
+    """Indexed terms of a scheme (the name counts twice)"""
+    name = tokenize(scheme.get("scheme_name") or scheme.get("name", ""))
+    disasters = scheme.get("allowed_disasters") or []
+    if isinstance(disasters, str):
+        disasters = disasters.split(",")
+    return name * 2 + tokenize(scheme.get("intent", "")) + tokenize(" ".join(disasters))
+
+
+def query_terms(query: str, intent: Optional[str] = None) -> List[str]:
+    """Query words plus their catalog translations and the intent's terms"""
+    terms = []
+    for token in tokenize(query):
+        terms.append(token)
+        for word, mapped in HINDI_TERMS.items():
+            if token.startswith(word):
+                terms.extend(mapped)
+    if intent:
+        terms.extend(INTENT_TERMS.get(intent, tokenize(intent)))
+    return terms
+
+
+class SchemeIndex:
+    """Inverted index with BM25 scoring over a scheme list"""
+
+    def __init__(self, schemes: List[Dict]):
+        self.schemes = schemes
+        # term -> [(scheme position, term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for position, scheme in enumerate(schemes):
+            counts = Counter(_scheme_terms(scheme))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((position, tf))
+
+        n = len(schemes)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, terms: List[str], top_k: int = 3) -> List[Tuple[float, int]]:
+        """(score, position) of the best matches, highest first"""
+        scores: Dict[int, float] = {}
+        for term, qtf in Counter(terms).items():
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf[term]
+            for position, tf in posting:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[position] / self.avg_length)
+                scores[position] = scores.get(position, 0.0) + qtf * idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        # Ties keep catalog order
+        best = heapq.nlargest(top_k, ((score, -position) for position, score in scores.items()))
+        return [(score, -negated) for score, negated in best]
+
 
-DATA_PATH = r"data\uttarakhand_schemes.json"
+_index_lock = threading.Lock()
+_index: Optional[SchemeIndex] = None
+_index_key: Optional[Tuple] = None
 
-def load_schemes():
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
 
-def retrieve_schemes(query: str, intent: str, top_k: int = 3):
-    schemes = load_schemes()
-    results = []
+def get_index(path: str = DATA_PATH) -> SchemeIndex:
+    """Index of the catalog file, rebuilt only when the file changed"""
+    global _index, _index_key
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key != _index_key:
+        with _index_lock:
+            if key != _index_key:
+                with open(path, "r", encoding="utf-8") as f:
+                    _index = SchemeIndex(json.load(f))
+                _index_key = key
+                print(f" Loaded {len(_index.schemes)} schemes from {path}")
+    return _index
 
-    query_words = query.lower().split()
 
-    for scheme in schemes:
-        text = (
-            scheme.get("name", "") +
-            scheme.get("description", "") +
-            scheme.get("category", "")
-        ).lower()
+def load_schemes() -> List[Dict]:
+    return get_index().schemes
 
-        if intent in text or any(w in text for w in query_words):
-            results.append(scheme)
 
-    return results[:top_k]
+def retrieve_schemes(query: str, intent: str, top_k: int = 3) -> List[Dict]:
+    """Top_k schemes for the query, best first (only schemes matching a query term)"""
+    index = get_index()
+    return [dict(index.schemes[position]) for _, position in index.search(query_terms(query, intent), top_k)]
@@ -1,85 +1,359 @@
+# ollama_llm.py
+"""
+Mistral via the local Ollama HTTP API
 
+One pooled keep-alive connection per process (sync and async), the model
+kept resident with keep_alive, and tokens streamed as they are generated.
 
-# ollama_llm.py
-import subprocess
+Environment:
+    OLLAMA_HOST          server URL (default http://127.0.0.1:11434);
+                         point it at fake_ollama.py for tests
+    KM_OLLAMA_MODEL      model name (default mistral)
+    KM_OLLAMA_KEEP_ALIVE how long Ollama keeps the model loaded (default 30m)
+    KM_OLLAMA_TIMEOUT    seconds to wait for the next token (default 120)
 
-def call_mistral(text: str) -> str:
-    """
-    Call Ollama Mistral locally via CLI (UTF-8 safe, Windows compatible)
+Answers are reused for similar questions with the same schemes
+(semantic_cache.py):
+    KM_LLM_CACHE            0 disables the cache (default 1)
+    KM_LLM_CACHE_PATH       persistence file (default cache/llm_answers.npz)
+    KM_LLM_CACHE_SIZE       maximum cached answers (default 2048)
+    KM_LLM_CACHE_THRESHOLD  minimum cosine similarity for a hit
+    KM_LLM_CACHE_EMBEDDER   minilm (default) or ngram
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from semantic_cache import SemanticAnswerCache
+from prompt_builder import PROMPT_VERSION, build_prompt_parts, prompt_stats
+from llm_scheduler import BATCH, IVR, WEB, scheduler, template_answer
+
+
+ERROR_REPLY = "माफ़ कीजिए, अभी उत्तर नहीं दे पा रहा हूँ।"
+EMPTY_QUERY_REPLY = "Sorry, I could not understand."
+
+
+class OllamaClient:
     """
+    Ollama /api/generate client over persistent pooled connections
 
-    if not text or not text.strip():
-        return "Sorry, I could not understand."
+    Args:
+        base_url: Ollama server URL
+        model: Model name
+        keep_alive: Ollama keep_alive (e.g. "30m", "-1" to never unload)
+        timeout: Read timeout between streamed chunks (s)
+        options: Extra Ollama generation options (temperature, num_ctx, ...)
+    """
 
-    try:
-        # Run Ollama with UTF-8 safe input
-        result = subprocess.run(
-            ["ollama", "run", "mistral"],
-            input=text,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",   # 🔑 Fix Unicode (Hindi)
-            errors="ignore",
-            check=True
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        keep_alive: Optional[str] = None,
+        timeout: Optional[float] = None,
+        options: Optional[Dict] = None,
+    ):
+        self.base_url = (base_url or os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")).rstrip("/")
+        if "://" not in self.base_url:
+            self.base_url = "http://" + self.base_url
+        self.model = model or os.getenv("KM_OLLAMA_MODEL", "mistral")
+        self.keep_alive = keep_alive or os.getenv("KM_OLLAMA_KEEP_ALIVE", "30m")
+        self.timeout = httpx.Timeout(
+            timeout or float(os.getenv("KM_OLLAMA_TIMEOUT", "120")),
+            connect=5.0
         )
+        self.options = options or {}
+        self.limits = httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=300)
 
-        response = result.stdout.strip()
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
 
-        if not response:
-            return "Sorry, I could not generate a response."
+        # Timing/token counts reported by Ollama for the last finished call
+        self.last_stats: Dict = {}
 
-        return response
+    # Connections
 
-    except subprocess.CalledProcessError as e:
-        print("❌ Ollama runtime error:", e.stderr)
-        return "Sorry, there was an error running the model."
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
 
-    except FileNotFoundError:
-        return "Ollama is not installed or not in PATH."
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._async_client
 
-    except Exception as e:
-        print("❌ Unexpected Ollama error:", e)
-        return "Sorry, I could not process your request."
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
 
-# ollama_llm.py
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
 
-import subprocess
-
-def call_mistral(user_query: str, schemes: list) -> str:
-    context = ""
-    for s in schemes:
-        context += f"""
-योजना: {s.get('name')}
-विवरण: {s.get('description')}
-पात्रता: {s.get('eligibility')}
-लाभ: {s.get('benefits')}
-\n
-"""
+    # Requests
 
-    prompt = f"""
-आप एक भारतीय कृषि सहायक AI हैं।
-केवल नीचे दी गई सरकारी योजनाओं की जानकारी के आधार पर उत्तर दें।
+    def _payload(self, prompt: str, stream: bool = True, options: Optional[Dict] = None) -> Dict:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {**self.options, **(options or {})},
+        }
 
-{context}
+    def _chunk_text(self, line: str, stats: Optional[Dict] = None) -> str:
+        """Token text of one NDJSON line (records stats on the final line)"""
+        if not line:
+            return ""
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise RuntimeError(chunk["error"])
+        if chunk.get("done"):
+            self.last_stats = {
+                key: chunk[key]
+                for key in ("prompt_eval_count", "prompt_eval_duration", "eval_count",
+                            "eval_duration", "load_duration", "total_duration")
+                if key in chunk
+            }
+            if stats is not None:
+                stats.update(self.last_stats)
+        return chunk.get("response", "")
 
-किसान का प्रश्न:
-{user_query}
+    def stream(self, prompt: str, options: Optional[Dict] = None, stats: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Yield response text pieces as Ollama generates them
 
-सरल हिंदी में उत्तर दें।
-"""
+        Args:
+            stats: Filled with this call's Ollama timings/token counts
+        """
+        with self.client.stream("POST", "/api/generate", json=self._payload(prompt, options=options)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                text = self._chunk_text(line, stats)
+                if text:
+                    yield text
+
+    def generate(self, prompt: str, options: Optional[Dict] = None, stats: Optional[Dict] = None) -> str:
+        return "".join(self.stream(prompt, options=options, stats=stats)).strip()
+
+    async def astream(self, prompt: str, options: Optional[Dict] = None, stats: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Async version of stream()"""
+        async with self.async_client.stream(
+            "POST", "/api/generate", json=self._payload(prompt, options=options)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                text = self._chunk_text(line, stats)
+                if text:
+                    yield text
+
+    async def agenerate(self, prompt: str, options: Optional[Dict] = None, stats: Optional[Dict] = None) -> str:
+        return "".join([piece async for piece in self.astream(prompt, options=options, stats=stats)]).strip()
+
+    def warmup(self) -> bool:
+        """Load the model into memory (an empty prompt only loads it)"""
+        try:
+            response = self.client.post("/api/generate", json={"model": self.model, "keep_alive": self.keep_alive})
+            response.raise_for_status()
+            print(f"✅ Ollama model '{self.model}' loaded (keep_alive={self.keep_alive})")
+            return True
+        except Exception as e:
+            print(f"❌ Ollama warmup failed: {e}")
+            return False
+
+
+_ollama_client: Optional[OllamaClient] = None
+
+
+def get_ollama_client() -> OllamaClient:
+    """Process-wide client, created on first use"""
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = OllamaClient()
+    return _ollama_client
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_disabled = os.getenv("KM_LLM_CACHE", "1") == "0"
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """
+    Process-wide semantic answer cache
+
+    None when KM_LLM_CACHE=0, or when the cache could not be built (it is
+    then not retried, and answers are generated uncached).
+    """
+    global _answer_cache, _answer_cache_disabled
+    if _answer_cache is None and not _answer_cache_disabled:
+        with _answer_cache_lock:
+            if _answer_cache is None and not _answer_cache_disabled:
+                try:
+                    threshold = os.getenv("KM_LLM_CACHE_THRESHOLD")
+                    _answer_cache = SemanticAnswerCache(
+                        threshold=float(threshold) if threshold else None,
+                        max_entries=int(os.getenv("KM_LLM_CACHE_SIZE", "2048")),
+                        path=os.getenv("KM_LLM_CACHE_PATH", os.path.join("cache", "llm_answers.npz")),
+                    )
+                except Exception as e:
+                    print(f"❌ LLM answer cache disabled: {e}")
+                    _answer_cache_disabled = True
+    return _answer_cache
+
+
+def _cache_key(schemes: Optional[List[Dict]]):
+    """(scheme IDs, namespace) an answer depends on besides the query"""
+    scheme_ids = [s.get("scheme_id") or s.get("scheme_name") or s.get("name") for s in schemes or []]
+    return scheme_ids, f"{get_ollama_client().model}/prompt-v{PROMPT_VERSION}"
+
+
+def cached_answer(user_query: str, schemes: Optional[List[Dict]] = None):
+    """
+    Look up a cached answer
 
+    Never raises: a cache fault is a miss.
+
+    Returns:
+        (answer or None, embedding to store the new answer with)
+    """
     try:
-        result = subprocess.run(
-            ["ollama", "run", "mistral"],
-            input=prompt,
-            capture_output=True,
-            text=True,
-            encoding="utf-8"
-        )
-        return result.stdout.strip()
+        cache = get_answer_cache()
+        if cache is None:
+            return None, None
+        scheme_ids, namespace = _cache_key(schemes)
+        embedding = cache.embed(user_query)
+        return cache.lookup(user_query, scheme_ids, namespace, embedding=embedding), embedding
+    except Exception as e:
+        print(f"❌ LLM cache lookup failed: {e}")
+        return None, None
+
 
+def remember_answer(user_query: str, schemes: Optional[List[Dict]], answer: str, embedding=None):
+    """Store a generated answer (never raises)"""
+    try:
+        cache = get_answer_cache()
+        if cache is None or not answer or answer == ERROR_REPLY:
+            return
+        scheme_ids, namespace = _cache_key(schemes)
+        cache.store(user_query, scheme_ids, answer, namespace, embedding=embedding)
+    except Exception as e:
+        print(f"❌ LLM cache store failed: {e}")
+
+
+def call_mistral(user_query: str, schemes: Optional[List[Dict]] = None, priority: int = BATCH) -> str:
+    """
+    Args:
+        priority: llm_scheduler class (IVR / WEB / BATCH); past the class
+            deadline a template answer is returned instead
+    """
+    if not user_query or not user_query.strip():
+        return EMPTY_QUERY_REPLY
+
+    def generate():
+        parts, stats = build_prompt_parts(user_query, schemes), {}
+        response = get_ollama_client().generate(parts["prompt"], stats=stats)
+        prompt_stats.record(parts, stats)
+        remember_answer(user_query, schemes, response, embedding)
+        return response
+
+    try:
+        answer, embedding = cached_answer(user_query, schemes)
+        if answer is not None:
+            return answer
+        response = scheduler.run_sync(generate, lambda: template_answer(user_query, schemes), priority)
+        return response or ERROR_REPLY
+    except httpx.ConnectError:
+        print("❌ Ollama is not running at", get_ollama_client().base_url)
+        return ERROR_REPLY
     except Exception as e:
         print("❌ Ollama error:", e)
-        return "माफ़ कीजिए, अभी उत्तर नहीं दे पा रहा हूँ।"
+        return ERROR_REPLY
 
 
+async def acall_mistral(user_query: str, schemes: Optional[List[Dict]] = None, priority: int = WEB) -> str:
+    """call_mistral without blocking the event loop"""
+    if not user_query or not user_query.strip():
+        return EMPTY_QUERY_REPLY
+
+    async def generate():
+        parts, stats = build_prompt_parts(user_query, schemes), {}
+        response = await get_ollama_client().agenerate(parts["prompt"], stats=stats)
+        prompt_stats.record(parts, stats)
+        await asyncio.to_thread(remember_answer, user_query, schemes, response, embedding)
+        return response
+
+    try:
+        answer, embedding = await asyncio.to_thread(cached_answer, user_query, schemes)
+        if answer is not None:
+            return answer
+        response = await scheduler.run(generate, lambda: template_answer(user_query, schemes), priority)
+        return response or ERROR_REPLY
+    except httpx.ConnectError:
+        print("❌ Ollama is not running at", get_ollama_client().base_url)
+        return ERROR_REPLY
+    except Exception as e:
+        print("❌ Ollama error:", e)
+        return ERROR_REPLY
+
+
+async def astream_mistral(
+    user_query: str,
+    schemes: Optional[List[Dict]] = None,
+    priority: int = IVR
+) -> AsyncIterator[str]:
+    """
+    Stream the answer as it is generated
+
+    Yields the error reply instead if Ollama fails before producing text,
+    and the template answer if the scheduler deadline can't be met.
+    """
+    if not user_query or not user_query.strip():
+        yield EMPTY_QUERY_REPLY
+        return
+
+    try:
+        answer, embedding = await asyncio.to_thread(cached_answer, user_query, schemes)
+    except Exception as e:
+        print(f"❌ LLM cache lookup failed: {e}")
+        answer, embedding = None, None
+    if answer is not None:
+        yield answer
+        return
+
+    pieces, fell_back = [], []
+    parts, stats = build_prompt_parts(user_query, schemes), {}
+
+    def fallback():
+        fell_back.append(True)
+        return template_answer(user_query, schemes)
+
+    try:
+        async for piece in scheduler.stream(
+            lambda: get_ollama_client().astream(parts["prompt"], stats=stats), fallback, priority
+        ):
+            pieces.append(piece)
+            yield piece
+    except Exception as e:
+        print("❌ Ollama error:", e)
+        if not pieces:
+            yield ERROR_REPLY
+        return
+    if fell_back:
+        return
+    try:
+        prompt_stats.record(parts, stats)
+        await asyncio.to_thread(remember_answer, user_query, schemes, "".join(pieces).strip(), embedding)
+    except Exception as e:
+        print(f"❌ LLM cache store failed: {e}")
@@ -0,0 +1,222 @@
+# prompt_builder.py
+"""
+Token-budgeted prompts for Mistral
+
+Layout (most constant first, so Ollama can reuse the KV cache of the
+shared prefix across calls and only prefill what changed):
+
+    SYSTEM_PREFIX        identical for every call
+    scheme context       ranked, trimmed to the remaining token budget
+    farmer's question    last
+
+On CPU, prefill time grows roughly linearly with the tokens that have to
+be evaluated. The prefix is reused, so KM_PROMPT_TOKEN_BUDGET (default
+512) caps what is new on every call: scheme context plus question.
+"""
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+# Bump when SYSTEM_PREFIX or the context format changes (cached answers
+# built from an older prompt are not reused)
+PROMPT_VERSION = "2"
+
+SYSTEM_PREFIX = """आप किसान मित्र हैं, उत्तराखंड के किसानों के लिए एक कृषि सहायक।
+नियम:
+- केवल नीचे दी गई सरकारी योजनाओं की जानकारी के आधार पर उत्तर दें।
+- सरल हिंदी में, छोटे वाक्यों में, अधिकतम पाँच वाक्यों में उत्तर दें।
+- सबसे उपयुक्त योजना पहले बताएं, फिर आवेदन के लिए ज़रूरी दस्तावेज़।
+- जानकारी न हो तो नजदीकी कृषि कार्यालय से संपर्क करने को कहें।
+योजना का प्रारूप: नाम | उद्देश्य | आयु | किन आपदाओं में | ज़रूरी जानकारी | वेबसाइट
+"""
+
+CONTEXT_HEADER = "\nयोजनाएं:\n"
+QUESTION_HEADER = "\nकिसान का प्रश्न:\n"
+ANSWER_CUE = "\nउत्तर:"
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("KM_PROMPT_TOKEN_BUDGET", "512"))
+
+# Query words that are too common to say anything about scheme relevance
+_STOPWORDS = {"के", "की", "का", "में", "से", "है", "हैं", "और", "को", "मेरी", "मेरा", "क्या", "कैसे", "लिए", "the", "a", "for", "my", "is"}
+
+
+class TokenEstimator:
+    """
+    Prompt token estimate without a tokenizer
+
+    Mistral's vocabulary has few Devanagari pieces, so Hindi costs far
+    more tokens per character than English.
+    """
+
+    def __init__(self, ascii_chars_per_token: float = 4.0, tokens_per_other_char: float = 1.5):
+        self.ascii_chars_per_token = ascii_chars_per_token
+        self.tokens_per_other_char = tokens_per_other_char
+
+    def estimate(self, text: str) -> int:
+        ascii_chars = sum(1 for c in text if ord(c) < 128)
+        other_chars = len(text) - ascii_chars
+        return int(math.ceil(ascii_chars / self.ascii_chars_per_token + other_chars * self.tokens_per_other_char))
+
+
+estimator = TokenEstimator()
+
+
+def _listing(value) -> str:
+    if isinstance(value, str):
+        value = value.split(",")
+    return ", ".join(v.strip() for v in value or [] if v and v.strip())
+
+
+def scheme_line(scheme: Dict, full: bool = True) -> str:
+    """One context line from catalog fields (short form: name + website)"""
+    name = scheme.get("scheme_name") or scheme.get("name") or scheme.get("scheme_id", "")
+    url = scheme.get("official_url", "")
+    if not full:
+        return f"- {name} | {url}" if url else f"- {name}"
+
+    parts = [name, scheme.get("intent", "").replace("_", " ")]
+    if "min_age" in scheme or "max_age" in scheme:
+        parts.append(f"{scheme.get('min_age', 0)}-{scheme.get('max_age', 99)} वर्ष")
+    elif scheme.get("age_eligibility"):
+        parts.append(scheme["age_eligibility"])
+    parts.append(_listing(scheme.get("allowed_disasters")))
+    parts.append(_listing(scheme.get("required_fields")))
+    parts.append(url)
+    return "- " + " | ".join(p for p in parts if p)
+
+
+def _terms(text: str) -> set:
+    return {w for w in re.findall(r"\w+", text.lower().replace("_", " ")) if w not in _STOPWORDS}
+
+
+def rank_schemes(user_query: str, schemes: List[Dict]) -> List[Dict]:
+    """
+    Schemes most relevant to the question first
+
+    Score is the overlap of query words with the scheme's name, intent and
+    disasters; ties keep the retriever's order.
+    """
+    query_terms = _terms(user_query)
+
+    def score(item):
+        position, scheme = item
+        text = " ".join([
+            scheme.get("scheme_name") or scheme.get("name") or "",
+            scheme.get("intent", ""),
+            _listing(scheme.get("allowed_disasters")),
+        ])
+        return (-len(query_terms & _terms(text)), position)
+
+    return [scheme for _, scheme in sorted(enumerate(schemes), key=score)]
+
+
+def build_prompt_parts(
+    user_query: str,
+    schemes: Optional[List[Dict]] = None,
+    token_budget: Optional[int] = None
+) -> Dict:
+    """
+    Build the prompt with context + question within a token budget
+
+    The highest-ranked schemes get a full line; once those no longer fit,
+    the rest get name-only lines, then are dropped.
+
+    Returns:
+        {"prompt", "tokens": {prefix, context, query, total}, "schemes_full",
+         "schemes_short", "schemes_dropped"}
+    """
+    budget = token_budget or DEFAULT_TOKEN_BUDGET
+    query_text = QUESTION_HEADER + user_query.strip() + ANSWER_CUE
+
+    prefix_tokens = estimator.estimate(SYSTEM_PREFIX)
+    query_tokens = estimator.estimate(query_text)
+    remaining = budget - query_tokens - estimator.estimate(CONTEXT_HEADER)
+
+    lines, full, short = [], 0, 0
+    ranked = rank_schemes(user_query, schemes or [])
+    for scheme in ranked:
+        line = scheme_line(scheme) + "\n"
+        cost = estimator.estimate(line)
+        if short == 0 and cost <= remaining:
+            full += 1
+        else:
+            line = scheme_line(scheme, full=False) + "\n"
+            cost = estimator.estimate(line)
+            if cost > remaining:
+                break
+            short += 1
+        lines.append(line)
+        remaining -= cost
+
+    context = CONTEXT_HEADER + "".join(lines) if lines else ""
+    context_tokens = estimator.estimate(context) if context else 0
+    return {
+        "prompt": SYSTEM_PREFIX + context + query_text,
+        "tokens": {
+            "prefix": prefix_tokens,
+            "context": context_tokens,
+            "query": query_tokens,
+            "total": prefix_tokens + context_tokens + query_tokens,
+        },
+        "schemes_full": full,
+        "schemes_short": short,
+        "schemes_dropped": len(ranked) - full - short,
+    }
+
+
+def build_prompt(user_query: str, schemes: Optional[List[Dict]] = None, token_budget: Optional[int] = None) -> str:
+    return build_prompt_parts(user_query, schemes, token_budget)["prompt"]
+
+
+class PromptStats:
+    """
+    Estimated prompt tokens vs what Ollama actually prefilled
+
+    Ollama's prompt_eval_count leaves out prefix tokens reused from its
+    KV cache, so the gap between the two shows the prefix reuse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.estimated_tokens = 0
+        self.prompt_eval_count = 0
+        self.prompt_eval_seconds = 0.0
+        self.reported_calls = 0
+        self.schemes_dropped = 0
+
+    def record(self, parts: Dict, ollama_stats: Optional[Dict] = None):
+        estimated = parts["tokens"]["total"]
+        actual = (ollama_stats or {}).get("prompt_eval_count")
+        with self._lock:
+            self.calls += 1
+            self.estimated_tokens += estimated
+            self.schemes_dropped += parts["schemes_dropped"]
+            if actual:
+                self.reported_calls += 1
+                self.prompt_eval_count += actual
+                self.prompt_eval_seconds += ollama_stats.get("prompt_eval_duration", 0) / 1e9
+
+        print(
+            f"📋 Prompt ~{estimated} tokens (prefix {parts['tokens']['prefix']}, "
+            f"context {parts['tokens']['context']}, query {parts['tokens']['query']}; "
+            f"{parts['schemes_full']} full/{parts['schemes_short']} short/{parts['schemes_dropped']} dropped)"
+            + (f", Ollama prefilled {actual}" if actual else "")
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "prompt_version": PROMPT_VERSION,
+                "token_budget": DEFAULT_TOKEN_BUDGET,
+                "calls": self.calls,
+                "avg_estimated_tokens": round(self.estimated_tokens / self.calls, 1) if self.calls else None,
+                "avg_prompt_eval_count": round(self.prompt_eval_count / self.reported_calls, 1) if self.reported_calls else None,
+                "avg_prefill_ms": round(self.prompt_eval_seconds / self.reported_calls * 1000, 1) if self.reported_calls else None,
+                "schemes_dropped": self.schemes_dropped,
+            }
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,134 @@
+# recording_fetch.py
+"""
+Async download of Twilio call recordings
+
+One pooled keep-alive HTTP client shared by all calls; the body is
+streamed into memory (no temp file) and handed to the decoder.
+
+Twilio sometimes answers 404 for a few hundred milliseconds after the
+recording webhook fires, until the recording is finalized, so 404, 429,
+5xx and network errors are retried with exponential backoff.
+
+Environment:
+    KM_RECORDING_TIMEOUT    seconds per attempt (default 10)
+    KM_RECORDING_RETRIES    retries after the first attempt (default 4)
+    KM_RECORDING_BACKOFF    first retry delay in seconds, doubled each time (default 0.25)
+    KM_RECORDING_MAX_BYTES  largest accepted recording (default 10 MB)
+
+Any URL works, so tests can point RecordingUrl at a local server
+(e.g. loadtest.RecordingServer).
+"""
+import asyncio
+import os
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+RETRY_STATUSES = {404, 408, 429, 500, 502, 503, 504}
+
+
+class RecordingFetchError(Exception):
+    """The recording could not be downloaded"""
+
+
+class RecordingFetcher:
+    """
+    Args:
+        timeout: Seconds per attempt
+        retries: Retries after the first attempt
+        backoff: First retry delay (s), doubled on each retry
+        max_bytes: Largest accepted body
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.timeout = httpx.Timeout(timeout or float(os.getenv("KM_RECORDING_TIMEOUT", "10")), connect=3.0)
+        self.retries = retries if retries is not None else int(os.getenv("KM_RECORDING_RETRIES", "4"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("KM_RECORDING_BACKOFF", "0.25"))
+        self.max_bytes = max_bytes or int(os.getenv("KM_RECORDING_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.limits = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60)
+
+        # Twilio credentials, only ever sent to Twilio hosts
+        sid, token = os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN")
+        self.twilio_auth = (sid, token) if sid and token else None
+
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, follow_redirects=True)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _auth(self, url: str):
+        host = urlparse(url).hostname or ""
+        if self.twilio_auth and (host == "twilio.com" or host.endswith(".twilio.com")):
+            return self.twilio_auth
+        return None
+
+    async def _download(self, url: str) -> bytes:
+        async with self.client.stream("GET", url, auth=self._auth(url)) as response:
+            if response.status_code != 200:
+                raise httpx.HTTPStatusError(
+                    f"HTTP {response.status_code}", request=response.request, response=response
+                )
+            length = int(response.headers.get("Content-Length") or 0)
+            if length > self.max_bytes:
+                raise RecordingFetchError(f"recording too large ({length} bytes)")
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > self.max_bytes:
+                    raise RecordingFetchError(f"recording larger than {self.max_bytes} bytes")
+            return bytes(body)
+
+    async def fetch(self, url: str) -> bytes:
+        """
+        Download a recording into memory
+
+        Raises:
+            RecordingFetchError: after the last failed attempt
+        """
+        if not url:
+            raise RecordingFetchError("no recording URL")
+
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._download(url)
+            except httpx.HTTPStatusError as e:
+                error = e
+                if e.response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt < self.retries:
+                print(f"⚠️ Recording not ready ({error}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        raise RecordingFetchError(f"could not download recording: {error}")
+
+
+_fetcher: Optional[RecordingFetcher] = None
+
+
+def get_recording_fetcher() -> RecordingFetcher:
+    """Process-wide fetcher, created on first use"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = RecordingFetcher()
+    return _fetcher
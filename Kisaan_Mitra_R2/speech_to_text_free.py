@@ -1,87 +1,173 @@
 # speech_to_text_free.py
-'''
-import whisper
-import torch
-import librosa
+"""
+Local speech-to-text for the R2 apps
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"🎤 STT using device: {device}")
+One module, pluggable backend (KM_STT_BACKEND):
+    faster-whisper  CTranslate2 Whisper, int8 on CPU (default)
+    openai-whisper  original torch Whisper (fp16 only on CUDA)
 
-whisper_model = None
+Environment:
+    KM_STT_MODEL         model size / name (default medium)
+    KM_STT_COMPUTE_TYPE  faster-whisper compute type (default int8)
+    KM_STT_THREADS       CPU threads per transcription (default 0 = library default)
+    KM_STT_BEAM_SIZE     beam size (default 1, greedy)
+    KM_STT_WORKERS       transcriptions running at once (default 1)
 
-def load_whisper():
-    global whisper_model
-    if whisper_model is None:
-        print("⏳ Loading Whisper LARGE-V3...")
-        whisper_model = whisper.load_model("large-v3", device=device)
-    return whisper_model
+The model is loaded once, by warmup() at startup or on first use, and
+transcription runs in a worker thread so the event loop keeps serving
+other calls. Audio is decoded in-process (audio_decode.py) and handed to
+the model as a 16 kHz float32 array.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from audio_decode import decode_audio, decode_audio_file
+
+LANGUAGE = "hi"
+
+
+class FasterWhisperBackend:
+    """CTranslate2 Whisper (faster-whisper), quantized weights"""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str, compute_type: str, threads: int, beam_size: int):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.threads = threads
+        self.beam_size = beam_size
+        self.model = None
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        print(f"⏳ Loading faster-whisper {self.model_size} ({self.compute_type})...")
+        self.model = WhisperModel(
+            self.model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.threads,
+        )
+
+    def transcribe(self, audio) -> str:
+        """audio: file path or 16 kHz mono float32 array"""
+        segments, _ = self.model.transcribe(
+            audio,
+            language=LANGUAGE,
+            beam_size=self.beam_size,
+            temperature=0.0,
+            condition_on_previous_text=False,
+        )
+        return " ".join(segment.text.strip() for segment in segments if segment.text.strip())
+
+
+class OpenAIWhisperBackend:
+    """Original openai-whisper on torch"""
+
+    name = "openai-whisper"
+
+    def __init__(self, model_size: str, compute_type: str, threads: int, beam_size: int):
+        self.model_size = model_size
+        self.threads = threads
+        self.beam_size = beam_size
+        self.model = None
+        self.device = "cpu"
+
+    def load(self):
+        import torch
+        import whisper
+
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        print(f"⏳ Loading openai-whisper {self.model_size} on {self.device}...")
+        self.model = whisper.load_model(self.model_size, device=self.device)
+
+    def transcribe(self, audio) -> str:
+        result = self.model.transcribe(
+            audio,
+            language=LANGUAGE,
+            fp16=(self.device == "cuda"),
+            beam_size=self.beam_size if self.beam_size > 1 else None,
+        )
+        return result.get("text", "").strip()
 
-async def transcribe_audio_local(audio_path: str) -> str:
+
+BACKENDS = {
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("KM_STT_WORKERS", "1")), thread_name_prefix="stt")
+
+
+def get_backend():
+    """Configured backend with its model loaded (loads it on first call)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.getenv("KM_STT_BACKEND", FasterWhisperBackend.name)
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown KM_STT_BACKEND '{name}' (choose from {', '.join(BACKENDS)})")
+                backend = BACKENDS[name](
+                    model_size=os.getenv("KM_STT_MODEL", "medium"),
+                    compute_type=os.getenv("KM_STT_COMPUTE_TYPE", "int8"),
+                    threads=int(os.getenv("KM_STT_THREADS", "0")),
+                    beam_size=int(os.getenv("KM_STT_BEAM_SIZE", "1")),
+                )
+                backend.load()
+                _backend = backend
+                print(f"✅ STT ready: {backend.name} {backend.model_size}")
+    return _backend
+
+
+def warmup() -> bool:
+    """Load the model and run one short transcription so the first call is fast"""
+    try:
+        get_backend().transcribe(np.zeros(16000, dtype=np.float32))
+        return True
+    except Exception as e:
+        print(f"❌ STT warmup failed: {e}")
+        return False
+
+
+def transcribe_sync(audio) -> str:
+    """Path, encoded bytes or 16 kHz float32 array -> text (blocking)"""
+    if isinstance(audio, str):
+        audio = decode_audio_file(audio)
+    elif isinstance(audio, (bytes, bytearray)):
+        audio = decode_audio(bytes(audio))
+    return get_backend().transcribe(audio)
+
+
+async def transcribe_audio(audio) -> Optional[str]:
     """
-    Transcribe audio using Whisper LARGE-V3
+    Transcribe in the STT worker thread (decoding included)
+
+    Args:
+        audio: File path, encoded bytes (WAV/μ-law/OGG...) or 16 kHz float32 array
+
+    Returns:
+        Text, or None on failure
     """
     try:
-        model = load_whisper()
-        print("🎤 Transcribing with Whisper LARGE-V3...")
-        result = model.transcribe(audio_path, language="hi", fp16=(device=="cuda"))
-        text = result.get("text", "").strip()
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(_executor, transcribe_sync, audio)
         print(f"✅ Transcribed Text: {text}")
         return text
     except Exception as e:
         print(f"❌ STT error: {e}")
         return None
-'''
-# Add at top of speech_to_text_free.py
-import subprocess
-import os
 
-async def convert_ogg_to_wav(ogg_path: str) -> str:
-    """Convert WhatsApp OGG to WAV for Whisper"""
-    wav_path = ogg_path.replace('.ogg', '.wav')
-    if os.path.exists(wav_path):
-        return wav_path
-    
-    cmd = [
-        'ffmpeg', '-i', ogg_path, 
-        '-ar', '16000', '-ac', '1', '-c:a', 'pcm_s16le',
-        wav_path, '-y'
-    ]
-    
-    try:
-        subprocess.run(cmd, check=True, capture_output=True)
-        print(f"✅ Converted {ogg_path} → {wav_path}")
-        return wav_path
-    except Exception as e:
-        print(f"❌ OGG conversion failed: {e}")
-        return ogg_path  # Fallback
-
-async def transcribe_audio_local(audio_path: str) -> str:
-    """Enhanced - handles OGG + WAV"""
-    # Convert OGG if needed
-    if audio_path.endswith('.ogg'):
-        audio_path = await convert_ogg_to_wav(audio_path)
-    
-    # Original Whisper code...
-    load_whisper()
-    result = whisper_model.transcribe(audio_path, language="hi")
-    return result["text"].strip()
-
-import whisper
-import torch
-
-device = "cuda" if torch.cuda.is_available() else "cpu"
-whisper_model = None
-
-def load_whisper():
-    global whisper_model
-    if whisper_model is None:
-        whisper_model = whisper.load_model("large-v3", device=device)
-
-async def transcribe_audio_local(audio_path: str) -> str:
-    load_whisper()
-    result = whisper_model.transcribe(
-        audio_path,
-        language="hi",
-        fp16=(device == "cuda")
-    )
-    return result["text"].strip()
+
+async def transcribe_audio_local(audio_path: str) -> Optional[str]:
+    """Transcribe a recording file (WAV, or WhatsApp OGG)"""
+    return await transcribe_audio(audio_path)
@@ -0,0 +1,113 @@
+# test_audio_decode.py
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from audio_decode import (
+    ALAW_TABLE, MULAW_TABLE, WAVE_FORMAT_ALAW, WAVE_FORMAT_MULAW,
+    decode_audio, decode_mulaw, encode_mulaw, read_wav, resample,
+)
+
+
+def pcm16_wav(samples: np.ndarray, rate: int, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def g711_wav(codes: bytes, format_tag: int, rate: int = 8000) -> bytes:
+    """WAV container around raw G.711 bytes (what Twilio sends)"""
+    fmt = struct.pack("<HHIIHHH", format_tag, 1, rate, rate, 1, 8, 0)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(codes)) + codes
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+def test_mulaw_table_known_codes():
+    assert MULAW_TABLE[0xFF] == 0.0
+    assert MULAW_TABLE[0x7F] == 0.0
+    assert MULAW_TABLE[0x00] == pytest.approx(-32124 / 32768)
+    assert MULAW_TABLE[0x80] == pytest.approx(32124 / 32768)
+
+
+def test_alaw_table_is_odd_symmetric():
+    assert ALAW_TABLE[0xD5] == pytest.approx(8 / 32768)
+    assert ALAW_TABLE[0x55] == pytest.approx(-8 / 32768)
+    assert np.all(np.abs(ALAW_TABLE) <= 1.0)
+
+
+def test_encode_mulaw_round_trips_every_code():
+    # Decoding then re-encoding a code gives the same code (0x7F is -0, encoded as +0)
+    codes = np.arange(256, dtype=np.uint8)
+    again = np.frombuffer(encode_mulaw(MULAW_TABLE[codes]), dtype=np.uint8)
+    expected = codes.copy()
+    expected[0x7F] = 0xFF
+    assert np.array_equal(again, expected)
+
+
+def test_encode_mulaw_clips_out_of_range():
+    codes = encode_mulaw(np.array([2.0, -2.0], dtype=np.float32))
+    assert codes == bytes([0x80, 0x00])
+
+
+def test_read_wav_pcm16_stereo():
+    left, right = np.full(100, 0.5), np.full(100, -0.25)
+    stereo = np.stack([left, right], axis=1).reshape(-1)
+    samples, rate = read_wav(pcm16_wav(stereo, 22050, channels=2))
+    assert rate == 22050
+    assert samples.shape == (100, 2)
+    assert samples[:, 0] == pytest.approx(0.5, abs=1e-4)
+    assert samples[:, 1] == pytest.approx(-0.25, abs=1e-4)
+
+
+def test_read_wav_mulaw_and_alaw():
+    codes = bytes(range(256))
+    samples, rate = read_wav(g711_wav(codes, WAVE_FORMAT_MULAW))
+    assert rate == 8000
+    assert np.array_equal(samples[:, 0], MULAW_TABLE)
+
+    samples, _ = read_wav(g711_wav(codes, WAVE_FORMAT_ALAW))
+    assert np.array_equal(samples[:, 0], ALAW_TABLE)
+
+
+def test_read_wav_skips_unknown_chunks():
+    data = g711_wav(b"\xff" * 10, WAVE_FORMAT_MULAW)
+    # Insert an odd-sized LIST chunk (padded) between the header and fmt
+    extra = b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+    data = data[:12] + extra + data[12:]
+    samples, _ = read_wav(data)
+    assert len(samples) == 10
+
+
+def test_read_wav_rejects_other_data():
+    with pytest.raises(ValueError):
+        read_wav(b"OggS" + b"\x00" * 40)
+    with pytest.raises(ValueError):
+        read_wav(b"RIFF\x04\x00\x00\x00WAVE")
+
+
+def test_decode_audio_resamples_8k_to_16k():
+    tone = 0.5 * np.sin(2 * np.pi * 440 * np.arange(8000) / 8000)
+    decoded = decode_audio(pcm16_wav(tone, 8000))
+    assert decoded.dtype == np.float32
+    assert len(decoded) == 16000
+    assert np.sqrt(np.mean(decoded[1000:-1000] ** 2)) == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+
+
+def test_decode_mulaw_raw_frames():
+    decoded = decode_mulaw(b"\xff" * 160)
+    assert len(decoded) == 320
+    assert np.all(decoded == 0.0)
+
+
+def test_resample_same_rate_is_passthrough():
+    samples = np.arange(10, dtype=np.float64)
+    out = resample(samples, 16000)
+    assert out.dtype == np.float32
+    assert np.array_equal(out, samples.astype(np.float32))
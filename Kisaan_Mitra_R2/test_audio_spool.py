@@ -0,0 +1,56 @@
+# test_audio_spool.py
+import os
+import time
+
+from audio_spool import AudioSpool
+
+
+def test_write_names_are_unique_and_safe(tmp_path):
+    spool = AudioSpool(str(tmp_path), quota_bytes=10_000)
+    first = spool.write(b"a", prefix="CA../12 34", suffix="mp3")
+    second = spool.write(b"b", prefix="CA../12 34", suffix="mp3")
+    assert first != second
+    assert os.path.dirname(first) == str(tmp_path)
+    assert os.path.basename(first).startswith("CA___12_34_") and first.endswith(".mp3")
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    spool = AudioSpool(str(tmp_path), quota_bytes=250)
+    old = spool.write(b"x" * 100)
+    used = spool.write(b"x" * 100)
+    time.sleep(0.01)
+    spool.touch(old)  # Now `used` is the least recently used
+    newest = spool.write(b"x" * 100)
+
+    assert os.path.exists(old) and os.path.exists(newest)
+    assert not os.path.exists(used)
+    stats = spool.stats()
+    assert stats["bytes_used"] == 200
+    assert stats["files_evicted"] == 1
+
+
+def test_sweep_expires_old_and_adopts_untracked_files(tmp_path):
+    spool = AudioSpool(str(tmp_path), ttl_seconds=60)
+    fresh = spool.write(b"fresh")
+
+    leftover = tmp_path / "converted.wav"
+    leftover.write_bytes(b"left over")
+    old = time.time() - 3600
+    os.utime(leftover, (old, old))
+
+    assert spool.sweep() == len(b"left over")
+    assert not leftover.exists()
+    assert os.path.exists(fresh)
+    assert spool.stats()["files_expired"] == 1
+
+
+def test_release_and_files_deleted_behind_its_back(tmp_path):
+    spool = AudioSpool(str(tmp_path))
+    kept, released = spool.write(b"12345"), spool.write(b"123")
+    assert spool.release(released) == 3
+    assert spool.release(None) == 0
+
+    os.remove(kept)
+    spool.sweep()
+    assert spool.stats()["files"] == 0
+    assert spool.stats()["bytes_used"] == 0
@@ -0,0 +1,75 @@
+# test_call_log.py
+import sqlite3
+import time
+
+from call_log import CallLogSink
+
+
+def entry(call_sid: str, choice: str, schemes, intent="crop_loss", disaster="flood", ts=None):
+    return {
+        "ts": ts or time.time(),
+        "call_sid": call_sid,
+        "phone": "anon",
+        "query": "फसल खराब",
+        "intent": intent,
+        "disaster": disaster,
+        "user_choice": choice,
+        "schemes": schemes,
+    }
+
+
+def test_batches_and_flushes_on_close(tmp_path):
+    sink = CallLogSink(path=str(tmp_path / "calls.db"), batch_size=50, flush_seconds=5)
+    for i in range(120):
+        assert sink.record(entry(f"CA{i}", "pending", ["PMFBY"]))
+    sink.close()
+
+    assert sink.written == 120
+    assert sink.batches == 3  # 50 + 50 + 20 written at close
+    with sqlite3.connect(sink.path) as db:
+        assert db.execute("SELECT COUNT(*) FROM calls").fetchone()[0] == 120
+        assert db.execute("SELECT COUNT(*) FROM call_schemes").fetchone()[0] == 120
+
+
+def test_partial_batch_written_after_flush_interval(tmp_path):
+    sink = CallLogSink(path=str(tmp_path / "calls.db"), batch_size=500, flush_seconds=0.05)
+    sink.record(entry("CA1", "pending", ["PMFBY"]))
+    deadline = time.monotonic() + 2
+    while sink.written == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.written == 1
+    sink.close()
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    sink = CallLogSink(path=str(tmp_path / "calls.db"), max_queue=1, flush_seconds=5)
+    results = [sink.record(entry(f"CA{i}", "pending", [])) for i in range(200)]
+    assert results.count(False) == sink.dropped > 0
+    sink.close()
+    assert sink.written + sink.dropped == 200
+    assert not sink.record(entry("late", "pending", []))  # Closed
+
+
+def test_summary_aggregates(tmp_path):
+    sink = CallLogSink(path=str(tmp_path / "calls.db"), flush_seconds=0.01)
+    sink.record(entry("CA1", "pending", ["PMFBY", "KCC"]))
+    sink.record(entry("CA1", "no", ["PMFBY"]))
+    sink.record(entry("CA1", "yes", ["KCC"]))
+    sink.record(entry("CA2", "pending", ["PMFBY"], intent="loan", disaster="unspecified"))
+    sink.record(entry("CA3", "pending", ["KCC"], ts=time.time() - 30 * 86400))  # Outside the window
+    sink.close()
+
+    summary = sink.summary(days=7)
+    [today] = summary["per_day"]
+    assert today["calls"] == 2
+    assert today["questions"] == 2
+    assert today["forms_accepted"] == 1
+    assert today["forms_declined"] == 1
+
+    assert {row["intent"]: row["questions"] for row in summary["per_intent"]} == {"crop_loss": 1, "loan": 1}
+    assert {row["disaster"]: row["questions"] for row in summary["per_disaster"]} == {"flood": 1, "unspecified": 1}
+
+    schemes = {row["scheme"]: row for row in summary["schemes"]}
+    assert (schemes["PMFBY"]["recommended"], schemes["PMFBY"]["offered"], schemes["PMFBY"]["accepted"]) == (2, 1, 0)
+    assert (schemes["KCC"]["recommended"], schemes["KCC"]["offered"], schemes["KCC"]["accepted"]) == (1, 1, 1)
+    assert summary["sink"]["written"] == 5
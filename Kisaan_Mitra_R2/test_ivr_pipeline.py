@@ -0,0 +1,157 @@
+# test_ivr_pipeline.py
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ivr_pipeline import ReplyRegistry, SpokenReply, lock_single_worker, sentences
+
+
+async def token_stream(tokens, delay: float = 0.0):
+    for token in tokens:
+        if delay:
+            await asyncio.sleep(delay)
+        yield token
+
+
+def collect_sentences(tokens, **kwargs):
+    async def run():
+        return [s async for s in sentences(token_stream(tokens), **kwargs)]
+    return asyncio.run(run())
+
+
+def test_sentences_cut_at_danda_and_punctuation():
+    tokens = ["पीएम किसान योजना ", "उपलब्ध है। आप आवेदन ", "कर सकते हैं। Apply at the ", "office today. Thanks"]
+    assert collect_sentences(tokens) == [
+        "पीएम किसान योजना उपलब्ध है।",
+        "आप आवेदन कर सकते हैं।",
+        "Apply at the office today.",
+        "Thanks",
+    ]
+
+
+def test_sentences_merge_short_fragments():
+    assert collect_sentences(["Yes. ", "The scheme covers floods. "]) == ["Yes. The scheme covers floods."]
+
+
+def test_sentences_cut_long_runs_at_a_space():
+    text = " ".join(["word"] * 40)
+    parts = collect_sentences([text], max_chars=50)
+    assert all(len(part) <= 50 for part in parts)
+    assert " ".join(parts) == text
+
+
+def test_sentences_keep_decimal_numbers_together():
+    assert collect_sentences(["Rs 2.5 lakh cover is given. "]) == ["Rs 2.5 lakh cover is given."]
+
+
+def test_next_segments_in_order_with_tts():
+    async def synthesize(text):
+        # Later sentences finish TTS first
+        await asyncio.sleep(0.05 if text.startswith("First") else 0.0)
+        return f"/audio/{text[:5]}.mp3"
+
+    async def run():
+        reply = SpokenReply(token_stream(["First sentence here. ", "Second sentence here. "]), synthesize=synthesize)
+        segments, finished = [], False
+        while not finished:
+            ready, finished = await reply.next_segments(1.0)
+            segments += ready
+        return segments
+
+    segments = asyncio.run(run())
+    assert [s["text"] for s in segments] == ["First sentence here.", "Second sentence here."]
+    assert segments[0]["audio_path"] == "/audio/First.mp3"
+
+
+def test_next_segments_times_out_empty():
+    async def run():
+        reply = SpokenReply(token_stream(["Slow answer arrives. "], delay=0.5))
+        first = await reply.next_segments(0.05)
+        reply.cancel()
+        return first
+
+    assert asyncio.run(run()) == ([], False)
+
+
+def test_tts_failure_falls_back_to_say():
+    async def synthesize(text):
+        raise RuntimeError("tts down")
+
+    async def run():
+        reply = SpokenReply(token_stream(["Only one sentence. "]), synthesize=synthesize)
+        segments, finished = await reply.next_segments(1.0)
+        if not finished:
+            _, finished = await reply.next_segments(1.0)
+        return segments, finished
+
+    segments, finished = asyncio.run(run())
+    assert segments == [{"text": "Only one sentence.", "audio_path": None}]
+    assert finished
+
+
+def test_registry_expiry_and_replacement_cancel_side_work():
+    async def run():
+        registry = ReplyRegistry(ttl_seconds=0.05)
+        first = registry.start("CA1", token_stream(["Never finishes. "], delay=10))
+        side = first.track(asyncio.create_task(asyncio.sleep(10)))
+
+        replacement = registry.start("CA1", token_stream(["New question. "]))
+        await asyncio.sleep(0)
+        assert side.cancelled() and registry.get("CA1") is replacement
+
+        other_side = replacement.track(asyncio.create_task(asyncio.sleep(10)))
+        await asyncio.sleep(0.1)
+        registry.start("CA2", token_stream(["Other call. "]))  # Expires CA1
+        await asyncio.sleep(0)
+        return registry, other_side
+
+    registry, other_side = asyncio.run(run())
+    assert registry.get("CA1") is None
+    assert other_side.cancelled()
+    assert len(registry) == 1
+
+
+def test_registry_finish_lets_side_work_complete():
+    async def run():
+        registry = ReplyRegistry()
+        reply = registry.start("CA1", token_stream(["Done. "]))
+        side = reply.track(asyncio.create_task(asyncio.sleep(0.05, result="offers")))
+        registry.finish("CA1")
+        result = await side
+        return registry, result
+
+    registry, result = asyncio.run(run())
+    assert result == "offers"
+    assert registry.get("CA1") is None
+    assert not registry._side_tasks
+
+
+def test_registry_finish_abandon_cancels_side_work():
+    async def run():
+        registry = ReplyRegistry()
+        reply = registry.start("CA1", token_stream(["Done. "]))
+        side = reply.track(asyncio.create_task(asyncio.sleep(10)))
+        registry.finish("CA1", abandon=True)
+        await asyncio.sleep(0)
+        return side
+
+    assert asyncio.run(run()).cancelled()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses fcntl locks")
+def test_lock_single_worker_refuses_a_second_process(tmp_path):
+    path = str(tmp_path / "locks" / "ivr.lock")
+    handle = lock_single_worker(path)
+    try:
+        code = f"from ivr_pipeline import lock_single_worker; lock_single_worker({path!r})"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True
+        )
+        assert result.returncode != 0
+        assert "single worker" in result.stderr
+    finally:
+        handle.close()
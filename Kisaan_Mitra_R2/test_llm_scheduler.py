@@ -0,0 +1,144 @@
+# test_llm_scheduler.py
+import asyncio
+import threading
+import time
+
+from llm_scheduler import BATCH, IVR, WEB, LLMScheduler, template_answer
+
+SCHEMES = [
+    {"scheme_name": "PMFBY", "required_fields": "aadhaar_number,land_record"},
+    {"scheme_name": "KCC"},
+]
+
+
+def test_template_answer():
+    answer = template_answer("फसल खराब", SCHEMES)
+    assert "2 योजनाएं" in answer and "PMFBY, KCC" in answer
+    assert "aadhaar number, land record" in answer
+    assert "कृषि कार्यालय" in template_answer("फसल खराब", [])
+
+
+def test_waiters_start_by_priority():
+    scheduler = LLMScheduler(concurrency=1)
+    order = []
+
+    async def job(name, seconds=0.01):
+        async def run():
+            await asyncio.sleep(seconds)
+            order.append(name)
+            return name
+        return await scheduler.run(run, lambda: "fallback", priority={"ivr": IVR, "web": WEB}.get(name, BATCH),
+                                   deadline_s=10)
+
+    async def main():
+        running = asyncio.create_task(job("first", 0.05))
+        await asyncio.sleep(0.01)
+        batch = asyncio.create_task(job("batch"))
+        await asyncio.sleep(0)
+        web = asyncio.create_task(job("web"))
+        await asyncio.sleep(0)
+        ivr = asyncio.create_task(job("ivr"))
+        return await asyncio.gather(running, batch, web, ivr)
+
+    assert asyncio.run(main()) == ["first", "batch", "web", "ivr"]
+    assert order == ["first", "ivr", "web", "batch"]
+    stats = scheduler.stats()
+    assert stats["running"] == 0 and stats["queue_depth"] == 0
+
+
+def test_missed_deadline_gets_the_template():
+    scheduler = LLMScheduler(concurrency=1)
+
+    async def slow():
+        await asyncio.sleep(0.3)
+        return "llm"
+
+    async def main():
+        busy = asyncio.create_task(scheduler.run(slow, lambda: "fallback", WEB, deadline_s=10))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        late = await scheduler.run(slow, lambda: "template", IVR, deadline_s=0.05)
+        waited = time.monotonic() - started
+        return await busy, late, waited
+
+    busy, late, waited = asyncio.run(main())
+    assert (busy, late) == ("llm", "template")
+    assert waited < 0.2  # Gave up at the deadline, not when the slot freed
+    assert scheduler.stats()["classes"]["ivr"]["deadline_missed"] == 1
+
+
+def test_expected_generation_time_counts_against_the_deadline():
+    scheduler = LLMScheduler(concurrency=1)
+    scheduler._observe("generate", 5.0)  # Generations take ~5 s
+
+    async def quick():
+        return "llm"
+
+    async def main():
+        blocker = asyncio.Event()
+
+        async def hold():
+            await blocker.wait()
+            return "held"
+
+        busy = asyncio.create_task(scheduler.run(hold, lambda: "fallback", BATCH, deadline_s=60))
+        await asyncio.sleep(0.01)
+        # Waiting with a 2 s deadline can't fit a 5 s generation: immediate fallback
+        started = time.monotonic()
+        answer = await scheduler.run(quick, lambda: "template", IVR, deadline_s=2)
+        blocker.set()
+        return answer, time.monotonic() - started, await busy
+
+    answer, waited, busy = asyncio.run(main())
+    assert answer == "template" and waited < 0.1 and busy == "held"
+
+
+def test_stream_holds_the_slot_and_falls_back():
+    scheduler = LLMScheduler(concurrency=1)
+
+    async def tokens():
+        for token in ["नमस्ते ", "किसान"]:
+            await asyncio.sleep(0.05)
+            yield token
+
+    async def collect(deadline_s):
+        return [t async for t in scheduler.stream(tokens, lambda: "template", IVR, deadline_s=deadline_s)]
+
+    async def main():
+        first = asyncio.create_task(collect(10))
+        await asyncio.sleep(0.01)
+        second = await collect(0.02)
+        return await first, second
+
+    first, second = asyncio.run(main())
+    assert first == ["नमस्ते ", "किसान"]
+    assert second == ["template"]
+
+
+def test_run_sync_limits_concurrency_across_threads():
+    scheduler = LLMScheduler(concurrency=2)
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def job():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return "ok"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(scheduler.run_sync(job, lambda: "fallback", BATCH, deadline_s=10)))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ok"] * 6
+    assert peak[0] == 2
+    assert scheduler.stats()["classes"]["batch"]["started"] == 6
@@ -0,0 +1,68 @@
+# test_media_stream.py
+import numpy as np
+
+from media_stream import FRAME_MS, SAMPLE_RATE, EnergyVAD, UtteranceDetector
+
+FRAME = SAMPLE_RATE * FRAME_MS // 1000  # 160 samples
+
+
+def frames(kind: str, seconds: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    level = 0.2 if kind == "speech" else 0.001
+    for _ in range(int(round(seconds * 1000 / FRAME_MS))):
+        yield (rng.normal(0, level, FRAME)).astype(np.float32)
+
+
+def run(detector: UtteranceDetector, pattern):
+    """Feed (kind, seconds) runs; returns [(event, seconds of audio or None), ...]"""
+    events = []
+    for i, (kind, seconds) in enumerate(pattern):
+        for frame in frames(kind, seconds, seed=i):
+            for event, samples in detector.push(frame):
+                events.append((event, None if samples is None else round(len(samples) / SAMPLE_RATE, 2)))
+    return events
+
+
+def detector(monkeypatch, **env) -> UtteranceDetector:
+    defaults = {"KM_STREAM_PHRASE_SILENCE_MS": "400", "KM_STREAM_MIN_PHRASE_S": "1.0",
+                "KM_STREAM_END_SILENCE_MS": "800", "KM_STREAM_MAX_UTTERANCE_S": "30"}
+    for key, value in {**defaults, **env}.items():
+        monkeypatch.setenv(key, value)
+    return UtteranceDetector(EnergyVAD(threshold=0.01))
+
+
+def test_vad_separates_speech_from_noise():
+    vad = EnergyVAD(threshold=0.01)
+    assert not any(vad.is_speech(f) for f in frames("silence", 0.5))
+    assert all(vad.is_speech(f) for f in frames("speech", 0.2))
+
+
+def test_single_phrase_utterance(monkeypatch):
+    events = run(detector(monkeypatch), [("silence", 0.5), ("speech", 1.5), ("silence", 1.0)])
+    assert [e for e, _ in events] == ["start", "phrase", "end"]
+    # Phrase closed by the short pause: pre-roll + speech + 400 ms of silence
+    assert 1.7 <= events[1][1] <= 2.2
+
+
+def test_pause_inside_utterance_splits_phrases(monkeypatch):
+    events = run(detector(monkeypatch), [("speech", 1.5), ("silence", 0.5), ("speech", 1.2), ("silence", 1.0)])
+    assert [e for e, _ in events] == ["start", "phrase", "phrase", "end"]
+
+
+def test_short_phrase_waits_for_more_speech(monkeypatch):
+    # 0.5 s of speech is under KM_STREAM_MIN_PHRASE_S: not cut at the first pause
+    events = run(detector(monkeypatch), [("speech", 0.5), ("silence", 0.5), ("speech", 1.2), ("silence", 1.0)])
+    assert [e for e, _ in events] == ["start", "phrase", "end"]
+
+
+def test_max_utterance_length(monkeypatch):
+    events = run(detector(monkeypatch, KM_STREAM_MAX_UTTERANCE_S="2"), [("speech", 3.0)])
+    assert ("end", None) in events
+    assert events.index(("end", None)) > 0
+
+
+def test_noise_blip_does_not_start(monkeypatch):
+    d = detector(monkeypatch)
+    events = run(d, [("silence", 0.5), ("speech", 0.02), ("silence", 0.5)])
+    assert events == []
+    assert not d.active
@@ -0,0 +1,119 @@
+# test_recording_fetch.py
+import asyncio
+
+import httpx
+import pytest
+
+from loadtest import RecordingServer
+from recording_fetch import RecordingFetchError, RecordingFetcher
+
+
+def fetcher_with(handler, **kwargs) -> RecordingFetcher:
+    """Fetcher whose HTTP client answers from `handler` (no network)"""
+    fetcher = RecordingFetcher(backoff=0.001, **kwargs)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+def fetch(fetcher: RecordingFetcher, url: str = "https://api.twilio.com/rec/RE1") -> bytes:
+    async def run():
+        try:
+            return await fetcher.fetch(url)
+        finally:
+            await fetcher.aclose()
+    return asyncio.run(run())
+
+
+def test_retries_until_the_recording_is_ready():
+    statuses = [404, 404, 503, 200]
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(statuses[len(calls) - 1], content=b"RIFFaudio")
+
+    assert fetch(fetcher_with(handler, retries=4)) == b"RIFFaudio"
+    assert len(calls) == 4
+
+
+def test_gives_up_after_the_last_retry():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(404)
+
+    with pytest.raises(RecordingFetchError):
+        fetch(fetcher_with(handler, retries=2))
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        return httpx.Response(401)
+
+    with pytest.raises(RecordingFetchError):
+        fetch(fetcher_with(handler, retries=4))
+    assert len(calls) == 1
+
+
+def test_network_errors_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, content=b"ok")
+
+    assert fetch(fetcher_with(handler, retries=1)) == b"ok"
+
+
+def test_size_cap_by_header_and_by_body():
+    def declared(request):
+        return httpx.Response(200, content=b"x" * 100)
+
+    with pytest.raises(RecordingFetchError, match="too large"):
+        fetch(fetcher_with(declared, retries=0, max_bytes=50))
+
+    async def chunks():
+        yield b"x" * 30
+        yield b"x" * 30
+
+    def streamed(request):
+        # No Content-Length: the cap applies while reading
+        return httpx.Response(200, content=chunks())
+
+    with pytest.raises(RecordingFetchError, match="larger than"):
+        fetch(fetcher_with(streamed, retries=0, max_bytes=50))
+
+
+def test_twilio_credentials_only_go_to_twilio(monkeypatch):
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "AC1")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "secret")
+    fetcher = RecordingFetcher()
+    assert fetcher._auth("https://api.twilio.com/2010-04-01/Recordings/RE1") == ("AC1", "secret")
+    assert fetcher._auth("https://twilio.com.example.org/rec") is None
+    assert fetcher._auth("http://127.0.0.1:8000/rec") is None
+
+
+def test_empty_url():
+    with pytest.raises(RecordingFetchError):
+        fetch(RecordingFetcher(), url="")
+
+
+def test_downloads_from_a_local_recording_server():
+    async def run():
+        server = RecordingServer([b"RIFF0", b"RIFF1"])
+        await server.start()
+        fetcher = RecordingFetcher(retries=0)
+        try:
+            return [await fetcher.fetch(server.url(i)) for i in range(3)]
+        finally:
+            await fetcher.aclose()
+            await server.stop()
+
+    assert asyncio.run(run()) == [b"RIFF0", b"RIFF1", b"RIFF0"]
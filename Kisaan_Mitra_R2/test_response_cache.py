@@ -0,0 +1,65 @@
+# test_response_cache.py
+import time
+
+from response_cache import ResponseCache, normalize_query
+
+KEY = ("pm kisan", "hi")
+
+
+def test_normalize_query():
+    assert normalize_query("  PM   Kisan\n") == "pm kisan"
+    # Precomposed and decomposed forms (क़ vs क + nukta) share a key
+    assert normalize_query("\u0958") == normalize_query("\u0915\u093c")
+    assert normalize_query("Cafe\u0301") == normalize_query("Caf\u00e9")
+    assert normalize_query(None) == ""
+
+
+def test_hit_and_miss_counters():
+    cache = ResponseCache()
+    assert cache.get("/text-query", KEY, "v1") is None
+    cache.put("/text-query", KEY, "v1", b"{}")
+    assert cache.get("/text-query", KEY, "v1") == b"{}"
+    assert cache.get("/schemes", KEY, "v1") is None
+
+
+def test_catalog_swap_drops_old_entries():
+    cache = ResponseCache()
+    cache.put("/text-query", KEY, "v1", b"old")
+    cache.put("/text-query", ("other", ""), "v1", b"old2")
+
+    assert cache.get("/text-query", KEY, "v2") is None
+    cache.put("/text-query", KEY, "v2", b"new")
+    assert cache.get("/text-query", KEY, "v2") == b"new"
+    assert cache.get("/text-query", ("other", ""), "v2") is None
+    assert len(cache._entries) == 1
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl_seconds=0.01)
+    cache.put("/text-query", KEY, "v1", b"{}")
+    time.sleep(0.02)
+    assert cache.get("/text-query", KEY, "v1") is None
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("/e", ("a",), "v1", b"1")
+    cache.put("/e", ("b",), "v1", b"2")
+    cache.get("/e", ("a",), "v1")  # "b" is now least recently used
+    cache.put("/e", ("c",), "v1", b"3")
+    assert cache.get("/e", ("b",), "v1") is None
+    assert cache.get("/e", ("a",), "v1") == b"1"
+
+    cache.put("/e", ("big",), "v1", b"x" * 9)
+    assert cache._total_bytes <= 10
+    cache.put("/e", ("huge",), "v1", b"x" * 11)  # Larger than the cache: not stored
+    assert cache.get("/e", ("huge",), "v1") is None
+
+
+def test_invalidate_one_endpoint():
+    cache = ResponseCache()
+    cache.put("/text-query", KEY, "v1", b"1")
+    cache.put("/schemes", KEY, "v1", b"2")
+    cache.invalidate("/schemes")
+    assert cache.get("/schemes", KEY, "v1") is None
+    assert cache.get("/text-query", KEY, "v1") == b"1"
@@ -1,43 +1,31 @@
 
 # text_to_speech_free.py
-from gtts import gTTS
+import asyncio
 import os
-import time
+import sys
 
-async def synthesize_speech(text: str, language: str = "hi", output_path: str = None) -> str:
-    """
-    Simple TTS using gTTS (Google Text-to-Speech)
-    """
-    try:
-        os.makedirs("temp_audio", exist_ok=True)
-        if output_path is None:
-            output_path = f"./temp_audio/response_{int(time.time())}.mp3"
-
-        tts = gTTS(text=text, lang=language)
-        tts.save(output_path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_spool import get_spool
 
-        print(f"✅ Audio saved: {output_path}")
-        return output_path
-    except Exception as e:
-        print(f"❌ TTS error: {e}")
-        return None
+AUDIO_DIR = os.getenv("KM_AUDIO_SPOOL_DIR", "temp_audio")
 
-# text_to_speech_free.py
-from gtts import gTTS
-import os
-import time
 
 async def synthesize_speech(text: str, language: str = "hi", output_path: str = None) -> str:
     """
     Simple TTS using gTTS (Google Text-to-Speech)
+    Generated files live in the shared audio spool (quota + TTL managed)
     """
     try:
-        os.makedirs("temp_audio", exist_ok=True)
+        from gtts import gTTS
+
+        spool = get_spool(AUDIO_DIR)
         if output_path is None:
-            output_path = f"./temp_audio/response_{int(time.time())}.mp3"
+            output_path = spool.new_path(prefix="response", suffix=".mp3")
 
+        # gTTS is a blocking network call; keep the event loop free
         tts = gTTS(text=text, lang=language)
-        tts.save(output_path)
+        await asyncio.to_thread(tts.save, output_path)
+        spool.register(output_path)
 
         print(f"✅ Audio saved: {output_path}")
         return output_path
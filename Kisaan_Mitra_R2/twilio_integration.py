@@ -1,15 +1,29 @@
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse
 import os
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 
+from call_log import get_call_log
+
 load_dotenv()
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+twilio_client = None
+
+def get_twilio_client() -> Client:
+    """
+    Create the REST client on first use
+    (Client raises without credentials, which would stop the app importing)
+    """
+    global twilio_client
+    if twilio_client is None:
+        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return twilio_client
 
 def create_ivr_response(message: str, gather_input: bool = False):
     """
@@ -37,7 +51,7 @@ def send_sms_with_form_link(phone_number: str, scheme_name: str, form_url: str):
     message_text = f"नमस्कार! {scheme_name} के लिए फॉर्म भरने के लिए यहाँ क्लिक करें: {form_url}"
     
     try:
-        message = twilio_client.messages.create(
+        message = get_twilio_client().messages.create(
             body=message_text,
             from_=TWILIO_PHONE_NUMBER,
             to=phone_number
@@ -48,17 +62,29 @@ def send_sms_with_form_link(phone_number: str, scheme_name: str, form_url: str):
         print(f"❌ SMS error: {e}")
         return False
 
-def record_call_log(phone_number: str, user_query: str, schemes_offered: list, user_choice: str):
+def record_call_log(
+    phone_number: str,
+    user_query: str,
+    schemes_offered: list,
+    user_choice: str,
+    call_sid: str = None,
+    intent: str = None,
+    disaster: str = None
+):
     """
     Log call details for analytics
+    Queued for the background writer (call_log.py), so this never blocks the call
     """
     log_entry = {
+        "call_sid": call_sid,
         "phone": phone_number,
         "query": user_query,
+        "intent": intent,
+        "disaster": disaster,
         "schemes": schemes_offered,
-        "user_choice": user_choice,  # "yes", "no", "skip"
-        "timestamp": str(__import__('datetime').datetime.now())
+        "user_choice": user_choice,  # "pending" (answered), "yes", "no"
+        "ts": time.time(),
+        "timestamp": str(datetime.now())
     }
-    # TODO: Store in database
-    print(f"📋 Call log: {log_entry}")
-    return log_entry
\ No newline at end of file
+    get_call_log().record(log_entry)
+    return log_entry
@@ -1,46 +1,48 @@
 import asyncio
 import os
-from typing import Tuple, Optional
+from typing import Dict, Tuple, Optional
 import tempfile
 import threading
 
 
 class MultilingualAudioProcessor:
     """
-    Audio processing with WHISPER MEDIUM model
-    HARDCODED to medium - no fallbacks to base
+    Audio processing with a faster-whisper model
+    MEDIUM by default (good Hindi/Urdu accuracy) - no fallbacks to base
     """
 
     def __init__(self, model_size: str = "medium"):
         """
-        Initialize with MEDIUM Whisper model - FORCED
+        Initialize the Whisper model
+
+        Args:
+            model_size: faster-whisper model name (tiny, base, small, medium, large-v3, ...)
         """
-        self.model_size = "medium"  # HARDCODED
+        self.model_size = model_size
         self.model = None
         self.initialized = False
 
-        print(" Initializing Whisper with MEDIUM model (forced)")
-        print(" Downloading ~1.5GB model (first time only)...")
+        print(f" Initializing Whisper with {model_size.upper()} model")
+        print(" Downloading the model (first time only, ~1.5GB for medium)...")
 
         try:
             from faster_whisper import WhisperModel
 
             self.model = WhisperModel(
-                "medium",
+                model_size,
                 device="cpu",
                 compute_type="int8",
             )
 
             self.initialized = True
-            print(" SUCCESS: Whisper MEDIUM model loaded!")
-            print(" Model: MEDIUM (excellent Hindi/Urdu accuracy)")
+            print(f" SUCCESS: Whisper {model_size.upper()} model loaded!")
 
         except RuntimeError as e:
             if "malloc" in str(e).lower():
-                print(" CRITICAL: Not enough RAM for MEDIUM model!")
-                print(" Need ~3GB free RAM")
+                print(f" CRITICAL: Not enough RAM for {model_size.upper()} model!")
+                print(" Need ~3GB free RAM for medium")
             else:
-                print(f" Error loading MEDIUM: {e}")
+                print(f" Error loading {model_size.upper()}: {e}")
 
         except Exception as e:
             print(f" Error: {e}")
@@ -51,15 +53,31 @@ class MultilingualAudioProcessor:
         language: Optional[str] = None,
     ) -> Tuple[str, str, float]:
         """
-        Convert speech to text with MEDIUM Whisper model
+        Convert speech to text with the Whisper model
+        """
+
+        result = self.transcribe_file(audio_path, language=language)
+        return result["text"], result["language"], result["confidence"]
+
+    def transcribe_file(
+        self,
+        audio_path: str,
+        language: Optional[str] = None,
+    ) -> Dict:
+        """
+        Synchronous transcription (used by speech_to_text and offline tools)
+
+        Returns:
+            Dict with text, language, confidence, duration (audio seconds)
+            and error (None on success)
         """
 
         if not self.initialized or self.model is None:
-            print(" MEDIUM Whisper not available")
-            return "", "en", 0.0
+            print(f" {self.model_size.upper()} Whisper not available")
+            return _transcription("", "en", 0.0, 0.0, "Whisper model not available")
 
         try:
-            print(" Transcribing with MEDIUM Whisper model")
+            print(f" Transcribing with {self.model_size.upper()} Whisper model")
 
             segments, info = self.model.transcribe(
                 audio_path,
@@ -91,11 +109,11 @@ class MultilingualAudioProcessor:
             else:
                 print(" Some Urdu detected, MEDIUM handles this well")
 
-            return transcribed_text, "hi", 0.95
+            return _transcription(transcribed_text, "hi", 0.95, info.duration)
 
         except Exception as e:
             print(f" Transcription error: {e}")
-            return "", "en", 0.0
+            return _transcription("", "en", 0.0, 0.0, str(e))
 
     def _count_devanagari(self, text: str) -> int:
         count = 0
@@ -218,6 +236,23 @@ class MultilingualAudioProcessor:
             return False
 
 
+def _transcription(
+    text: str,
+    language: str,
+    confidence: float,
+    duration: float,
+    error: Optional[str] = None,
+) -> Dict:
+    """Result dict returned by transcribe_file"""
+    return {
+        "text": text,
+        "language": language,
+        "confidence": confidence,
+        "duration": duration,
+        "error": error,
+    }
+
+
 class MultilingualTranslator:
     """
     Translator for multilingual support
@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+
+# Defaults (override with environment variables)
+DEFAULT_QUOTA_BYTES = int(os.getenv("KM_SPOOL_QUOTA_MB", "512")) * 1024 * 1024
+DEFAULT_TTL_SECONDS = int(os.getenv("KM_SPOOL_TTL_SECONDS", "3600"))
+DEFAULT_SWEEP_INTERVAL = int(os.getenv("KM_SPOOL_SWEEP_SECONDS", "60"))
+
+
+class AudioSpool:
+    """
+    Managed directory for uploaded and generated audio files
+
+    - Unique, collision-free file names
+    - Disk quota with least-recently-used eviction
+    - TTL expiry of old files
+    - Background sweeper thread
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        quota_bytes: int = DEFAULT_QUOTA_BYTES,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        sweep_interval: int = DEFAULT_SWEEP_INTERVAL,
+    ):
+        """
+        Args:
+            root_dir: Directory holding the spooled files
+            quota_bytes: Maximum total size of the spool
+            ttl_seconds: Files older than this are deleted by the sweeper
+            sweep_interval: Seconds between background sweeps
+        """
+        self.root_dir = os.path.abspath(root_dir)
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        os.makedirs(self.root_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # path -> [size_bytes, created_at, last_access]
+        self._entries: Dict[str, list] = {}
+        self._total_bytes = 0
+
+        self._stop_event = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+        self.stats_counters = {
+            "files_created": 0,
+            "files_evicted": 0,
+            "files_expired": 0,
+            "bytes_reclaimed": 0,
+            "sweeps": 0,
+        }
+
+        self._adopt_existing_files()
+
+    # File naming / registration
+
+    def new_path(self, prefix: str = "audio", suffix: str = ".wav") -> str:
+        """
+        Reserve a unique path inside the spool
+
+        The file is tracked once it is written; call register() (or use
+        write()) after an external writer has created it.
+        """
+        if suffix and not suffix.startswith("."):
+            suffix = "." + suffix
+        name = f"{_safe_prefix(prefix)}_{int(time.time())}_{uuid.uuid4().hex}{suffix}"
+        return os.path.join(self.root_dir, name)
+
+    def write(self, data: bytes, prefix: str = "audio", suffix: str = ".wav") -> str:
+        """Write bytes to a new spool file and return its path"""
+        path = self.new_path(prefix, suffix)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.register(path)
+        return path
+
+    def register(self, path: str) -> bool:
+        """Start tracking a file written into the spool by someone else"""
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+
+        now = time.time()
+        with self._lock:
+            old = self._entries.get(path)
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._entries[path] = [size, now, now]
+            self._total_bytes += size
+            self.stats_counters["files_created"] += 1
+            over_quota = self._total_bytes > self.quota_bytes
+
+        if over_quota:
+            self._evict_to_quota()
+        return True
+
+    def touch(self, path: str):
+        """Mark a file as recently used (protects it from LRU eviction)"""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                entry[2] = time.time()
+
+    def release(self, path: Optional[str]) -> int:
+        """Delete a spool file that is no longer needed. Returns bytes freed."""
+        if not path:
+            return 0
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._total_bytes -= entry[0]
+        freed = _remove_file(path)
+        if freed:
+            with self._lock:
+                self.stats_counters["bytes_reclaimed"] += freed
+        return freed
+
+    # Garbage collection
+
+    def sweep(self) -> int:
+        """
+        Delete expired files, then evict least-recently-used files until
+        the spool is back under quota
+
+        Returns:
+            Bytes reclaimed by this sweep
+        """
+        # Pick up files written without register() (e.g. ffmpeg conversions)
+        self._adopt_existing_files()
+
+        now = time.time()
+        expired = []
+
+        with self._lock:
+            for path, (size, created_at, last_access) in list(self._entries.items()):
+                if not os.path.exists(path):
+                    # Deleted behind our back
+                    self._total_bytes -= size
+                    del self._entries[path]
+                elif now - created_at > self.ttl_seconds:
+                    self._total_bytes -= size
+                    del self._entries[path]
+                    expired.append(path)
+
+        reclaimed = 0
+        for path in expired:
+            reclaimed += _remove_file(path)
+
+        with self._lock:
+            self.stats_counters["files_expired"] += len(expired)
+            self.stats_counters["bytes_reclaimed"] += reclaimed
+            self.stats_counters["sweeps"] += 1
+
+        reclaimed += self._evict_to_quota()
+
+        if reclaimed:
+            print(f" Spool sweep reclaimed {reclaimed} bytes from {self.root_dir}")
+        return reclaimed
+
+    def _evict_to_quota(self) -> int:
+        """Evict least-recently-used files while over quota"""
+        victims = []
+        with self._lock:
+            if self._total_bytes <= self.quota_bytes:
+                return 0
+            by_access = sorted(self._entries.items(), key=lambda item: item[1][2])
+            for path, (size, _, _) in by_access:
+                if self._total_bytes <= self.quota_bytes:
+                    break
+                self._total_bytes -= size
+                del self._entries[path]
+                victims.append(path)
+
+        reclaimed = 0
+        for path in victims:
+            reclaimed += _remove_file(path)
+
+        with self._lock:
+            self.stats_counters["files_evicted"] += len(victims)
+            self.stats_counters["bytes_reclaimed"] += reclaimed
+        return reclaimed
+
+    def _adopt_existing_files(self):
+        """Track untracked files (e.g. left over from a previous run) so they can expire"""
+        try:
+            names = os.listdir(self.root_dir)
+        except OSError:
+            return
+
+        with self._lock:
+            for name in names:
+                path = os.path.join(self.root_dir, name)
+                if path in self._entries:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if not os.path.isfile(path):
+                    continue
+                self._entries[path] = [st.st_size, st.st_mtime, st.st_atime]
+                self._total_bytes += st.st_size
+
+    # Background sweeper
+
+    def start(self):
+        """Start the background sweeper thread (idempotent)"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop,
+            name=f"audio-spool-sweeper:{os.path.basename(self.root_dir)}",
+            daemon=True,
+        )
+        self._sweeper.start()
+
+    def stop(self):
+        """Stop the background sweeper thread"""
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f" Spool sweep error: {e}")
+
+    def stats(self) -> Dict:
+        """Current spool usage and lifetime counters"""
+        with self._lock:
+            return {
+                "root_dir": self.root_dir,
+                "files": len(self._entries),
+                "bytes_used": self._total_bytes,
+                "quota_bytes": self.quota_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                **self.stats_counters,
+            }
+
+
+# Helper Functions
+
+def _safe_prefix(prefix: str) -> str:
+    """Keep only filename-safe characters (prefixes may contain CallSids etc.)"""
+    cleaned = "".join(c if c.isalnum() or c in "-_" else "_" for c in prefix)
+    return cleaned[:64] or "audio"
+
+
+def _remove_file(path: str) -> int:
+    """Delete a file, returning the number of bytes freed"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        print(f" Could not delete {path}: {e}")
+        return 0
+
+
+# Shared instances (one spool and sweeper per directory per process)
+
+_spools: Dict[str, AudioSpool] = {}
+_spools_lock = threading.Lock()
+
+
+def get_spool(root_dir: str, **kwargs) -> AudioSpool:
+    """
+    Get the process-wide spool for a directory, creating and starting it
+    on first use
+
+    Args:
+        root_dir: Spool directory
+        **kwargs: Passed to AudioSpool on first creation
+    """
+    key = os.path.abspath(root_dir)
+    with _spools_lock:
+        spool = _spools.get(key)
+        if spool is None:
+            spool = AudioSpool(key, **kwargs)
+            spool.start()
+            _spools[key] = spool
+        return spool
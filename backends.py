@@ -0,0 +1,325 @@
+"""
+Pluggable heavy backends (STT, TTS, LLM, Twilio, retriever)
+
+Every heavy component can be swapped for a deterministic local stub so
+the apps can be load-tested on a laptop with no network or models:
+
+    KM_STUB_BACKENDS=all uvicorn main_app:app
+    KM_STUB_BACKENDS=stt,llm python Kisaan_Mitra_R2/main_twilio.py
+
+Stub cost per call is configurable per component:
+
+    KM_STUB_<COMPONENT>_LATENCY_MS   non-blocking wait (I/O-like)
+    KM_STUB_<COMPONENT>_CPU_MS       busy loop holding the GIL (compute-like)
+"""
+import asyncio
+import io
+import os
+import random
+import time
+import wave
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+STUB_COMPONENTS = ("stt", "tts", "llm", "twilio", "retriever")
+
+# (latency_ms, cpu_ms) defaults, roughly shaped like the real backends on CPU
+DEFAULT_STUB_COSTS = {
+    "stt": (300.0, 50.0),
+    "tts": (150.0, 10.0),
+    "llm": (800.0, 50.0),
+    "twilio": (50.0, 0.0),
+    "retriever": (0.0, 0.0),
+}
+
+# Deterministic transcripts returned by the stub STT
+STUB_TRANSCRIPTS = [
+    "मेरी फसल बाढ़ से खराब हो गई है। मेरी उम्र 45 साल है।",
+    "सूखे की वजह से फसल बर्बाद हो गई",
+    "ओलावृष्टि से फसल नष्ट हो गई, मेरी उम्र 60 साल है",
+    "फसल में कीट लग गए हैं",
+    "सिंचाई के लिए पानी नहीं है",
+    "खेती के लिए लोन चाहिए, मेरी उम्र 30 साल है",
+    "मिट्टी की उर्वरता कम हो गई है",
+    "my crop is damaged due to flood",
+    "need a loan for farming",
+    "भारी बारिश से फसल खराब हो गई",
+]
+
+
+def stub_enabled(component: str) -> bool:
+    """Whether a component should use its stub (KM_STUB_BACKENDS=all or a comma list)"""
+    names = {
+        name.strip().lower()
+        for name in os.getenv("KM_STUB_BACKENDS", "").split(",")
+        if name.strip()
+    }
+    return "all" in names or component in names
+
+
+class StubCost:
+    """Configurable latency + CPU cost of one stubbed call"""
+
+    def __init__(self, component: str):
+        default_latency, default_cpu = DEFAULT_STUB_COSTS.get(component, (0.0, 0.0))
+        prefix = f"KM_STUB_{component.upper()}"
+        self.latency_s = float(os.getenv(f"{prefix}_LATENCY_MS", default_latency)) / 1000
+        self.cpu_s = float(os.getenv(f"{prefix}_CPU_MS", default_cpu)) / 1000
+
+    def burn_cpu(self):
+        deadline = time.perf_counter() + self.cpu_s
+        x = 0
+        while time.perf_counter() < deadline:
+            x += 1
+
+    def wait(self):
+        """Blocking cost (for sync call sites)"""
+        self.burn_cpu()
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    async def wait_async(self):
+        """CPU cost blocks the loop, latency does not"""
+        self.burn_cpu()
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+
+# Audio helpers
+
+def make_wav_bytes(seconds: float, sample_rate: int = 16000, seed: Optional[int] = None) -> bytes:
+    """16-bit mono WAV; low-level noise when seeded, silence otherwise"""
+    n_samples = max(1, int(seconds * sample_rate))
+    if seed is None:
+        frames = b"\x00\x00" * n_samples
+    else:
+        rng = random.Random(seed)
+        frames = b"".join(
+            rng.randint(-200, 200).to_bytes(2, "little", signed=True)
+            for _ in range(n_samples)
+        )
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def wav_duration(data: bytes) -> float:
+    """Duration of WAV bytes in seconds (0.0 if not a readable WAV)"""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except Exception:
+        return 0.0
+
+
+# Stub backends
+
+class StubSpeechToText:
+    """Deterministic STT: the transcript is picked by a checksum of the audio"""
+
+    def __init__(self):
+        self.cost = StubCost("stt")
+
+    def transcribe_bytes(self, data: bytes) -> Tuple[str, float]:
+        """Returns (transcript, audio seconds) without the simulated cost"""
+        text = STUB_TRANSCRIPTS[zlib.crc32(data) % len(STUB_TRANSCRIPTS)]
+        return text, wav_duration(data)
+
+    def transcribe_file(self, audio_path: str) -> Tuple[str, float]:
+        with open(audio_path, "rb") as f:
+            data = f.read()
+        self.cost.wait()
+        return self.transcribe_bytes(data)
+
+    async def transcribe_file_async(self, audio_path: str) -> Tuple[str, float]:
+        with open(audio_path, "rb") as f:
+            data = f.read()
+        await self.cost.wait_async()
+        return self.transcribe_bytes(data)
+
+
+class StubTextToSpeech:
+    """Writes a silent WAV whose length follows the text length"""
+
+    def __init__(self):
+        self.cost = StubCost("tts")
+
+    def _write(self, text: str, output_path: str) -> bool:
+        seconds = min(30.0, 0.06 * len(text or ""))
+        with open(output_path, "wb") as f:
+            f.write(make_wav_bytes(seconds, sample_rate=8000))
+        return True
+
+    def synthesize(self, text: str, output_path: str) -> bool:
+        self.cost.wait()
+        return self._write(text, output_path)
+
+    async def synthesize_async(self, text: str, output_path: str) -> bool:
+        await self.cost.wait_async()
+        return self._write(text, output_path)
+
+
+class StubLLM:
+    """Deterministic answer built from the query and retrieved schemes"""
+
+    def __init__(self):
+        self.cost = StubCost("llm")
+
+    def generate(self, user_query: str, schemes: Optional[List[Dict]] = None) -> str:
+        self.cost.wait()
+        return self._answer(user_query, schemes)
+
+    async def generate_async(self, user_query: str, schemes: Optional[List[Dict]] = None) -> str:
+        await self.cost.wait_async()
+        return self._answer(user_query, schemes)
+
+    async def stream_async(self, user_query: str, schemes: Optional[List[Dict]] = None) -> AsyncIterator[str]:
+        """Answer word by word, the latency spread over the tokens"""
+        words = self._answer(user_query, schemes).split(" ")
+        self.cost.burn_cpu()
+        for i, word in enumerate(words):
+            if self.cost.latency_s:
+                await asyncio.sleep(self.cost.latency_s / len(words))
+            yield word if i == len(words) - 1 else word + " "
+
+    def _answer(self, user_query: str, schemes: Optional[List[Dict]]) -> str:
+        if not user_query or not user_query.strip():
+            return "Sorry, I could not understand."
+
+        names = [s.get("scheme_name") or s.get("name") or "योजना" for s in (schemes or [])]
+        if names:
+            return f"आपके प्रश्न के अनुसार ये योजनाएं उपयोगी हैं: {', '.join(names[:3])}।"
+        return "कृपया अपने नजदीकी कृषि कार्यालय से संपर्क करें।"
+
+
+class StubTwilio:
+    """Records SMS sends in memory instead of calling the Twilio API"""
+
+    def __init__(self):
+        self.cost = StubCost("twilio")
+        self.sent_sms: List[Dict] = []
+
+    def send_sms(self, phone_number: str, body: str) -> bool:
+        self.cost.wait()
+        self.sent_sms.append({"to": phone_number, "body": body, "at": time.time()})
+        # Keep memory bounded during long load tests
+        if len(self.sent_sms) > 10000:
+            del self.sent_sms[:5000]
+        return True
+
+
+stub_stt = StubSpeechToText()
+stub_tts = StubTextToSpeech()
+stub_llm = StubLLM()
+stub_twilio = StubTwilio()
+
+
+class StubAudioProcessor:
+    """
+    Drop-in for MultilingualAudioProcessor (main_app.py)
+
+    Args:
+        real: Real processor to delegate to for components that are not
+            stubbed (None when both STT and TTS are stubbed)
+    """
+
+    def __init__(self, real=None):
+        self.real = real
+        self.stub_stt = stub_enabled("stt")
+        self.stub_tts = stub_enabled("tts")
+        self.initialized = True
+
+    async def speech_to_text(self, audio_path: str, language: Optional[str] = None):
+        if not self.stub_stt:
+            return await self.real.speech_to_text(audio_path, language=language)
+        text, _ = await stub_stt.transcribe_file_async(audio_path)
+        return text, language or "hi", 0.95
+
+    def transcribe_file(self, audio_path: str, language: Optional[str] = None) -> Dict:
+        if not self.stub_stt:
+            return self.real.transcribe_file(audio_path, language=language)
+        text, duration = stub_stt.transcribe_file(audio_path)
+        return {
+            "text": text,
+            "language": language or "hi",
+            "confidence": 0.95,
+            "duration": duration,
+            "error": None,
+        }
+
+    def text_to_speech_edge(self, text: str, language: str = "hi", output_path: str = None) -> bool:
+        if not self.stub_tts:
+            return self.real.text_to_speech_edge(text, language=language, output_path=output_path)
+        return stub_tts.synthesize(text, output_path)
+
+    def text_to_speech_offline(self, text: str, language: str = "hi", output_path: str = None) -> bool:
+        if not self.stub_tts:
+            return self.real.text_to_speech_offline(text, language=language, output_path=output_path)
+        return stub_tts.synthesize(text, output_path)
+
+
+def make_audio_processor(model_size: str = "medium"):
+    """Real MultilingualAudioProcessor, or a (partially) stubbed one"""
+    if not (stub_enabled("stt") or stub_enabled("tts")):
+        from audio_processor import MultilingualAudioProcessor
+        return MultilingualAudioProcessor(model_size=model_size)
+
+    real = None
+    if not (stub_enabled("stt") and stub_enabled("tts")):
+        from audio_processor import MultilingualAudioProcessor
+        real = MultilingualAudioProcessor(model_size=model_size)
+    print(" Using stub audio backends (KM_STUB_BACKENDS)")
+    return StubAudioProcessor(real)
+
+
+# R2 function-style stubs (same signatures as the real modules)
+
+async def stub_transcribe_audio_local(audio_path: str) -> str:
+    text, _ = await stub_stt.transcribe_file_async(audio_path)
+    return text
+
+
+async def stub_transcribe_audio(audio) -> str:
+    """Stub of speech_to_text_free.transcribe_audio (path, bytes or float array)"""
+    if isinstance(audio, str):
+        return await stub_transcribe_audio_local(audio)
+    data = bytes(audio) if isinstance(audio, (bytes, bytearray)) else audio.tobytes()
+    await stub_stt.cost.wait_async()
+    return stub_stt.transcribe_bytes(data)[0]
+
+
+async def stub_synthesize_speech(text: str, language: str = "hi", output_path: str = None) -> str:
+    from audio_spool import get_spool
+
+    spool = get_spool(os.getenv("KM_AUDIO_SPOOL_DIR", "temp_audio"))
+    if output_path is None:
+        output_path = spool.new_path(prefix="response", suffix=".wav")
+    await stub_tts.synthesize_async(text, output_path)
+    spool.register(output_path)
+    return output_path
+
+
+def stub_call_mistral(user_query: str, schemes: list = None) -> str:
+    return stub_llm.generate(user_query, schemes)
+
+
+async def stub_acall_mistral(user_query: str, schemes: list = None) -> str:
+    return await stub_llm.generate_async(user_query, schemes)
+
+
+async def stub_astream_mistral(user_query: str, schemes: list = None) -> AsyncIterator[str]:
+    async for piece in stub_llm.stream_async(user_query, schemes):
+        yield piece
+
+
+def stub_send_sms_with_form_link(phone_number: str, scheme_name: str, form_url: str) -> bool:
+    return stub_twilio.send_sms(
+        phone_number,
+        f"नमस्कार! {scheme_name} के लिए फॉर्म भरने के लिए यहाँ क्लिक करें: {form_url}"
+    )
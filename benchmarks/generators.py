@@ -0,0 +1,143 @@
+"""
+Synthetic data for benchmarks
+
+- generate_catalog: uttarakhand_schemes.json-shaped catalogs of any size
+- generate_queries: Hindi / English / Hinglish farmer query mixes
+"""
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_CATALOG_PATH = os.path.join(BASE_DIR, "data", "uttarakhand_schemes.json")
+
+# State distribution for a pan-India catalog (central schemes are "ALL")
+STATES = [
+    ("ALL", 30), ("Uttarakhand", 15), ("Uttar Pradesh", 8), ("Bihar", 6),
+    ("Maharashtra", 6), ("Rajasthan", 5), ("Madhya Pradesh", 5), ("Punjab", 4),
+    ("Himachal Pradesh", 4), ("Odisha", 4), ("Karnataka", 4), ("Tamil Nadu", 3),
+    ("West Bengal", 3), ("Gujarat", 3),
+]
+
+EXTRA_DISASTERS = ["cyclone", "disease", "water_scarcity", "landslide", "soil_degradation"]
+
+EXTRA_FIELDS = [
+    "mobile_number", "season", "sowing_date", "machinery_required",
+    "caste_certificate", "khasra_number", "ifsc_code", "photo",
+]
+
+# Query building blocks: (text, language)
+PROBLEMS = [
+    ("मेरी फसल खराब हो गई है", "hi"),
+    ("मेरी फसल बर्बाद हो गई", "hi"),
+    ("फसल नष्ट हो गई है", "hi"),
+    ("फसल में कीट लग गए हैं", "hi"),
+    ("फसल में रोग लग गया है", "hi"),
+    ("सिंचाई के लिए पानी नहीं है", "hi"),
+    ("मिट्टी की उर्वरता कम हो गई है", "hi"),
+    ("अच्छे बीज चाहिए", "hi"),
+    ("खेती के लिए लोन चाहिए", "hi"),
+    ("सरकारी सहायता चाहिए", "hi"),
+    ("my crop is damaged", "en"),
+    ("crop loss this season", "en"),
+    ("pest attack on my field", "en"),
+    ("need irrigation support", "en"),
+    ("soil fertility is low", "en"),
+    ("need a loan for farming", "en"),
+    ("mera crop damaged ho gaya", "hinglish"),
+    ("khet me pest lag gaya", "hinglish"),
+]
+
+DISASTERS = [
+    ("बाढ़ से", "hi"),
+    ("सूखे की वजह से", "hi"),
+    ("ओलावृष्टि से", "hi"),
+    ("भारी बारिश से", "hi"),
+    ("पाला पड़ने से", "hi"),
+    ("तूफान से", "hi"),
+    ("due to flood", "en"),
+    ("because of drought", "en"),
+    ("after the hailstorm", "en"),
+    ("in heavy rain", "en"),
+    ("", "any"),
+    ("", "any"),
+]
+
+HINDI_AGE_WORDS = ["बीस", "तीस", "चालीस", "पचास", "साठ", "सत्तर"]
+
+
+def load_base_catalog(path: str = BASE_CATALOG_PATH) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def generate_catalog(
+    n: int,
+    seed: int = 0,
+    base_catalog: Optional[List[Dict]] = None,
+) -> List[Dict]:
+    """
+    Scale the Uttarakhand catalog to n schemes
+
+    Names, intents, disasters and fields are drawn from the real catalog
+    so eligibility filtering sees realistic match rates.
+    """
+    rng = random.Random(seed)
+    base = base_catalog or load_base_catalog()
+
+    intents = sorted({s["intent"] for s in base})
+    disasters = sorted({d for s in base for d in s["allowed_disasters"]} | set(EXTRA_DISASTERS))
+    fields = sorted({f for s in base for f in s["required_fields"]} | set(EXTRA_FIELDS))
+    state_names = [name for name, _ in STATES]
+    state_weights = [weight for _, weight in STATES]
+
+    catalog = []
+    for i in range(n):
+        template = base[i % len(base)]
+        min_age = rng.choice([18, 18, 18, 21, 25])
+        catalog.append({
+            "scheme_id": f"SYN_{i:06d}",
+            "scheme_name": f"{template['scheme_name']} #{i}",
+            "state": rng.choices(state_names, weights=state_weights)[0],
+            "intent": rng.choice(intents),
+            "min_age": min_age,
+            "max_age": rng.choice([40, 60, 70, 99, 99]),
+            "allowed_disasters": rng.sample(disasters, k=rng.randint(1, 6)),
+            "required_fields": rng.sample(fields, k=rng.randint(5, 11)),
+            "official_url": template["official_url"],
+        })
+    return catalog
+
+
+def generate_queries(n: int, seed: int = 0, hindi_share: float = 0.7) -> List[str]:
+    """
+    Realistic farmer queries: problem + optional disaster + optional age
+
+    Args:
+        n: Number of queries
+        seed: RNG seed
+        hindi_share: Fraction of queries built from Hindi phrases
+    """
+    rng = random.Random(seed)
+    hindi_problems = [p for p, lang in PROBLEMS if lang == "hi"]
+    other_problems = [p for p, lang in PROBLEMS if lang != "hi"]
+    hindi_disasters = [d for d, lang in DISASTERS if lang in ("hi", "any")]
+    other_disasters = [d for d, lang in DISASTERS if lang in ("en", "any")]
+
+    queries = []
+    for _ in range(n):
+        if rng.random() < hindi_share:
+            parts = [rng.choice(hindi_disasters), rng.choice(hindi_problems)]
+            age_roll = rng.random()
+            if age_roll < 0.4:
+                parts.append(f"मेरी उम्र {rng.randint(18, 80)} साल है।")
+            elif age_roll < 0.6:
+                parts.append(f"मेरी उमर {rng.choice(HINDI_AGE_WORDS)} साल है।")
+        else:
+            parts = [rng.choice(other_problems), rng.choice(other_disasters)]
+            if rng.random() < 0.4:
+                parts.append(f"I am {rng.randint(18, 80)} years old.")
+        queries.append(" ".join(p for p in parts if p))
+    return queries
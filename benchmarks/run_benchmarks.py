@@ -0,0 +1,217 @@
+"""
+Microbenchmarks for the pure-Python hot paths
+
+Usage:
+    python benchmarks/run_benchmarks.py                         # writes benchmarks/results/<commit>.json
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/abc123.json
+
+Per-call output (the pipeline prints a lot) is sent to /dev/null while
+timing, so print cost is included but terminal speed is not.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.dirname(BENCH_DIR))
+
+from generators import generate_catalog, generate_queries
+from intent_detector import IntentDetector, SchemeFilter
+from multilingual_retriever import MultilingualSchemeRetriever
+from response_builder import generate_response
+
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# A result is a regression when its median per-call time grows by more than this
+REGRESSION_THRESHOLD = 0.10
+
+
+def time_calls(func: Callable, inputs: List, repeat: int) -> Dict:
+    """
+    Time func over every input, `repeat` rounds
+
+    Returns:
+        Per-call seconds (min/median/mean over rounds) and calls per round
+    """
+    per_call = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for item in inputs:
+                func(item)
+            per_call.append((time.perf_counter() - started) / len(inputs))
+
+    return {
+        "calls_per_round": len(inputs),
+        "rounds": repeat,
+        "min_s": min(per_call),
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+    }
+
+
+def run_benchmarks(args) -> Dict:
+    results = {}
+    detector = IntentDetector()
+    queries = generate_queries(args.queries, seed=args.seed)
+
+    def record(name: str, func: Callable, inputs: List, repeat: int = args.repeat):
+        results[name] = time_calls(func, inputs, repeat)
+        r = results[name]
+        print(f" {name:<45} {r['median_s'] * 1e6:>12.1f} us/call  (min {r['min_s'] * 1e6:.1f})")
+
+    record("intent_detector.detect", detector.detect, queries)
+    record("intent_detector._extract_age", detector._extract_age, queries)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        parsed = [detector.detect(q) for q in queries]
+
+    # Distinct eligibility profiles seen in the query mix
+    profiles = list({
+        (p["intent"], p["disaster"], p["age"] if p["age"] > 0 else 30, p["language"])
+        for p in parsed
+    })
+    profiles.sort()
+    profiles = profiles[:args.profiles]
+
+    for size in args.sizes:
+        catalog = generate_catalog(size, seed=args.seed)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            retriever = MultilingualSchemeRetriever(schemes=catalog)
+
+        # Fewer rounds on large catalogs keeps the suite under a few minutes
+        repeat = args.repeat if size <= 10000 else max(1, args.repeat // 3)
+
+        record(
+            f"retriever.get_eligible_schemes[n={size}]",
+            lambda profile: retriever.get_eligible_schemes(
+                intent=profile[0], disaster=profile[1], age=profile[2], language=profile[3]
+            ),
+            profiles,
+            repeat,
+        )
+
+        rng = random.Random(args.seed)
+        ids = [rng.choice(catalog)["scheme_id"] for _ in range(200)]
+        record(f"retriever.get_scheme_details[n={size}]", retriever.get_scheme_details, ids, repeat)
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            eligible_lists = [
+                (profile, retriever.get_eligible_schemes(
+                    intent=profile[0], disaster=profile[1], age=profile[2], language=profile[3]
+                ))
+                for profile in profiles
+            ]
+        record(
+            f"generate_response[n={size}]",
+            lambda item: generate_response(
+                intent=item[0][0], disaster=item[0][1], age=item[0][2],
+                eligible_schemes=item[1], language=item[0][3]
+            ),
+            eligible_lists,
+            repeat,
+        )
+
+        scheme_filter = SchemeFilter([
+            {
+                "name": s["scheme_name"],
+                "description": f"{s['intent'].replace('_', ' ')} support for {', '.join(s['allowed_disasters'])}",
+            }
+            for s in catalog
+        ])
+        record(
+            f"scheme_filter.filter_eligible[n={size}]",
+            lambda profile: scheme_filter.filter_eligible(profile[0], profile[1], profile[2]),
+            profiles,
+            repeat,
+        )
+
+    return results
+
+
+def compare(baseline_path: str, current: Dict) -> int:
+    """Print per-benchmark ratios against a stored result; returns number of regressions"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\n Comparison against {baseline_path} ({baseline['meta'].get('commit')})")
+    regressions = 0
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            print(f" {name:<45} (new)")
+            continue
+        ratio = result["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        flag = ""
+        if ratio > 1 + REGRESSION_THRESHOLD:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - REGRESSION_THRESHOLD:
+            flag = "  faster"
+        print(f" {name:<45} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=BENCH_DIR
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kisaan Mitra hot-path microbenchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Comma-separated synthetic catalog sizes")
+    parser.add_argument("--queries", type=int, default=500, help="Queries in the mix")
+    parser.add_argument("--profiles", type=int, default=20,
+                        help="Distinct eligibility profiles per catalog size")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None,
+                        help="Result JSON path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline result JSON to compare against")
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    commit = _git_commit()
+    results = run_benchmarks(args)
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n Results written to {output}")
+
+    if args.compare:
+        regressions = compare(args.compare, report)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Offline bulk transcription / labeling of stored call recordings
+
+Runs every audio file in a directory through
+MultilingualAudioProcessor -> IntentDetector -> get_eligible_schemes
+and appends one JSON line per file to the output.
+
+Usage:
+    python bulk_transcribe.py recordings/ -o labels.jsonl --workers 4
+    python bulk_transcribe.py recordings/ -o labels.jsonl --resume
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, Optional, Set
+
+
+AUDIO_EXTENSIONS = (".wav", ".ogg", ".mp3")
+
+# Per-worker state (each process loads its own Whisper model once)
+_worker_processor = None
+_worker_detector = None
+_worker_language = None
+
+
+# Worker Process
+
+def _init_worker(model_size: str, language: Optional[str], threads: int):
+    """Load a warm Whisper model and intent detector in this worker process"""
+    global _worker_processor, _worker_detector, _worker_language
+
+    if threads > 0:
+        # Keep workers from oversubscribing the CPU
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    from audio_processor import MultilingualAudioProcessor
+    from intent_detector import IntentDetector
+
+    _worker_processor = MultilingualAudioProcessor(model_size=model_size)
+    _worker_detector = IntentDetector()
+    _worker_language = language
+
+
+def _process_file(path: str) -> Dict:
+    """Transcribe and label one recording (runs in a worker)"""
+    started = time.perf_counter()
+    result = {
+        "file": path,
+        "duration": 0.0,
+        "text": "",
+        "language": None,
+        "intent": None,
+        "disaster": None,
+        "age": 0,
+        "confidence": 0.0,
+        "error": None,
+    }
+
+    try:
+        transcription = _worker_processor.transcribe_file(path, language=_worker_language)
+        result["duration"] = transcription["duration"]
+        result["text"] = transcription["text"]
+        result["language"] = transcription["language"]
+        result["error"] = transcription["error"]
+
+        if transcription["text"]:
+            parsed = _worker_detector.parse_query(transcription["text"])
+            result["intent"] = parsed["intent"]
+            result["disaster"] = parsed["disaster"]
+            result["age"] = parsed["age"]
+            result["confidence"] = parsed["confidence"]
+        elif not result["error"]:
+            result["error"] = "Empty transcription"
+
+    except Exception as e:
+        result["error"] = str(e)
+
+    result["worker_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# Driver
+
+def find_audio_files(root_dir: str) -> Iterator[str]:
+    """Walk a directory tree yielding audio files in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Files already present in the output JSONL (for --resume)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["file"])
+            except (ValueError, KeyError):
+                # Partially written last line from an interrupted run
+                continue
+    return done
+
+
+def run(args) -> Dict:
+    done = load_checkpoint(args.output) if args.resume else set()
+    files = [path for path in find_audio_files(args.input_dir) if path not in done]
+
+    if args.resume and not os.path.exists(args.output):
+        print(" No checkpoint found, starting from scratch")
+    print(f" {len(files)} files to process ({len(done)} already done)")
+    if not files:
+        return {"files": 0}
+
+    retriever = None
+    if not args.no_schemes:
+        # Eligibility is a metadata filter: the in-memory catalog is enough,
+        # no ChromaDB or embedding model in the driver process
+        from multilingual_retriever import MultilingualSchemeRetriever, load_scheme_file
+        schemes = load_scheme_file(args.schemes_file) if args.schemes_file else load_scheme_file()
+        retriever = MultilingualSchemeRetriever(schemes=schemes)
+
+    schemes_by_profile = {}
+    stats = {"files": 0, "errors": 0, "audio_seconds": 0.0}
+    started = time.perf_counter()
+
+    mode = "a" if args.resume else "w"
+    with open(args.output, mode, encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(args.model_size, args.language, args.threads_per_worker),
+    ) as pool:
+        if args.resume and out.tell() > 0:
+            # Terminate a partially written last line from an interrupted run
+            with open(args.output, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    out.write("\n")
+
+        pending = set()
+        file_iter = iter(files)
+
+        while True:
+            # Keep a bounded number of files in flight
+            while len(pending) < args.workers * 2:
+                path = next(file_iter, None)
+                if path is None:
+                    break
+                pending.add(pool.submit(_process_file, path))
+
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+
+                if retriever is not None and result["intent"]:
+                    age = result["age"]
+                    profile = (result["intent"], result["disaster"], age if age > 0 else 30, result["language"])
+                    if profile not in schemes_by_profile:
+                        schemes_by_profile[profile] = [
+                            scheme["scheme_id"]
+                            for scheme in retriever.get_eligible_schemes(
+                                intent=profile[0],
+                                disaster=profile[1],
+                                age=profile[2],
+                                language=profile[3]
+                            )
+                        ]
+                    result["eligible_scheme_ids"] = schemes_by_profile[profile]
+
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+
+                stats["files"] += 1
+                stats["audio_seconds"] += result["duration"] or 0.0
+                if result["error"]:
+                    stats["errors"] += 1
+
+                if stats["files"] % args.progress_every == 0:
+                    _print_throughput(stats, started, len(files))
+
+    _print_throughput(stats, started, len(files))
+    return stats
+
+
+def _print_throughput(stats: Dict, started: float, total: int):
+    wall = max(time.perf_counter() - started, 1e-9)
+    print(
+        f" {stats['files']}/{total} files | "
+        f"{stats['audio_seconds']:.1f}s audio in {wall:.1f}s wall | "
+        f"{stats['audio_seconds'] / wall:.2f} audio-s/wall-s | "
+        f"{stats['files'] / wall:.2f} files/s | "
+        f"{stats['errors']} errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk-transcribe and label a directory of call recordings"
+    )
+    parser.add_argument("input_dir", help="Directory of .wav/.ogg/.mp3 recordings")
+    parser.add_argument("-o", "--output", default="bulk_results.jsonl", help="Output JSONL file")
+    parser.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes (each holds its own Whisper model)")
+    parser.add_argument("--threads-per-worker", type=int, default=2,
+                        help="CPU threads per worker model (0 = library default)")
+    parser.add_argument("--model-size", default="medium", help="Whisper model size")
+    parser.add_argument("--language", default=None, help="Force transcription language (default: hi)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip files already present in the output and append")
+    parser.add_argument("--no-schemes", action="store_true",
+                        help="Only transcribe + detect intent, skip eligibility lookup")
+    parser.add_argument("--schemes-file", default=None,
+                        help="Scheme catalog for the eligibility lookup (default: data/uttarakhand_schemes.json)")
+    parser.add_argument("--progress-every", type=int, default=25,
+                        help="Print throughput every N files")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"Not a directory: {args.input_dir}")
+
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
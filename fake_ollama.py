@@ -0,0 +1,194 @@
+"""
+Fake Ollama server for tests and load tests
+
+Speaks the subset of the Ollama HTTP API the apps use (/api/generate,
+streaming or not, plus / and /api/tags) and streams a deterministic answer
+token by token with configurable prefill and per-token delays:
+
+    python fake_ollama.py --port 11434 --token-ms 30
+    OLLAMA_HOST=http://127.0.0.1:11434 uvicorn main_twilio:app   (in Kisaan_Mitra_R2)
+
+Or in-process:
+
+    server = FakeOllamaServer(token_ms=5).start()
+    os.environ["OLLAMA_HOST"] = server.url
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+FAKE_ANSWERS = [
+    "आपकी फसल के नुकसान के लिए प्रधानमंत्री फसल बीमा योजना उपयोगी है। नजदीकी कृषि कार्यालय में आवेदन करें। आवेदन के लिए आधार और बैंक खाता साथ रखें।",
+    "सिंचाई के लिए आप प्रधानमंत्री कृषि सिंचाई योजना में आवेदन कर सकते हैं। इसमें ड्रिप और स्प्रिंकलर पर अनुदान मिलता है।",
+    "किसान क्रेडिट कार्ड से आपको कम ब्याज पर ऋण मिल सकता है। अपने बैंक में भूमि के कागज़ के साथ संपर्क करें।",
+    "मिट्टी की जांच के लिए मृदा स्वास्थ्य कार्ड योजना का लाभ लें। जांच मुफ्त होती है।",
+]
+
+
+def _tokens(text: str) -> List[str]:
+    """Split into word-sized pieces, keeping the separating spaces"""
+    pieces, current = [], ""
+    for char in text:
+        current += char
+        if char == " ":
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class FakeOllamaServer:
+    """
+    Args:
+        host: Bind address
+        port: Port (0 = pick a free one)
+        token_ms: Delay between streamed tokens
+        prefill_ms_per_token: Delay before the first token per prompt token
+            (prompt tokens are estimated as characters / 4)
+        answers: Answer texts; one is picked by a checksum of the prompt
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token_ms: float = 20.0,
+        prefill_ms_per_token: float = 0.5,
+        answers: Optional[List[str]] = None,
+    ):
+        self.token_s = token_ms / 1000
+        self.prefill_s_per_token = prefill_ms_per_token / 1000
+        self.answers = answers or FAKE_ANSWERS
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def answer(self, prompt: str) -> str:
+        return self.answers[zlib.crc32(prompt.encode("utf-8")) % len(self.answers)]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, data, status: int = 200):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, data: dict):
+                line = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": "mistral:latest"}]})
+                else:
+                    body = b"Ollama is running"
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server.requests += 1
+                model = request.get("model", "mistral")
+                prompt = request.get("prompt")
+
+                if not prompt:
+                    self._send_json({"model": model, "response": "", "done": True, "done_reason": "load"})
+                    return
+
+                started = time.perf_counter()
+                prompt_tokens = max(1, len(prompt) // 4)
+                time.sleep(prompt_tokens * server.prefill_s_per_token)
+                prefill_ns = int((time.perf_counter() - started) * 1e9)
+
+                tokens = _tokens(server.answer(prompt))
+                final = {
+                    "model": model,
+                    "done": True,
+                    "done_reason": "stop",
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": prefill_ns,
+                    "eval_count": len(tokens),
+                }
+
+                if request.get("stream", True) is False:
+                    time.sleep(len(tokens) * server.token_s)
+                    final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+                    self._send_json({**final, "response": "".join(tokens)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        time.sleep(server.token_s)
+                        self._send_chunk({"model": model, "response": token, "done": False})
+                    final["eval_duration"] = int((time.perf_counter() - started) * 1e9) - prefill_ns
+                    final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+                    self._send_chunk({**final, "response": ""})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client stopped reading
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-ms", type=float, default=20.0, help="Delay between streamed tokens")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.5,
+                        help="Delay before the first token, per prompt token")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, args.token_ms, args.prefill_ms_per_token)
+    print(f" Fake Ollama listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
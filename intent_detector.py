@@ -1,5 +1,5 @@
 import re
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 
 class IntentDetector:
@@ -272,6 +272,24 @@ class IntentDetector:
         """
         return self.detect(text)
 
+    def parse_queries(self, texts: List[str]) -> List[Dict]:
+        """
+        Detect intent for a batch of texts
+
+        Identical texts are detected once and share the result dict.
+
+        Args:
+            texts: Transcribed or typed queries
+
+        Returns:
+            One parsed query dict per input text, in input order
+        """
+        parsed_by_text = {}
+        for text in texts:
+            if text not in parsed_by_text:
+                parsed_by_text[text] = self.detect(text)
+        return [parsed_by_text[text] for text in texts]
+
     def _extract_age(self, text: str) -> int:
         """
         Extract age from Hindi text
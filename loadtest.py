@@ -0,0 +1,300 @@
+"""
+Asyncio load generator for main_app.py and Kisaan_Mitra_R2/main_twilio.py
+
+Start the server with stub backends, then drive it:
+
+    KM_STUB_BACKENDS=all uvicorn main_app:app --port 8000
+    python loadtest.py --url http://localhost:8000 --mix text=3,audio=1 --rps 20 --duration 30
+
+    cd Kisaan_Mitra_R2 && KM_STUB_BACKENDS=all uvicorn main_twilio:app --port 8001
+    python loadtest.py --url http://localhost:8001 --mix twilio=1,voice=1 --concurrency 16
+
+Scenarios:
+    text    POST /text-query
+    audio   POST /process-audio (multipart WAV)
+    voice   POST /voice-query (R2, multipart WAV)
+    twilio  incoming-call -> process-voice -> continue-reply polls -> handle-choice;
+            recordings are served by a local HTTP server started here
+
+Reports p50/p95/p99 latency, throughput and error rate per scenario.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+from backends import make_wav_bytes
+from benchmarks.generators import generate_queries
+
+
+class Stats:
+    """Latency samples and error counts per scenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.skipped = 0
+
+    def record(self, name: str, seconds: float, ok: bool):
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, wall_seconds: float) -> Dict:
+        report = {}
+        for name, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            errors = self.errors.get(name, 0)
+            report[name] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4),
+                "throughput_rps": round(len(samples) / wall_seconds, 2),
+                "p50_ms": round(_percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 1),
+                "p99_ms": round(_percentile(samples, 99) * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1),
+            }
+        return report
+
+
+def _percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class RecordingServer:
+    """Minimal local HTTP server standing in for Twilio-hosted recordings"""
+
+    def __init__(self, recordings: List[bytes]):
+        self.recordings = recordings
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def url(self, index: int) -> str:
+        return f"http://127.0.0.1:{self.port}/recordings/{index % len(self.recordings)}.wav"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # Skip headers
+            try:
+                path = request_line.split()[1].decode()
+                index = int(path.rsplit("/", 1)[-1].split(".")[0])
+                body = self.recordings[index]
+                status = b"200 OK"
+            except (IndexError, ValueError):
+                body, status = b"not found", b"404 Not Found"
+            writer.write(
+                b"HTTP/1.1 " + status + b"\r\nContent-Type: audio/x-wav\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.stats = Stats()
+        self.queries = generate_queries(200, seed=args.seed)
+        self.audio = [make_wav_bytes(args.audio_seconds, seed=i) for i in range(16)]
+        self.recordings = RecordingServer(
+            [make_wav_bytes(args.audio_seconds, sample_rate=8000, seed=100 + i) for i in range(16)]
+        )
+        self.counter = itertools.count()
+
+        weights = {}
+        for part in args.mix.split(","):
+            name, _, weight = part.partition("=")
+            weights[name.strip()] = float(weight or 1)
+        unknown = set(weights) - set(self.SCENARIOS)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        self.scenario_names = list(weights)
+        self.scenario_weights = [weights[name] for name in self.scenario_names]
+        self.rng = random.Random(args.seed)
+
+    # Scenarios
+
+    async def _timed(self, client: httpx.AsyncClient, name: str, method: str, path: str, **kwargs) -> bool:
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        self.stats.record(name, time.perf_counter() - started, ok)
+        return ok
+
+    async def _poll_reply(self, client: httpx.AsyncClient, call: Dict, max_polls: int = 60) -> bool:
+        """Follow the /twilio-continue-reply redirects until the reply is complete"""
+        started = time.perf_counter()
+        ok = False
+        try:
+            for _ in range(max_polls):
+                response = await client.post("/twilio-continue-reply", data=call)
+                if response.status_code >= 400:
+                    break
+                if "/twilio-continue-reply" not in response.text:
+                    ok = True
+                    break
+        except Exception:
+            ok = False
+        self.stats.record("twilio:reply", time.perf_counter() - started, ok)
+        return ok
+
+    async def scenario_text(self, client: httpx.AsyncClient, n: int):
+        query = self.queries[n % len(self.queries)]
+        await self._timed(client, "text", "POST", "/text-query", params={"query": query})
+
+    async def scenario_audio(self, client: httpx.AsyncClient, n: int):
+        files = {"file": ("query.wav", self.audio[n % len(self.audio)], "audio/wav")}
+        await self._timed(client, "audio", "POST", "/process-audio", files=files)
+
+    async def scenario_voice(self, client: httpx.AsyncClient, n: int):
+        files = {"audio": ("query.wav", self.audio[n % len(self.audio)], "audio/wav")}
+        await self._timed(client, "voice", "POST", "/voice-query", files=files)
+
+    async def scenario_twilio(self, client: httpx.AsyncClient, n: int):
+        call = {"CallSid": f"CA{uuid.uuid4().hex}", "From": f"+9190000{n % 100000:05d}"}
+        started = time.perf_counter()
+        ok = await self._timed(client, "twilio:incoming-call", "POST", "/twilio-incoming-call", data=call)
+        ok = await self._timed(
+            client, "twilio:process-voice", "POST", "/twilio-process-voice",
+            data={**call, "RecordingUrl": self.recordings.url(n)}
+        ) and ok
+        ok = await self._poll_reply(client, call) and ok
+        ok = await self._timed(
+            client, "twilio:handle-choice", "POST", "/twilio-handle-choice",
+            data={**call, "Digits": "1"}
+        ) and ok
+        self.stats.record("twilio:call", time.perf_counter() - started, ok)
+
+    SCENARIOS = {
+        "text": scenario_text,
+        "audio": scenario_audio,
+        "voice": scenario_voice,
+        "twilio": scenario_twilio,
+    }
+
+    async def one(self, client: httpx.AsyncClient):
+        n = next(self.counter)
+        name = self.rng.choices(self.scenario_names, weights=self.scenario_weights)[0]
+        await self.SCENARIOS[name](self, client, n)
+
+    # Drivers
+
+    async def run(self) -> Dict:
+        args = self.args
+        await self.recordings.start()
+        limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+        timeout = httpx.Timeout(args.timeout)
+
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            if args.warmup > 0:
+                print(f" Warming up for {args.warmup}s...")
+                await self._closed_loop(client, args.warmup, max(1, args.concurrency or 1))
+                self.stats = Stats()
+
+            mode = f"{args.rps} rps (open loop)" if args.rps else f"concurrency {args.concurrency} (closed loop)"
+            print(f" Running {args.duration}s at {mode}, mix {args.mix}")
+            started = time.perf_counter()
+            if args.rps:
+                await self._open_loop(client, args.duration, args.rps)
+            else:
+                await self._closed_loop(client, args.duration, args.concurrency)
+            wall = time.perf_counter() - started
+
+        await self.recordings.stop()
+        return {"wall_seconds": round(wall, 2), "skipped": self.stats.skipped, "scenarios": self.stats.report(wall)}
+
+    async def _closed_loop(self, client: httpx.AsyncClient, duration: float, concurrency: int):
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.one(client)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def _open_loop(self, client: httpx.AsyncClient, duration: float, rps: float):
+        """Fixed arrival rate; arrivals beyond max_inflight are counted as skipped"""
+        interval = 1.0 / rps
+        inflight = set()
+        started = time.perf_counter()
+
+        for i in itertools.count():
+            scheduled = started + i * interval
+            if scheduled - started >= duration:
+                break
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            if len(inflight) >= self.args.max_inflight:
+                self.stats.skipped += 1
+                continue
+            task = asyncio.create_task(self.one(client))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+
+        if inflight:
+            await asyncio.gather(*inflight)
+
+
+def print_report(report: Dict):
+    print(f"\n {'scenario':<24}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, r in report["scenarios"].items():
+        print(
+            f" {name:<24}{r['requests']:>7}{r['error_rate'] * 100:>6.1f}%{r['throughput_rps']:>8.1f}"
+            f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['max_ms']:>9.0f}"
+        )
+    if report["skipped"]:
+        print(f" {report['skipped']} arrivals skipped (max in-flight reached)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kisaan Mitra load generator")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--mix", default="text=1", help="Scenario weights, e.g. text=3,audio=1,twilio=1")
+    parser.add_argument("--rps", type=float, default=0, help="Target arrival rate (open loop)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers when --rps is not set (closed loop)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--warmup", type=float, default=0, help="Warmup seconds (not reported)")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Cap on concurrent requests")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout (s)")
+    parser.add_argument("--audio-seconds", type=float, default=3.0, help="Length of generated audio")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(LoadGenerator(args).run())
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), **report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,24 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Body, Header, Query
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 import asyncio
+import bisect
+import json
 import os
-import uuid
 import io
 from datetime import datetime
 import tempfile
 
 # Import custom modules
-from multilingual_retriever import MultilingualSchemeRetriever
+from multilingual_retriever import CatalogWatcher, MultilingualSchemeRetriever, load_scheme_file
 from intent_detector import IntentDetector
-from audio_processor import MultilingualAudioProcessor, MultilingualTranslator
+from audio_processor import MultilingualTranslator
+from backends import make_audio_processor, stub_enabled
+from audio_spool import get_spool
+from response_cache import ResponseCache, normalize_query
+from response_builder import generate_response
+from trace_capture import install_trace_capture
 
 
 # Initialize Components
@@ -22,13 +28,46 @@ app = FastAPI(
     description="AI-powered voice assistant for Indian farmers",
     version="1.0.0"
 )
+install_trace_capture(app)  # KM_TRACE_CAPTURE, see trace_capture.py
+
+# Initialize services (KM_STUB_BACKENDS swaps heavy ones for local stubs)
+if stub_enabled("retriever"):
+    retriever = MultilingualSchemeRetriever(schemes=load_scheme_file())
+else:
+    retriever = MultilingualSchemeRetriever()
+
+# Reload the catalog when data/uttarakhand_schemes.json changes (0 disables)
+catalog_watch_seconds = float(os.getenv("KM_CATALOG_WATCH_SECONDS", "10"))
+if catalog_watch_seconds > 0:
+    catalog_watcher = CatalogWatcher(retriever, interval=catalog_watch_seconds)
+    catalog_watcher.start()
 
-# Initialize services
-retriever = MultilingualSchemeRetriever()
 intent_detector = IntentDetector(model_name="mistral")
-audio_processor = MultilingualAudioProcessor(model_size="base")
+# Whisper model (KM_STT_MODEL, as in Kisaan_Mitra_R2); medium for Hindi/Urdu accuracy
+audio_processor = make_audio_processor(model_size=os.getenv("KM_STT_MODEL", "medium"))
 translator = MultilingualTranslator()
 
+# Uploaded and generated audio (quota + TTL managed)
+audio_spool = get_spool(
+    os.getenv("KM_AUDIO_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "kisaan_mitra_audio"))
+)
+
+# Serialized responses for repeat queries (invalidated on catalog change)
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("KM_RESPONSE_CACHE_ENTRIES", "2048")),
+    ttl_seconds=int(os.getenv("KM_RESPONSE_CACHE_TTL", "600"))
+)
+
+
+# Fields a /schemes listing can project
+SCHEME_LIST_FIELDS = (
+    "scheme_id", "scheme_name", "state", "intent", "min_age", "max_age",
+    "allowed_disasters", "required_fields", "official_url"
+)
+DEFAULT_SCHEME_LIST_FIELDS = ("scheme_id", "scheme_name", "intent", "official_url")
+MAX_SCHEME_PAGE_SIZE = 500
+MAX_BATCH_QUERIES = 1000
+
 
 # Data Models
 
@@ -41,6 +80,11 @@ class FarmerQuery(BaseModel):
     language: str = "hi"
     state: str = "Uttarakhand"
 
+class TextQueryItem(BaseModel):
+    """Single query inside a batch request"""
+    query: str
+    language: Optional[str] = None
+
 class AudioRequest(BaseModel):
     """Audio file processing request"""
     language: Optional[str] = None
@@ -78,7 +122,8 @@ async def health_check():
             "llm": "initialized",
             "rag": "initialized",
             "audio": "initialized"
-        }
+        },
+        "audio_spool": audio_spool.stats()
     }
 
 
@@ -120,11 +165,8 @@ async def process_audio(
         if not audio_data or len(audio_data) < 100:
             raise HTTPException(status_code=400, detail="Audio file is empty or too small")
         
-        # Save to temporary file for processing
-        temp_audio_path = os.path.join(tempfile.gettempdir(), f"audio_{uuid.uuid4()}.wav")
-        
-        with open(temp_audio_path, "wb") as f:
-            f.write(audio_data)
+        # Save to spool for processing
+        temp_audio_path = audio_spool.write(audio_data, prefix="audio", suffix=".wav")
         
         print(f" Saved audio to: {temp_audio_path}")
         print(f" Audio size: {len(audio_data)} bytes")
@@ -170,7 +212,7 @@ async def process_audio(
         
         # Step 4: Generate text response
         print(" Step 4: Generating response")
-        response_text = _generate_response(
+        response_text = generate_response(
             intent=intent,
             disaster=disaster,
             age=age,
@@ -180,7 +222,7 @@ async def process_audio(
         
         # Step 5: Convert response to speech
         print(" Step 5: Converting response to speech...")
-        output_audio_path = os.path.join(tempfile.gettempdir(), f"response_{uuid.uuid4()}.wav")
+        output_audio_path = audio_spool.new_path(prefix="response", suffix=".wav")
         
         try:
             tts_success = audio_processor.text_to_speech_edge(
@@ -196,7 +238,9 @@ async def process_audio(
                     output_path=output_audio_path
                 )
             
-            if not tts_success:
+            if tts_success:
+                audio_spool.register(output_audio_path)
+            else:
                 output_audio_path = None
                 print(" TTS unavailable, returning text only")
         except Exception as e:
@@ -204,7 +248,7 @@ async def process_audio(
             output_audio_path = None
         
         # Clean up temp audio file
-        background_tasks.add_task(_safe_delete, temp_audio_path)
+        background_tasks.add_task(audio_spool.release, temp_audio_path)
         
         # Prepare response
         response = AssistantResponse(
@@ -243,59 +287,138 @@ async def process_audio(
 async def process_text_query(query: str, language: Optional[str] = None):
     """
     Process text query directly (for testing or text-based interactions)
+    Repeat queries are served from the response cache.
     """
     try:
         if not query or query.strip() == "":
             raise HTTPException(status_code=400, detail="Query cannot be empty")
         
+        # The cache key and the detector see the same normalized text
+        query = normalize_query(query)
+        catalog = retriever.catalog
+        catalog_version = catalog.version
+        cache_key = (query, language or "")
+        cached_body = response_cache.get("/text-query", cache_key, catalog_version)
+        if cached_body is not None:
+            return Response(content=cached_body, media_type="application/json")
+        
         # Parse query
         parsed_query = intent_detector.parse_query(query)
         
-        intent = parsed_query["intent"]
-        disaster = parsed_query["disaster"]
-        age = parsed_query["age"]
-        detected_language = parsed_query["language"]
-        
         # Retrieve schemes
-        eligible_schemes = retriever.get_eligible_schemes(
-            intent=intent,
-            disaster=disaster,
-            age=age if age > 0 else 30,
-            language=detected_language
-        )
+        eligible_schemes = retriever.get_eligible_schemes(**_eligibility_profile(parsed_query), catalog=catalog)
         
-        # Generate response
-        response_text = _generate_response(
-            intent=intent,
-            disaster=disaster,
-            age=age,
-            eligible_schemes=eligible_schemes,
-            language=detected_language
-        )
+        body = _text_query_body(parsed_query, eligible_schemes)
+        response_cache.put("/text-query", cache_key, catalog_version, body)
         
-        return {
-            "detected_language": detected_language,
-            "detected_intent": intent,
-            "detected_disaster": disaster,
-            "farmer_age": age,
-            "confidence": parsed_query["confidence"],
-            "eligible_schemes": eligible_schemes,
-            "response_text": response_text
-        }
+        return Response(content=body, media_type="application/json")
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/text-query/batch")
+async def process_text_query_batch(
+    queries: List[Union[TextQueryItem, str]] = Body(...),
+    stream: bool = False
+):
+    """
+    Process many text queries in one request (SMS/WhatsApp bulk pushes)
+    
+    Body: JSON array of strings or {"query": ..., "language": ...} objects.
+    Intent detection runs over the whole batch, and queries that share an
+    (intent, disaster, age, language) profile share one eligibility lookup.
+    
+    Returns per-item results in input order, each shaped like a
+    /text-query response (or {"error": ...}). With ?stream=true the
+    results are streamed as NDJSON, one line per query.
+    """
+    if not queries:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large ({len(queries)} > {MAX_BATCH_QUERIES} queries)"
+        )
+    
+    items = [
+        TextQueryItem(query=item) if isinstance(item, str) else item
+        for item in queries
+    ]
+    for item in items:
+        item.query = normalize_query(item.query)
+    catalog = retriever.catalog
+    catalog_version = catalog.version
+    
+    # Serve repeats from the /text-query cache, detect the rest together
+    cache_keys = [(item.query, item.language or "") for item in items]
+    bodies: List[Optional[bytes]] = [None] * len(items)
+    pending = []
+    for i, item in enumerate(items):
+        if not item.query or item.query.strip() == "":
+            bodies[i] = _json_bytes({"error": "Query cannot be empty"})
+            continue
+        bodies[i] = response_cache.get("/text-query", cache_keys[i], catalog_version)
+        if bodies[i] is None:
+            pending.append(i)
+    
+    parsed_queries = dict(zip(
+        pending,
+        intent_detector.parse_queries([items[i].query for i in pending])
+    ))
+    
+    # One eligibility lookup per distinct profile
+    schemes_by_profile: Dict[tuple, List] = {}
+    
+    def item_body(i: int) -> bytes:
+        if bodies[i] is not None:
+            return bodies[i]
+        try:
+            profile = _eligibility_profile(parsed_queries[i])
+            profile_key = tuple(profile.values())
+            if profile_key not in schemes_by_profile:
+                schemes_by_profile[profile_key] = retriever.get_eligible_schemes(**profile, catalog=catalog)
+            body = _text_query_body(parsed_queries[i], schemes_by_profile[profile_key])
+            response_cache.put("/text-query", cache_keys[i], catalog_version, body)
+        except Exception as e:
+            body = _json_bytes({"error": str(e)})
+        return body
+    
+    if stream:
+        def ndjson_lines():
+            for i in range(len(items)):
+                yield item_body(i) + b"\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
+    results = [item_body(i) for i in range(len(items))]
+    print(f" Batch: {len(items)} queries, {len(pending)} detected, {len(schemes_by_profile)} eligibility lookups")
+    body = (
+        b'{"total_queries":' + str(len(items)).encode() +
+        b',"eligibility_lookups":' + str(len(schemes_by_profile)).encode() +
+        b',"results":[' + b",".join(results) + b"]}"
+    )
+    return Response(content=body, media_type="application/json")
+
 @app.get("/schemes")
 async def list_all_schemes(
     intent: Optional[str] = None,
     disaster: Optional[str] = None,
-    age: Optional[int] = None
+    age: Optional[int] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_SCHEME_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     List available schemes with optional filtering
+    
+    Unfiltered listings are paginated and conditional:
+    - offset/limit, or cursor (the next_cursor of the previous page)
+    - fields: comma-separated projection (e.g. "scheme_id,scheme_name")
+    - ETag is the catalog version; If-None-Match returns 304 when unchanged
     """
     try:
         if intent and disaster and age:
@@ -304,23 +427,56 @@ async def list_all_schemes(
                 disaster=disaster,
                 age=age
             )
+            return {
+                "total_schemes": len(schemes),
+                "schemes": schemes
+            }
+        
+        catalog = retriever.catalog
+        catalog_version = catalog.version
+        etag = f'"{catalog_version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        
+        if fields:
+            projection = tuple(f.strip() for f in fields.split(",") if f.strip())
+            unknown = [f for f in projection if f not in SCHEME_LIST_FIELDS]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(SCHEME_LIST_FIELDS)}"
+                )
         else:
-            # Return all schemes
-            all_results = retriever.collection.get()
-            schemes = []
-            for meta in all_results["metadatas"]:
-                schemes.append({
-                    "scheme_id": meta["scheme_id"],
-                    "scheme_name": meta["scheme_name"],
-                    "intent": meta["intent"],
-                    "official_url": meta["official_url"]
-                })
-        
-        return {
-            "total_schemes": len(schemes),
-            "schemes": schemes
-        }
+            projection = DEFAULT_SCHEME_LIST_FIELDS
+        
+        cache_key = (cursor or "", 0 if cursor else offset, limit, projection)
+        body = response_cache.get("/schemes", cache_key, catalog_version)
+        
+        if body is None:
+            rows = catalog.rows
+            start = offset
+            if cursor:
+                start = bisect.bisect_right(rows, cursor, key=lambda row: str(row["scheme_id"]))
+            page = rows[start:start + limit]
+            has_more = start + limit < len(rows)
+            
+            body = _json_bytes({
+                "total_schemes": len(rows),
+                "offset": start,
+                "limit": limit,
+                "count": len(page),
+                "next_cursor": str(page[-1]["scheme_id"]) if page and has_more else None,
+                "catalog_version": catalog_version,
+                "schemes": [{f: row[f] for f in projection} for row in page]
+            })
+            response_cache.put("/schemes", cache_key, catalog_version, body)
+        
+        return Response(content=body, media_type="application/json", headers=headers)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -341,50 +497,79 @@ async def get_scheme_details(scheme_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Helper Functions
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache size and per-endpoint hit rate"""
+    return response_cache.stats()
 
-def _safe_delete(file_path: str):
-    """Safely delete a file"""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f" Deleted temp file: {file_path}")
-    except Exception as e:
-        print(f" Could not delete {file_path}: {e}")
 
-def _generate_response(
-    intent: str,
-    disaster: str,
-    age: int,
-    eligible_schemes: List,
-    language: str = "hi"
-) -> str:
+@app.post("/admin/reload-catalog")
+async def reload_catalog(x_admin_token: Optional[str] = Header(None)):
     """
-    Generate farmer-friendly response text
-    """
-    
-    # Greeting messages
-    greetings = {
-        "hi": "नमस्कार भाई! मैं आपके कृषि सहायता के लिए यहाँ हूँ।",
-        "en": "Hello farmer! I'm here to help you with agricultural support.",
-        "garhwali": "नमस्कार भैया! मैं तेरो कृषि सहायता के लिए यहाँ छु।",
-        "kumaoni": "नमस्कार भैया! मैं तेरो खेतिहर सहायता के लिए यहाँ छु।"
-    }
+    Re-read data/uttarakhand_schemes.json and swap in the new catalog
     
-    # Build response
-    response = greetings.get(language, greetings["hi"]) + "\n\n"
+    Parsing and indexing run off the event loop; requests already in
+    flight finish on the previous catalog. Requires the X-Admin-Token
+    header when KM_ADMIN_TOKEN is set.
+    """
+    admin_token = os.getenv("KM_ADMIN_TOKEN")
+    if admin_token and x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
     
-    if eligible_schemes:
-        response += f"आपके लिए {len(eligible_schemes)} योजनाएं उपलब्ध हैं:\n\n"
-        
-        for i, scheme in enumerate(eligible_schemes, 1):
-            response += f"{i}. {scheme['scheme_name']}\n"
-            response += f"   आवश्यक दस्तावेज: {', '.join(scheme['required_fields'][:3])}\n"
-            response += f"   अधिक जानकारी: {scheme['official_url']}\n\n"
-    else:
-        response += "क्षमा करें, आपकी स्थिति के लिए अभी कोई योजना उपलब्ध नहीं है।"
+    try:
+        result = await asyncio.to_thread(retriever.reload_catalog)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Catalog not reloaded: {e}")
     
-    return response
+    return result
+
+
+# Helper Functions
+
+def _json_bytes(data) -> bytes:
+    """Serialize a response body the same way JSONResponse does"""
+    return json.dumps(
+        data,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def _eligibility_profile(parsed_query: Dict) -> Dict:
+    """get_eligible_schemes arguments for a parsed query"""
+    age = parsed_query["age"]
+    return {
+        "intent": parsed_query["intent"],
+        "disaster": parsed_query["disaster"],
+        "age": age if age > 0 else 30,
+        "language": parsed_query["language"]
+    }
+
+def _text_query_body(parsed_query: Dict, eligible_schemes: List) -> bytes:
+    """Serialized /text-query response for a parsed query and its schemes"""
+    response_text = generate_response(
+        intent=parsed_query["intent"],
+        disaster=parsed_query["disaster"],
+        age=parsed_query["age"],
+        eligible_schemes=eligible_schemes,
+        language=parsed_query["language"]
+    )
+    return _json_bytes({
+        "detected_language": parsed_query["language"],
+        "detected_intent": parsed_query["intent"],
+        "detected_disaster": parsed_query["disaster"],
+        "farmer_age": parsed_query["age"],
+        "confidence": parsed_query["confidence"],
+        "eligible_schemes": eligible_schemes,
+        "response_text": response_text
+    })
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
 
 
 # Root Endpoint
@@ -400,8 +585,11 @@ async def root():
             "health": "/health",
             "process_audio": "POST /process-audio (multipart/form-data with audio file)",
             "text_query": "POST /text-query (with query parameter)",
-            "list_schemes": "GET /schemes",
+            "text_query_batch": "POST /text-query/batch (JSON array of queries, ?stream=true for NDJSON)",
+            "list_schemes": "GET /schemes (offset/limit or cursor, fields, If-None-Match)",
             "scheme_details": "GET /scheme/{scheme_id}",
+            "cache_stats": "GET /cache/stats",
+            "reload_catalog": "POST /admin/reload-catalog",
             "docs": "/docs"
         }
     }
@@ -1,11 +1,13 @@
 import os
 import json
-from typing import List, Dict, Optional
-from chromadb import Client
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import threading
+from typing import Any, Iterator, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
 
+import numpy as np
+
+from scheme_store import SchemeRecord, SchemeStore
+
 
 # Language codes
 SUPPORTED_LANGUAGES = {
@@ -16,87 +18,352 @@ SUPPORTED_LANGUAGES = {
 }
 
 
+# Partition holding central schemes, merged into every state's results
+SHARED_PARTITION = "ALL"
+
+
+def partition_key(state: str) -> str:
+    """Partition a scheme belongs to (state partitions are keyed in lowercase)"""
+    state = state or SHARED_PARTITION
+    return state if state == SHARED_PARTITION else state.lower()
+
+
+# Map detected intents to scheme intents
+INTENT_MAP = {
+    'crop_loss': ['crop_insurance', 'agri_development', 'income_support'],
+    'pest_disease': ['agri_extension', 'pest_management', 'agri_development'],
+    'water_irrigation': ['irrigation_support', 'agri_infrastructure', 'agri_development'],
+    'soil_fertility': ['soil_testing', 'agri_development'],
+    'weather_damage': ['crop_insurance', 'agri_development', 'disaster_relief'],
+    'seed_quality': ['agri_extension', 'agri_development'],
+    'financial_support': ['agri_credit', 'income_support', 'pension_support'],
+    'general_support': ['agri_development', 'income_support', 'agri_credit', 'crop_insurance'],
+}
+
+# Map detected disasters to scheme disasters
+DISASTER_MAP = {
+    'flood': ['flood'],
+    'drought': ['drought'],
+    'hail': ['hailstorm'],
+    'heavy_rain': ['flood'],
+    'frost': ['hailstorm'],
+    'wind_damage': ['cyclone'],
+    'pest_infestation': ['pest_attack'],
+    'disease': ['disease'],
+    'unspecified': None,  # Accept all
+}
+
+
+def matching_criteria(intent: str, disaster: str) -> Tuple[List[str], Optional[List[str]]]:
+    """Scheme intents and disasters a detected intent/disaster maps to (None = any disaster)"""
+    return INTENT_MAP.get(intent, [intent]), DISASTER_MAP.get(disaster, [disaster])
+
+
+DEFAULT_SCHEMES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "uttarakhand_schemes.json"
+)
+
+
+def load_scheme_file(path: str = DEFAULT_SCHEMES_PATH) -> List[Dict]:
+    """Read a uttarakhand_schemes.json-format catalog"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+PROFILE_DEFAULTS = {
+    "age": 0,
+    "intent": "general_support",
+    "disaster": "unspecified",
+    "state": "Uttarakhand",
+}
+
+
+def _profile_columns(profiles) -> Dict[str, Sequence]:
+    """Farmer profiles (list of dicts or dict of columns) -> dict of columns"""
+    if isinstance(profiles, dict):
+        n = len(next(iter(profiles.values()))) if profiles else 0
+        columns = {
+            field: profiles[field] if field in profiles else [default] * n
+            for field, default in PROFILE_DEFAULTS.items()
+        }
+        columns["profile_id"] = profiles["profile_id"] if "profile_id" in profiles else range(n)
+    else:
+        columns = {
+            field: [profile.get(field, default) for profile in profiles]
+            for field, default in PROFILE_DEFAULTS.items()
+        }
+        columns["profile_id"] = [profile.get("profile_id", i) for i, profile in enumerate(profiles)]
+    
+    # Unknown ages mean "any age", like age=0 in get_eligible_schemes
+    columns["age"] = [age if age is not None and age == age else 0 for age in columns["age"]]
+    return columns
+
+
+class InMemorySchemeCollection:
+    """
+    Metadata-only stand-in for the Chroma collection
+    
+    Supports the add()/get() calls the retriever makes, without
+    embeddings. Used for in-memory retrievers (offline tools, benchmarks).
+    """
+    
+    def __init__(self):
+        self._metadatas: Dict[str, Dict] = {}
+    
+    def add(self, documents: List[str] = None, metadatas: List[Dict] = None, ids: List[str] = None):
+        for scheme_id, meta in zip(ids, metadatas):
+            # Like Chroma, adding an existing id is ignored
+            self._metadatas.setdefault(scheme_id, meta)
+    
+    def get(self, ids: List[str] = None, include: List[str] = None) -> Dict:
+        if ids is None:
+            ids = list(self._metadatas)
+        else:
+            ids = [scheme_id for scheme_id in ids if scheme_id in self._metadatas]
+        return {
+            "ids": ids,
+            "metadatas": [self._metadatas[scheme_id] for scheme_id in ids],
+            "documents": None
+        }
+
+
+class CatalogSnapshot:
+    """
+    One immutable version of the scheme catalog
+    
+    Holds the columnar scheme store, state partitions and sorted row
+    views built from the indexed metadata. The retriever swaps whole
+    snapshots, so a request that holds one keeps a consistent view while
+    a reload happens.
+    """
+    
+    def __init__(self, metadatas: List[Dict]):
+        self.store = SchemeStore(metadatas)
+        
+        # State partitions: key -> sorted positions in the store
+        partitions: Dict[str, List[np.ndarray]] = {}
+        for code, state in enumerate(self.store.states.values):
+            positions = np.flatnonzero(self.store.state_code == code).astype(np.int32)
+            partitions.setdefault(partition_key(state), []).append(positions)
+        self.partitions: Dict[str, np.ndarray] = {
+            key: np.sort(np.concatenate(parts)) for key, parts in partitions.items()
+        }
+        
+        # Listing rows in scheme_id order (record views, materialized on access)
+        self.rows = self.store.sorted_records()
+        self.version = self.store.digest[:16]
+        self.loaded_at = datetime.now().isoformat()
+    
+    def candidates(self, state: str) -> np.ndarray:
+        """
+        Store positions of the schemes a farmer in `state` can be eligible for
+        
+        Only the state's partition and the shared partition are read; they
+        are merged back into collection order so results match a full scan.
+        """
+        local = self.partitions.get(state.lower())
+        shared = self.partitions.get(SHARED_PARTITION)
+        if local is None or shared is None:
+            found = local if shared is None else shared
+            return found if found is not None else np.empty(0, dtype=np.int32)
+        return np.sort(np.concatenate((local, shared)))
+    
+    def get(self, scheme_id: str) -> Optional[SchemeRecord]:
+        return self.store.get(scheme_id)
+    
+    def partition_sizes(self) -> Dict[str, int]:
+        """Number of schemes per state partition"""
+        return {key: len(rows) for key, rows in self.partitions.items()}
+
+
 class MultilingualSchemeRetriever:
     """
     RAG system for scheme retrieval with multilingual support
     FIXED: Better intent/disaster matching
     """
     
-    def __init__(self, db_path: str = "rag_db"):
+    def __init__(self, db_path: str = "rag_db", schemes: Optional[List[Dict]] = None):
+        """
+        Args:
+            db_path: ChromaDB directory (relative to this file)
+            schemes: Scheme dicts (uttarakhand_schemes.json format). When
+                given, the retriever runs fully in memory - no ChromaDB or
+                embedding model is loaded.
+        """
         self.db_path = db_path
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         
-        # Initialize ChromaDB
-        self.client = Client(
-            Settings(
-                persist_directory=os.path.join(self.base_dir, db_path),
-                anonymized_telemetry=False
+        if schemes is not None:
+            self.client = None
+            self.embedding_model = None
+            self.collection = InMemorySchemeCollection()
+            self._index_schemes(schemes)
+        else:
+            from chromadb import Client
+            from chromadb.config import Settings
+            from sentence_transformers import SentenceTransformer
+            
+            # Initialize ChromaDB
+            self.client = Client(
+                Settings(
+                    persist_directory=os.path.join(self.base_dir, db_path),
+                    anonymized_telemetry=False
+                )
             )
-        )
-        
-        # Initialize embedding model (multilingual)
-        self.embedding_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-        
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name="schemes_multilingual",
-            metadata={"hnsw:space": "cosine"}
-        )
+            
+            # Initialize embedding model (multilingual)
+            self.embedding_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+            
+            # Get or create collection
+            self.collection = self.client.get_or_create_collection(
+                name="schemes_multilingual",
+                metadata={"hnsw:space": "cosine"}
+            )
+            
+            # Initialize schemes
+            self._initialize_schemes()
         
-        # Initialize schemes
-        self._initialize_schemes()
+        # Current catalog snapshot; replaced as a whole on reload
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._reload_lock = threading.Lock()
+        self._refresh_catalog()
     
     def _initialize_schemes(self):
         """Load and index schemes from JSON"""
-        data_path = os.path.join(self.base_dir, "data", "uttarakhand_schemes.json")
-        
         if len(self.collection.get()["ids"]) == 0:
             print(" Indexing Uttarakhand schemes into ChromaDB...")
             
-            with open(data_path, "r", encoding="utf-8") as f:
-                schemes = json.load(f)
-            
-            for scheme in schemes:
-                # Create comprehensive document
-                document = f"""
-                Scheme: {scheme['scheme_name']}
-                Intent: {scheme['intent']}
-                State: {scheme['state']}
-                Age Eligibility: {scheme['min_age']} to {scheme['max_age']} years
-                Allowed Disasters: {', '.join(scheme['allowed_disasters'])}
-                Required Documents: {', '.join(scheme['required_fields'])}
-                """
-                
-                # Metadata with all required info
-                metadata = {
-                    "scheme_id": scheme["scheme_id"],
-                    "scheme_name": scheme["scheme_name"],
-                    "state": scheme["state"],
-                    "intent": scheme["intent"],
-                    "min_age": scheme["min_age"],
-                    "max_age": scheme["max_age"],
-                    "allowed_disasters": ",".join(scheme["allowed_disasters"]),
-                    "required_fields": ",".join(scheme["required_fields"]),
-                    "official_url": scheme["official_url"],
-                    "indexed_at": datetime.now().isoformat(),
-                    "language": "multilingual"
-                }
-                
-                self.collection.add(
-                    documents=[document],
-                    metadatas=[metadata],
-                    ids=[scheme["scheme_id"]]
-                )
+            self._index_schemes(load_scheme_file())
             
             print(" All schemes indexed successfully!")
     
+    @staticmethod
+    def _scheme_document(scheme: Dict) -> str:
+        """Text indexed for a scheme"""
+        return f"""
+            Scheme: {scheme['scheme_name']}
+            Intent: {scheme['intent']}
+            State: {scheme['state']}
+            Age Eligibility: {scheme['min_age']} to {scheme['max_age']} years
+            Allowed Disasters: {', '.join(scheme['allowed_disasters'])}
+            Required Documents: {', '.join(scheme['required_fields'])}
+            """
+    
+    @staticmethod
+    def _scheme_metadata(scheme: Dict) -> Dict:
+        """Metadata with all required info (raises KeyError on incomplete schemes)"""
+        return {
+            "scheme_id": scheme["scheme_id"],
+            "scheme_name": scheme["scheme_name"],
+            "state": scheme["state"],
+            "intent": scheme["intent"],
+            "min_age": scheme["min_age"],
+            "max_age": scheme["max_age"],
+            "allowed_disasters": ",".join(scheme["allowed_disasters"]),
+            "required_fields": ",".join(scheme["required_fields"]),
+            "official_url": scheme["official_url"],
+            "indexed_at": datetime.now().isoformat(),
+            "language": "multilingual"
+        }
+    
+    def _index_schemes(self, schemes: List[Dict]):
+        """Add scheme dicts to the collection"""
+        for scheme in schemes:
+            self.collection.add(
+                documents=[self._scheme_document(scheme)],
+                metadatas=[self._scheme_metadata(scheme)],
+                ids=[scheme["scheme_id"]]
+            )
+    
+    def _refresh_catalog(self) -> str:
+        """Rebuild the catalog snapshot from the indexed scheme metadata"""
+        all_results = self.collection.get(include=["metadatas"])
+        self._snapshot = CatalogSnapshot(all_results["metadatas"] or [])
+        return self._snapshot.version
+    
+    @property
+    def catalog(self) -> CatalogSnapshot:
+        """
+        Current catalog snapshot
+        
+        Hold on to it for the whole request to get a consistent view
+        across a concurrent reload.
+        """
+        return self._snapshot
+    
+    @property
+    def catalog_version(self) -> str:
+        return self._snapshot.version
+    
+    def reload_catalog(self, path: str = DEFAULT_SCHEMES_PATH) -> Dict:
+        """
+        Re-read the scheme JSON and atomically swap in the new catalog
+        
+        The new snapshot is built completely before it replaces the current
+        one; requests holding the old snapshot finish on it. An unreadable
+        or incomplete file raises and leaves the current catalog in place.
+        
+        Returns:
+            Dict with changed, previous_version, catalog_version, total_schemes
+        """
+        with self._reload_lock:
+            schemes = load_scheme_file(path)
+            metadatas = [self._scheme_metadata(scheme) for scheme in schemes]
+            snapshot = CatalogSnapshot(metadatas)
+            previous_version = self._snapshot.version
+            
+            if snapshot.version != previous_version:
+                if self.client is None:
+                    collection = InMemorySchemeCollection()
+                    collection.add(metadatas=metadatas, ids=[meta["scheme_id"] for meta in metadatas])
+                    self.collection = collection
+                else:
+                    self._sync_collection(schemes, metadatas)
+                self._snapshot = snapshot
+                print(f" Scheme catalog reloaded: {previous_version} -> {snapshot.version} ({len(snapshot.rows)} schemes)")
+            
+            return {
+                "changed": snapshot.version != previous_version,
+                "previous_version": previous_version,
+                "catalog_version": self._snapshot.version,
+                "total_schemes": len(self._snapshot.rows)
+            }
+    
+    def _sync_collection(self, schemes: List[Dict], metadatas: List[Dict], batch_size: int = 500):
+        """Bring the persistent Chroma collection in line with a reloaded catalog"""
+        new_ids = [scheme["scheme_id"] for scheme in schemes]
+        for start in range(0, len(schemes), batch_size):
+            end = start + batch_size
+            self.collection.upsert(
+                documents=[self._scheme_document(scheme) for scheme in schemes[start:end]],
+                metadatas=metadatas[start:end],
+                ids=new_ids[start:end]
+            )
+        removed = set(self.collection.get()["ids"]) - set(new_ids)
+        if removed:
+            self.collection.delete(ids=sorted(removed))
+    
+    def list_schemes(self) -> Sequence[SchemeRecord]:
+        """
+        All indexed schemes, sorted by scheme_id
+        
+        Read-only row views over the current snapshot: row["scheme_id"],
+        row["allowed_disasters"], ... or row.to_row() for a dict.
+        """
+        return self._snapshot.rows
+    
+    def partition_sizes(self) -> Dict[str, int]:
+        """Number of schemes per state partition"""
+        return self._snapshot.partition_sizes()
+    
     def get_eligible_schemes(
         self,
         intent: str,
         disaster: str,
         age: int,
         state: str = "Uttarakhand",
-        language: str = "hi"
+        language: str = "hi",
+        catalog: Optional[CatalogSnapshot] = None
     ) -> List[Dict]:
         """
         Retrieve eligible schemes based on farmer criteria
@@ -107,129 +374,147 @@ class MultilingualSchemeRetriever:
             age: Farmer's age
             state: State (default: Uttarakhand)
             language: Language code (hi, garhwali, kumaoni, en)
+            catalog: Snapshot to search (default: the current one)
         
         Returns:
             List of eligible schemes with translated names
         """
         
-        # Map detected intents to scheme intents
-        intent_map = {
-            'crop_loss': ['crop_insurance', 'agri_development', 'income_support'],
-            'pest_disease': ['agri_extension', 'pest_management', 'agri_development'],
-            'water_irrigation': ['irrigation_support', 'agri_infrastructure', 'agri_development'],
-            'soil_fertility': ['soil_testing', 'agri_development'],
-            'weather_damage': ['crop_insurance', 'agri_development', 'disaster_relief'],
-            'seed_quality': ['agri_extension', 'agri_development'],
-            'financial_support': ['agri_credit', 'income_support', 'pension_support'],
-            'general_support': ['agri_development', 'income_support', 'agri_credit', 'crop_insurance'],
-        }
-        
-        # Map detected disasters to scheme disasters
-        disaster_map = {
-            'flood': ['flood'],
-            'drought': ['drought'],
-            'hail': ['hailstorm'],
-            'heavy_rain': ['flood'],
-            'frost': ['hailstorm'],
-            'wind_damage': ['cyclone'],
-            'pest_infestation': ['pest_attack'],
-            'disease': ['disease'],
-            'unspecified': None,  # Accept all
-        }
-        
         # Get matching intents and disasters
-        matching_intents = intent_map.get(intent, [intent])
-        matching_disasters = disaster_map.get(disaster, [disaster])
+        matching_intents, matching_disasters = matching_criteria(intent, disaster)
         
         print(f" Looking for intents: {matching_intents}")
         if matching_disasters:
             print(f" Looking for disasters: {matching_disasters}")
         
-        # Get ALL schemes first
-        all_results = self.collection.get(include=["metadatas"])
-        eligible_schemes = []
+        catalog = catalog or self._snapshot
         
-        if not all_results["metadatas"]:
-            return eligible_schemes
+        # Only this state's partition plus central schemes, filtered on the
+        # intent / disaster / age columns (a disaster-less query accepts all)
+        positions = catalog.store.eligible(
+            catalog.candidates(state),
+            matching_intents,
+            matching_disasters,
+            age
+        )
+        eligible_schemes = [catalog.store.record(position).to_eligible() for position in positions]
         
-        # Filter schemes based on criteria
-        for meta in all_results["metadatas"]:
-            scheme_intent = meta.get("intent", "").lower()
-            allowed_disasters = [d.strip().lower() for d in meta.get("allowed_disasters", "").split(",")]
-            min_age = meta.get("min_age", 0)
-            max_age = meta.get("max_age", 99)
-            state_meta = meta.get("state", "ALL")
-            
-            # Check intent match
-            intent_match = any(
-                mi.lower() in scheme_intent or scheme_intent in mi.lower()
-                for mi in matching_intents
-            )
-            
-            if not intent_match:
-                print(f" {meta['scheme_name']}: intent '{scheme_intent}' doesn't match {matching_intents}")
-                continue
-            
-            # Check disaster match (if specified)
-            if matching_disasters:
-                disaster_match = any(
-                    md.lower() in allowed_disasters or d in md.lower()
-                    for md in matching_disasters
-                    for d in allowed_disasters
-                )
-            else:
-                # No specific disaster, accept all
-                disaster_match = True
-            
-            if not disaster_match:
-                print(f" {meta['scheme_name']}: disaster doesn't match. Allowed: {allowed_disasters}, Looking for: {matching_disasters}")
-                continue
-            
-            # Check age match
-            if age > 0 and not (min_age <= age <= max_age):
-                print(f" {meta['scheme_name']}: age {age} outside range {min_age}-{max_age}")
+        print(f" Total eligible schemes: {len(eligible_schemes)}")
+        return eligible_schemes
+    
+    def _eligibility_chunks(
+        self,
+        columns: Dict[str, Sequence],
+        catalog: CatalogSnapshot,
+        chunk_cells: int
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Evaluate many profiles against the catalog
+        
+        Profiles sharing (intent, disaster, state) share one static filter
+        (same semantics as get_eligible_schemes); ages are then compared to
+        the surviving schemes by broadcasting, at most chunk_cells
+        profile x scheme cells at a time.
+        
+        Yields:
+            (profile indexes, store positions) of eligible pairs
+        """
+        ages = np.asarray(columns["age"], dtype=np.int32)
+        store = catalog.store
+        
+        groups: Dict[Tuple[str, str, str], List[int]] = {}
+        for i, key in enumerate(zip(columns["intent"], columns["disaster"], columns["state"])):
+            groups.setdefault(key, []).append(i)
+        
+        for (intent, disaster, state), members in groups.items():
+            matching_intents, matching_disasters = matching_criteria(intent, disaster)
+            positions = store.eligible(catalog.candidates(state), matching_intents, matching_disasters, age=0)
+            if len(positions) == 0:
                 continue
             
-            # Check state match
-            if state_meta != "ALL" and state_meta.lower() != state.lower():
-                print(f" {meta['scheme_name']}: state mismatch")
-                continue
+            members = np.asarray(members, dtype=np.int32)
+            min_age = store.min_age[positions][None, :]
+            max_age = store.max_age[positions][None, :]
+            rows_per_chunk = max(1, chunk_cells // len(positions))
             
-            # All checks passed!
-            scheme_data = {
-                "scheme_id": meta.get("scheme_id"),
-                "scheme_name": meta.get("scheme_name"),
-                "intent": meta.get("intent"),
-                "required_fields": [f.strip() for f in meta.get("required_fields", "").split(",")],
-                "official_url": meta.get("official_url"),
-                "allowed_disasters": allowed_disasters,
-                "age_eligibility": f"{min_age} - {max_age} years"
-            }
-            eligible_schemes.append(scheme_data)
-            print(f" Eligible: {meta.get('scheme_name')}")
+            for start in range(0, len(members), rows_per_chunk):
+                chunk = members[start:start + rows_per_chunk]
+                age = ages[chunk][:, None]
+                eligible = (age <= 0) | ((min_age <= age) & (age <= max_age))
+                rows, cols = np.nonzero(eligible)
+                if len(rows):
+                    yield chunk[rows], positions[cols]
+    
+    def eligibility_matrix(
+        self,
+        profiles,
+        chunk_cells: int = 16_000_000,
+        catalog: Optional[CatalogSnapshot] = None
+    ):
+        """
+        Sparse profile x scheme eligibility matrix for bulk outreach
         
-        print(f" Total eligible schemes: {len(eligible_schemes)}")
-        return eligible_schemes
+        Args:
+            profiles: List of dicts, or a dict of equal-length columns, with
+                age, intent, disaster and state (missing fields default to
+                age 0 = any, "general_support", "unspecified", "Uttarakhand")
+            chunk_cells: Max profile x scheme cells evaluated at once
+            catalog: Snapshot to evaluate (default: the current one)
+        
+        Returns:
+            (scipy.sparse.csr_matrix of shape profiles x schemes with True
+            where eligible, list of scheme_ids for the columns)
+        """
+        from scipy.sparse import csr_matrix
+        
+        catalog = catalog or self._snapshot
+        store = catalog.store
+        columns = _profile_columns(profiles)
+        
+        row_parts, col_parts = [], []
+        for rows, positions in self._eligibility_chunks(columns, catalog, chunk_cells):
+            row_parts.append(rows)
+            col_parts.append(positions)
+        
+        rows = np.concatenate(row_parts) if row_parts else np.empty(0, dtype=np.int32)
+        cols = np.concatenate(col_parts) if col_parts else np.empty(0, dtype=np.int32)
+        matrix = csr_matrix(
+            (np.ones(len(rows), dtype=bool), (rows, cols)),
+            shape=(len(columns["age"]), len(store))
+        )
+        scheme_ids = [store.ids[i] for i in range(len(store))]
+        return matrix, scheme_ids
+    
+    def iter_eligible_pairs(
+        self,
+        profiles,
+        chunk_cells: int = 16_000_000,
+        catalog: Optional[CatalogSnapshot] = None
+    ) -> Iterator[Tuple[Any, str]]:
+        """
+        Stream (profile_id, scheme_id) eligible pairs
+        
+        Same inputs as eligibility_matrix; profile_id comes from the
+        profiles' "profile_id" field (default: the profile's index). Pairs
+        are grouped by (intent, disaster, state), not in input order.
+        """
+        catalog = catalog or self._snapshot
+        store = catalog.store
+        columns = _profile_columns(profiles)
+        profile_ids = columns["profile_id"]
+        
+        for rows, positions in self._eligibility_chunks(columns, catalog, chunk_cells):
+            for row, position in zip(rows.tolist(), positions.tolist()):
+                yield profile_ids[row], store.ids[position]
     
-    def get_scheme_details(self, scheme_id: str) -> Optional[Dict]:
+    def get_scheme_details(self, scheme_id: str, catalog: Optional[CatalogSnapshot] = None) -> Optional[Dict]:
         """Get detailed information about a specific scheme"""
-        results = self.collection.get(ids=[scheme_id])
+        record = (catalog or self._snapshot).get(scheme_id)
         
-        if not results["metadatas"] or len(results["metadatas"]) == 0:
+        if record is None:
             return None
         
-        meta = results["metadatas"][0]
-        return {
-            "scheme_id": meta["scheme_id"],
-            "scheme_name": meta["scheme_name"],
-            "state": meta["state"],
-            "intent": meta["intent"],
-            "min_age": meta["min_age"],
-            "max_age": meta["max_age"],
-            "allowed_disasters": meta["allowed_disasters"].split(","),
-            "required_fields": meta["required_fields"].split(","),
-            "official_url": meta["official_url"]
-        }
+        return record.to_details()
     
     def add_new_scheme(self, scheme_data: Dict) -> bool:
         """Add a new scheme to the database"""
@@ -254,19 +539,76 @@ class MultilingualSchemeRetriever:
                 "indexed_at": datetime.now().isoformat()
             }
             
-            self.collection.add(
-                documents=[document],
-                metadatas=[metadata],
-                ids=[scheme_data["scheme_id"]]
-            )
-            
+            with self._reload_lock:
+                self.collection.add(
+                    documents=[document],
+                    metadatas=[metadata],
+                    ids=[scheme_data["scheme_id"]]
+                )
+                
+                self._refresh_catalog()
             return True
         except Exception as e:
             print(f"Error adding scheme: {e}")
             return False
 
 
-
-# Initialize global retriever
-
-retriever = MultilingualSchemeRetriever()
+class CatalogWatcher:
+    """
+    Reloads a retriever's catalog when the scheme JSON changes on disk
+    
+    Polls the file's mtime/size every `interval` seconds and reloads once
+    the file has been stable for one interval (so half-written saves are
+    not picked up). Reload errors are logged and the old catalog is kept.
+    """
+    
+    def __init__(self, retriever: MultilingualSchemeRetriever, path: str = DEFAULT_SCHEMES_PATH, interval: float = 5.0):
+        self.retriever = retriever
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_seen = self._stat()
+    
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+    
+    def check(self) -> Optional[Dict]:
+        """Reload if the file changed and has settled; returns the reload result"""
+        current = self._stat()
+        if current is None or current == self._last_seen:
+            return None
+        
+        # Wait for the writer to finish
+        if self._stop_event.wait(self.interval) or self._stat() != current:
+            return None
+        
+        self._last_seen = current
+        try:
+            return self.retriever.reload_catalog(self.path)
+        except Exception as e:
+            print(f" Catalog reload failed, keeping version {self.retriever.catalog_version}: {e}")
+            return None
+    
+    def start(self):
+        """Start the background watcher thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="catalog-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background watcher thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
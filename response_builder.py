@@ -0,0 +1,36 @@
+from typing import List
+
+
+def generate_response(
+    intent: str,
+    disaster: str,
+    age: int,
+    eligible_schemes: List,
+    language: str = "hi"
+) -> str:
+    """
+    Generate farmer-friendly response text
+    """
+    
+    # Greeting messages
+    greetings = {
+        "hi": "नमस्कार भाई! मैं आपके कृषि सहायता के लिए यहाँ हूँ।",
+        "en": "Hello farmer! I'm here to help you with agricultural support.",
+        "garhwali": "नमस्कार भैया! मैं तेरो कृषि सहायता के लिए यहाँ छु।",
+        "kumaoni": "नमस्कार भैया! मैं तेरो खेतिहर सहायता के लिए यहाँ छु।"
+    }
+    
+    # Build response
+    response = greetings.get(language, greetings["hi"]) + "\n\n"
+    
+    if eligible_schemes:
+        response += f"आपके लिए {len(eligible_schemes)} योजनाएं उपलब्ध हैं:\n\n"
+        
+        for i, scheme in enumerate(eligible_schemes, 1):
+            response += f"{i}. {scheme['scheme_name']}\n"
+            response += f"   आवश्यक दस्तावेज: {', '.join(scheme['required_fields'][:3])}\n"
+            response += f"   अधिक जानकारी: {scheme['official_url']}\n\n"
+    else:
+        response += "क्षमा करें, आपकी स्थिति के लिए अभी कोई योजना उपलब्ध नहीं है।"
+    
+    return response
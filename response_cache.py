@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize query text for cache keys
+
+    - Unicode NFC (Devanagari typed vs. transcribed can differ in form)
+    - Case-folded
+    - Whitespace collapsed
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of serialized (JSON-encoded) endpoint responses
+
+    Entries are keyed by endpoint and a caller-supplied key, and tagged
+    with the scheme catalog version they were built from. When the
+    catalog version changes, all entries built from older versions are
+    dropped.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: int = 600,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached bodies
+            ttl_seconds: Lifetime of a cached response
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        # (endpoint, key) -> (body, expires_at, catalog_version)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._catalog_version: Optional[str] = None
+
+        # endpoint -> {"hits": n, "misses": n}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, endpoint: str, key: tuple, catalog_version: str) -> Optional[bytes]:
+        """Return the cached body, or None on a miss"""
+        self._check_version(catalog_version)
+        now = time.monotonic()
+
+        with self._lock:
+            counters = self._counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+            entry = self._entries.get((endpoint, key))
+
+            if entry is None or entry[2] != catalog_version:
+                counters["misses"] += 1
+                return None
+
+            body, expires_at, _ = entry
+            if expires_at < now:
+                self._drop((endpoint, key))
+                counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end((endpoint, key))
+            counters["hits"] += 1
+            return body
+
+    def put(self, endpoint: str, key: tuple, catalog_version: str, body: bytes):
+        """Store a serialized response body"""
+        self._check_version(catalog_version)
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if (endpoint, key) in self._entries:
+                self._drop((endpoint, key))
+
+            self._entries[(endpoint, key)] = (
+                body,
+                time.monotonic() + self.ttl_seconds,
+                catalog_version,
+            )
+            self._total_bytes += len(body)
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._total_bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """Drop all entries (or all entries of one endpoint)"""
+        with self._lock:
+            for cache_key in list(self._entries):
+                if endpoint is None or cache_key[0] == endpoint:
+                    self._drop(cache_key)
+            self._invalidations += 1
+
+    def _check_version(self, catalog_version: str):
+        """Drop entries built from an older scheme catalog"""
+        if catalog_version == self._catalog_version:
+            return
+        with self._lock:
+            if catalog_version == self._catalog_version:
+                return
+            if self._catalog_version is not None:
+                print(f" Scheme catalog changed ({self._catalog_version} -> {catalog_version}), clearing response cache")
+                for cache_key, entry in list(self._entries.items()):
+                    if entry[2] != catalog_version:
+                        self._drop(cache_key)
+                self._invalidations += 1
+            self._catalog_version = catalog_version
+
+    def _drop(self, cache_key):
+        """Remove an entry (lock must be held)"""
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[0])
+
+    def stats(self) -> Dict:
+        """Hit rate per endpoint plus size information"""
+        with self._lock:
+            endpoints = {}
+            for endpoint, counters in self._counters.items():
+                total = counters["hits"] + counters["misses"]
+                endpoints[endpoint] = {
+                    "hits": counters["hits"],
+                    "misses": counters["misses"],
+                    "hit_rate": round(counters["hits"] / total, 4) if total else 0.0,
+                }
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "catalog_version": self._catalog_version,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "endpoints": endpoints,
+            }
@@ -0,0 +1,355 @@
+"""
+Compact columnar scheme catalog
+
+The catalog is parsed once into column arrays:
+- NumPy arrays for min_age / max_age and per-scheme codes (intent, state, URL)
+- a disaster bitmask per scheme (uint64 words, one bit per distinct disaster)
+- interned string tables for repeated strings (intents, states, URLs,
+  disasters, required fields) and packed UTF-8 blobs for ids and names
+- CSR-style code lists for each scheme's disasters and required fields
+
+Eligibility filtering is a handful of vectorized mask operations with no
+per-request string parsing; dicts are only built for the schemes returned,
+through __slots__ record views.
+"""
+import hashlib
+import json
+import sys
+from collections.abc import Sequence
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class StringTable:
+    """Interned strings, each stored once and referenced by an integer code"""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(sys.intern(value))
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class PackedStrings:
+    """Unique strings (ids, names) packed into one UTF-8 blob plus offsets"""
+
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, values: Sequence[str]):
+        encoded = [value.encode("utf-8") for value in values]
+        self._offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) for b in encoded], out=self._offsets[1:])
+        self._blob = b"".join(encoded)
+
+    def __getitem__(self, index: int) -> str:
+        return self._blob[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._blob) + self._offsets.nbytes
+
+
+def _code_dtype(table_size: int):
+    """Smallest unsigned dtype that can hold codes into a table"""
+    return np.min_scalar_type(max(table_size - 1, 0))
+
+
+def _csr(lists: List[List[int]], table_size: int):
+    """Code lists -> (offsets, flat codes)"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int32)
+    if lists:
+        np.cumsum([len(codes) for codes in lists], out=offsets[1:])
+    flat = np.fromiter(
+        (code for codes in lists for code in codes),
+        dtype=_code_dtype(table_size),
+        count=int(offsets[-1])
+    )
+    return offsets, flat
+
+
+class SchemeStore:
+    """
+    Columnar view of indexed scheme metadata (Chroma metadata format:
+    allowed_disasters / required_fields as comma-joined strings)
+
+    Rows are addressed by position, in the order the metadata was given.
+    """
+
+    def __init__(self, metadatas: List[Dict]):
+        n = len(metadatas)
+
+        self.intents = StringTable()
+        self.states = StringTable()
+        self.urls = StringTable()
+        self.disasters = StringTable()
+        self.fields = StringTable()
+
+        ids, names, intent_codes, state_codes, url_codes = [], [], [], [], []
+        min_ages, max_ages, disaster_lists, field_lists = [], [], [], []
+        for meta in metadatas:
+            ids.append(str(meta.get("scheme_id")))
+            names.append(meta.get("scheme_name") or "")
+            intent_codes.append(self.intents.code(meta.get("intent") or ""))
+            state_codes.append(self.states.code(meta.get("state", "ALL")))
+            url_codes.append(self.urls.code(meta.get("official_url") or ""))
+            min_ages.append(meta.get("min_age", 0))
+            max_ages.append(meta.get("max_age", 99))
+            # Parsed once here; empty entries are kept (they match any disaster)
+            disaster_lists.append([self.disasters.code(d.strip()) for d in meta.get("allowed_disasters", "").split(",")])
+            field_lists.append([self.fields.code(f.strip()) for f in meta.get("required_fields", "").split(",")])
+
+        self.intent_code = np.array(intent_codes, dtype=_code_dtype(len(self.intents)))
+        self.state_code = np.array(state_codes, dtype=_code_dtype(len(self.states)))
+        self.url_code = np.array(url_codes, dtype=_code_dtype(len(self.urls)))
+        self.min_age = np.array(min_ages, dtype=np.int16)
+        self.max_age = np.array(max_ages, dtype=np.int16)
+
+        self.ids = PackedStrings(ids)
+        self.names = PackedStrings(names)
+        self.disaster_offsets, self.disaster_codes = _csr(disaster_lists, len(self.disasters))
+        self.field_offsets, self.field_codes = _csr(field_lists, len(self.fields))
+
+        # Lowercased tables used for matching
+        self._intents_lower = [value.lower() for value in self.intents.values]
+        self._disasters_lower = [value.lower() for value in self.disasters.values]
+
+        # One bit per distinct disaster, spread over as many uint64 words as needed
+        words = max(1, (len(self.disasters) + 63) // 64)
+        self.disaster_masks = np.zeros((n, words), dtype=np.uint64)
+        owners = np.repeat(np.arange(n), np.diff(self.disaster_offsets))
+        codes = self.disaster_codes.astype(np.int64)
+        bits = np.left_shift(np.uint64(1), (codes % 64).astype(np.uint64))
+        np.bitwise_or.at(self.disaster_masks, (owners, codes // 64), bits)
+
+        # Row positions sorted by scheme_id, and id -> position
+        self.order = np.array(sorted(range(n), key=ids.__getitem__), dtype=np.int32)
+        self.position_by_id: Dict[str, int] = {scheme_id: i for i, scheme_id in enumerate(ids)}
+
+        # Content digest over the listing rows in scheme_id order
+        disasters, fields = self.disasters.values, self.fields.values
+        self.digest = hashlib.sha1(json.dumps(
+            [
+                [
+                    ids[i], names[i], self.states.values[state_codes[i]], self.intents.values[intent_codes[i]],
+                    min_ages[i], max_ages[i],
+                    [disasters[c] for c in disaster_lists[i] if disasters[c]],
+                    [fields[c] for c in field_lists[i] if fields[c]],
+                    self.urls.values[url_codes[i]],
+                ]
+                for i in self.order.tolist()
+            ],
+            ensure_ascii=False
+        ).encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.min_age)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the column data (excluding the id lookup dict)"""
+        arrays = (
+            self.intent_code, self.state_code, self.url_code, self.min_age, self.max_age,
+            self.disaster_offsets, self.disaster_codes, self.field_offsets, self.field_codes,
+            self.disaster_masks, self.order,
+        )
+        tables = (self.intents, self.states, self.urls, self.disasters, self.fields)
+        return (
+            sum(a.nbytes for a in arrays)
+            + self.ids.nbytes + self.names.nbytes
+            + sum(len(v.encode("utf-8")) for t in tables for v in t.values)
+        )
+
+    # Matching
+
+    def intent_table(self, matching_intents: List[str]) -> np.ndarray:
+        """Per intent code: does it match any of matching_intents (substring either way)"""
+        wanted = [mi.lower() for mi in matching_intents]
+        return np.array(
+            [any(mi in si or si in mi for mi in wanted) for si in self._intents_lower],
+            dtype=bool
+        )
+
+    def disaster_query_mask(self, matching_disasters: List[str]) -> np.ndarray:
+        """Bitmask of disaster codes that match any of matching_disasters"""
+        wanted = [md.lower() for md in matching_disasters]
+        mask = np.zeros(self.disaster_masks.shape[1], dtype=np.uint64)
+        for code, d in enumerate(self._disasters_lower):
+            if any(d in md for md in wanted):
+                mask[code // 64] |= np.uint64(1 << (code % 64))
+        return mask
+
+    def eligible(
+        self,
+        positions: np.ndarray,
+        matching_intents: List[str],
+        matching_disasters: Optional[List[str]],
+        age: int
+    ) -> np.ndarray:
+        """
+        Positions (subset of `positions`, same order) that pass the
+        intent, disaster and age checks of get_eligible_schemes
+        """
+        if len(positions) == 0:
+            return positions
+
+        keep = self.intent_table(matching_intents)[self.intent_code[positions]]
+
+        if matching_disasters:
+            query = self.disaster_query_mask(matching_disasters)
+            keep &= (self.disaster_masks[positions] & query).any(axis=1)
+
+        if age > 0:
+            keep &= (self.min_age[positions] <= age) & (self.max_age[positions] >= age)
+
+        return positions[keep]
+
+    # Record access
+
+    def record(self, position: int) -> "SchemeRecord":
+        return SchemeRecord(self, int(position))
+
+    def get(self, scheme_id: str) -> Optional["SchemeRecord"]:
+        position = self.position_by_id.get(scheme_id)
+        return None if position is None else SchemeRecord(self, position)
+
+    def sorted_records(self) -> "SortedSchemeRecords":
+        return SortedSchemeRecords(self)
+
+
+class SchemeRecord:
+    """
+    Read-only view of one scheme
+
+    Supports row["field"] for the catalog listing fields, plus the dict
+    shapes returned by the retriever.
+    """
+
+    __slots__ = ("store", "position")
+
+    def __init__(self, store: SchemeStore, position: int):
+        self.store = store
+        self.position = position
+
+    @property
+    def scheme_id(self) -> str:
+        return self.store.ids[self.position]
+
+    @property
+    def scheme_name(self) -> str:
+        return self.store.names[self.position]
+
+    @property
+    def state(self) -> str:
+        return self.store.states.values[self.store.state_code[self.position]]
+
+    @property
+    def intent(self) -> str:
+        return self.store.intents.values[self.store.intent_code[self.position]]
+
+    @property
+    def min_age(self) -> int:
+        return int(self.store.min_age[self.position])
+
+    @property
+    def max_age(self) -> int:
+        return int(self.store.max_age[self.position])
+
+    @property
+    def official_url(self) -> str:
+        return self.store.urls.values[self.store.url_code[self.position]]
+
+    def disaster_list(self) -> List[str]:
+        """Allowed disasters as indexed (stripped, including empty entries)"""
+        s = self.store
+        values = s.disasters.values
+        return [values[c] for c in s.disaster_codes[s.disaster_offsets[self.position]:s.disaster_offsets[self.position + 1]].tolist()]
+
+    def field_list(self) -> List[str]:
+        """Required fields as indexed (stripped, including empty entries)"""
+        s = self.store
+        values = s.fields.values
+        return [values[c] for c in s.field_codes[s.field_offsets[self.position]:s.field_offsets[self.position + 1]].tolist()]
+
+    @property
+    def allowed_disasters(self) -> List[str]:
+        return [d for d in self.disaster_list() if d]
+
+    @property
+    def required_fields(self) -> List[str]:
+        return [f for f in self.field_list() if f]
+
+    def __getitem__(self, field: str):
+        if field not in LISTING_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def to_row(self) -> Dict:
+        """Catalog listing row (list_schemes / GET /schemes)"""
+        return {field: getattr(self, field) for field in LISTING_FIELDS}
+
+    def to_eligible(self) -> Dict:
+        """get_eligible_schemes result entry"""
+        min_age, max_age = self.min_age, self.max_age
+        return {
+            "scheme_id": self.scheme_id,
+            "scheme_name": self.scheme_name,
+            "intent": self.intent,
+            "required_fields": self.field_list(),
+            "official_url": self.official_url,
+            "allowed_disasters": [d.lower() for d in self.disaster_list()],
+            "age_eligibility": f"{min_age} - {max_age} years"
+        }
+
+    def to_details(self) -> Dict:
+        """get_scheme_details result"""
+        return {
+            "scheme_id": self.scheme_id,
+            "scheme_name": self.scheme_name,
+            "state": self.state,
+            "intent": self.intent,
+            "min_age": self.min_age,
+            "max_age": self.max_age,
+            "allowed_disasters": self.disaster_list(),
+            "required_fields": self.field_list(),
+            "official_url": self.official_url
+        }
+
+
+# Fields of a catalog listing row, in output order
+LISTING_FIELDS = (
+    "scheme_id", "scheme_name", "state", "intent", "min_age", "max_age",
+    "allowed_disasters", "required_fields", "official_url"
+)
+
+
+class SortedSchemeRecords(Sequence):
+    """Records in scheme_id order, as a lazily materialized read-only sequence"""
+
+    __slots__ = ("store",)
+
+    def __init__(self, store: SchemeStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store.order)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SchemeRecord(self.store, int(p)) for p in self.store.order[index]]
+        return SchemeRecord(self.store, int(self.store.order[index]))
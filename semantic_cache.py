@@ -0,0 +1,292 @@
+"""
+Semantic cache for LLM answers
+
+Farmers ask the same few questions in many phrasings ("फसल बाढ़ में खराब",
+"बाढ़ से फसल नष्ट"), usually with the same retrieved schemes. An answer is
+reused when the retrieved scheme IDs match exactly and the query embedding
+is close enough (cosine similarity >= threshold) to a cached query.
+
+- LRU eviction over all entries
+- Persisted to an .npz file (embeddings + JSON metadata), reloaded on start
+- Hit/miss statistics
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from response_cache import normalize_query
+
+
+class NgramEmbedder:
+    """
+    Hashed word + character trigram vectors
+
+    Dependency-free; catches re-phrasings that share most words
+    (word order, suffixes, spelling variants), not true paraphrases.
+    """
+
+    default_threshold = 0.8
+
+    def __init__(self, dims: int = 1024):
+        self.dims = dims
+        self.name = f"ngram-{dims}"
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dims), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = normalize_query(text)
+            features = re.findall(r"\w+", text)
+            padded = f" {text} "
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+            for feature in features:
+                vectors[row, zlib.crc32(feature.encode("utf-8")) % self.dims] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceEmbedder:
+    """Multilingual sentence-transformers model (same one the retriever loads)"""
+
+    default_threshold = 0.92
+
+    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.name = model_name
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            [normalize_query(t) for t in texts],
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def default_embedder():
+    """
+    Embedder selected by KM_LLM_CACHE_EMBEDDER
+
+    "minilm" (default) uses sentence-transformers, falling back to "ngram"
+    when it is not installed or the model can't be loaded (offline, torch
+    errors).
+    """
+    if os.getenv("KM_LLM_CACHE_EMBEDDER", "minilm") == "minilm":
+        try:
+            return SentenceEmbedder()
+        except ImportError:
+            print("⚠️ sentence-transformers not installed, LLM cache uses n-gram embeddings")
+        except Exception as e:
+            print(f"⚠️ Could not load the MiniLM embedder ({e}), LLM cache uses n-gram embeddings")
+    return NgramEmbedder()
+
+
+class SemanticAnswerCache:
+    """
+    LLM answers keyed on (namespace, retrieved scheme IDs) + query embedding
+
+    Args:
+        embedder: Object with .name and .encode(texts) -> L2-normalized rows
+        threshold: Minimum cosine similarity for a hit (default: embedder's)
+        max_entries: LRU capacity
+        path: .npz file to persist to (None = memory only)
+        save_every: Persist after this many new answers (and at exit)
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        threshold: Optional[float] = None,
+        max_entries: int = 2048,
+        path: Optional[str] = None,
+        save_every: int = 20,
+    ):
+        self.embedder = embedder or default_embedder()
+        self.threshold = threshold if threshold is not None else self.embedder.default_threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+
+        self._lock = threading.Lock()
+        # entry id -> (bucket key, query, answer); order is LRU order
+        self._entries: "OrderedDict[int, Tuple[Tuple, str, str]]" = OrderedDict()
+        self._embeddings: Dict[int, np.ndarray] = {}
+        # bucket key -> entry ids; the stacked matrix is rebuilt lazily
+        self._buckets: Dict[Tuple, List[int]] = {}
+        self._matrices: Dict[Tuple, np.ndarray] = {}
+        self._next_id = 0
+        self._unsaved = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._hit_similarity = 0.0
+        self._lookup_seconds = 0.0
+
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def bucket_key(scheme_ids: Sequence[str], namespace: str = "") -> Tuple:
+        return (namespace, tuple(sorted(str(s) for s in scheme_ids)))
+
+    def embed(self, query: str) -> np.ndarray:
+        return self.embedder.encode([query])[0]
+
+    # Lookup / store
+
+    def lookup(
+        self,
+        query: str,
+        scheme_ids: Sequence[str],
+        namespace: str = "",
+        embedding: Optional[np.ndarray] = None
+    ) -> Optional[str]:
+        """Cached answer for a similar query with the same schemes, or None"""
+        started = time.perf_counter()
+        key = self.bucket_key(scheme_ids, namespace)
+        if embedding is None:
+            embedding = self.embed(query)
+
+        with self._lock:
+            answer, similarity = None, 0.0
+            ids = self._buckets.get(key)
+            if ids:
+                matrix = self._matrices.get(key)
+                if matrix is None:
+                    matrix = self._matrices[key] = np.stack([self._embeddings[i] for i in ids])
+                scores = matrix @ embedding
+                best = int(np.argmax(scores))
+                similarity = float(scores[best])
+                if similarity >= self.threshold:
+                    entry_id = ids[best]
+                    answer = self._entries[entry_id][2]
+                    self._entries.move_to_end(entry_id)
+
+            if answer is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._hit_similarity += similarity
+            self._lookup_seconds += time.perf_counter() - started
+            return answer
+
+    def store(
+        self,
+        query: str,
+        scheme_ids: Sequence[str],
+        answer: str,
+        namespace: str = "",
+        embedding: Optional[np.ndarray] = None
+    ):
+        if embedding is None:
+            embedding = self.embed(query)
+        key = self.bucket_key(scheme_ids, namespace)
+
+        with self._lock:
+            self._add(key, query, answer, np.asarray(embedding, dtype=np.float32))
+            self._unsaved += 1
+            save_now = self.path and self._unsaved >= self.save_every
+        if save_now:
+            self.save()
+
+    def _add(self, key: Tuple, query: str, answer: str, embedding: np.ndarray):
+        """Insert an entry and evict LRU entries (lock must be held)"""
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (key, query, answer)
+        self._embeddings[entry_id] = embedding
+        self._buckets.setdefault(key, []).append(entry_id)
+        self._matrices.pop(key, None)
+
+        while len(self._entries) > self.max_entries:
+            oldest, (old_key, _, _) = self._entries.popitem(last=False)
+            del self._embeddings[oldest]
+            self._buckets[old_key].remove(oldest)
+            if not self._buckets[old_key]:
+                del self._buckets[old_key]
+            self._matrices.pop(old_key, None)
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._embeddings.clear()
+            self._buckets.clear()
+            self._matrices.clear()
+
+    # Persistence
+
+    def save(self):
+        """Write all entries (in LRU order) to self.path atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            items = list(self._entries.items())
+            embeddings = np.stack([self._embeddings[i] for i, _ in items]) if items else np.zeros((0, 0), np.float32)
+            meta = {
+                "embedder": self.embedder.name,
+                "entries": [
+                    {"namespace": key[0], "scheme_ids": list(key[1]), "query": query, "answer": answer}
+                    for _, (key, query, answer) in items
+                ],
+            }
+            self._unsaved = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        try:
+            np.savez(tmp_path, embeddings=embeddings, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"❌ Could not save LLM answer cache: {e}")
+
+    def load(self):
+        """Load persisted entries (ignored if made with a different embedder)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                embeddings = data["embeddings"]
+        except Exception as e:
+            print(f"⚠️ Could not load LLM answer cache {self.path}: {e}")
+            return
+
+        if meta.get("embedder") != self.embedder.name:
+            print(f"⚠️ LLM answer cache was built with {meta.get('embedder')}, starting empty")
+            return
+
+        with self._lock:
+            for entry, embedding in zip(meta["entries"], embeddings):
+                key = (entry["namespace"], tuple(entry["scheme_ids"]))
+                self._add(key, entry["query"], entry["answer"], embedding)
+        print(f"✅ Loaded {len(self._entries)} cached LLM answers from {self.path}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "scheme_sets": len(self._buckets),
+                "embedder": self.embedder.name,
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "avg_hit_similarity": round(self._hit_similarity / self._hits, 4) if self._hits else None,
+                "avg_lookup_ms": round(self._lookup_seconds / lookups * 1000, 3) if lookups else None,
+                "evictions": self._evictions,
+                "path": self.path,
+            }
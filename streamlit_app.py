@@ -110,6 +110,10 @@ if "last_response" not in st.session_state:
 if "query_history" not in st.session_state:
     st.session_state.query_history = []
 
+if "schemes_cache" not in st.session_state:
+    # {"etag": ..., "schemes": [...]} from the last full catalog download
+    st.session_state.schemes_cache = None
+
 
 # Helper Functions
 
@@ -174,21 +178,60 @@ def send_audio_query(audio_file, language: Optional[str] = None) -> Dict:
     except Exception as e:
         return {"error": str(e)}
 
-def fetch_all_schemes() -> List[Dict]:
-    """Fetch all available schemes"""
+def fetch_all_schemes(page_size: int = 500) -> List[Dict]:
+    """
+    Fetch all available schemes
+    Pages through /schemes and revalidates with the catalog ETag, so an
+    unchanged catalog costs a single 304 instead of a full download.
+    """
+    cached = st.session_state.schemes_cache
     try:
-        response = requests.get(
-            f"{st.session_state.api_url}/schemes",
-            timeout=10
-        )
-        
-        if response.status_code == 200:
+        schemes = []
+        cursor = None
+        etag = None
+        
+        while True:
+            params = {
+                "limit": page_size,
+                "fields": "scheme_id,scheme_name,intent,official_url,required_fields"
+            }
+            headers = {}
+            if cursor:
+                params["cursor"] = cursor
+            elif cached:
+                headers["If-None-Match"] = cached["etag"]
+            
+            response = requests.get(
+                f"{st.session_state.api_url}/schemes",
+                params=params,
+                headers=headers,
+                timeout=10
+            )
+            
+            if response.status_code == 304 and cached:
+                return cached["schemes"]
+            if response.status_code != 200:
+                return cached["schemes"] if cached else []
+            
+            # Catalog changed between pages - start over
+            page_etag = response.headers.get("ETag")
+            if etag and page_etag != etag:
+                schemes, cursor, etag = [], None, None
+                cached = None
+                continue
+            etag = page_etag
+            
             data = response.json()
-            return data.get("schemes", [])
-        else:
-            return []
+            schemes.extend(data.get("schemes", []))
+            cursor = data.get("next_cursor")
+            if not cursor:
+                break
+        
+        if etag:
+            st.session_state.schemes_cache = {"etag": etag, "schemes": schemes}
+        return schemes
     except:
-        return []
+        return cached["schemes"] if cached else []
 
 def fetch_scheme_details(scheme_id: str) -> Optional[Dict]:
     """Fetch detailed information about a scheme"""
@@ -0,0 +1,469 @@
+"""
+Anonymized request trace capture for the FastAPI apps
+
+Enable with environment variables (see install_trace_capture):
+
+    KM_TRACE_CAPTURE=traces/main_app.jsonl uvicorn main_app:app
+
+Every request is written as one JSON line: timing, path, redacted query
+and form fields, hashed (optionally sampled) audio, response status,
+latency and a response fingerprint. Files rotate by size. Replay the
+traces with trace_replay.py.
+
+Privacy: caller identifiers are always pseudonymized (salted). Free text
+(queries, transcripts) is only length + salted hash by default; "redact"
+keeps the farmer's wording and masks only long numbers and emails, so
+names, villages and the like stay in the trace. Sampled audio is the
+caller's voice: it is off by default, written owner-readable only, and
+capped (oldest samples are deleted first).
+"""
+import email
+import hashlib
+import io
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import wave
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+
+# Fields that identify a caller; their values are pseudonymized
+PSEUDONYMIZED_FIELDS = {"From", "To", "Caller", "Called", "CallSid", "AccountSid", "RecordingSid", "phone"}
+
+# Fields whose values are dropped (replay substitutes local equivalents)
+DROPPED_FIELDS = {"RecordingUrl"}
+
+# Response keys kept in the output fingerprint (for replay diffs)
+SUMMARY_KEYS = (
+    "detected_language", "detected_intent", "detected_disaster", "farmer_age",
+    "total_schemes", "count", "status", "error",
+)
+
+_PHONE_OR_ID = re.compile(r"\+?\d[\d\s-]{5,}\d")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+
+
+def pseudonymize(value: str, salt: str) -> str:
+    return "anon_" + hashlib.sha256((salt + value).encode("utf-8")).hexdigest()[:12]
+
+
+def load_or_create_salt(path: str) -> str:
+    """
+    Random salt kept in a file next to the traces
+
+    Created on first use (owner-readable only) and reused afterwards, so
+    a caller gets the same pseudonym across restarts and rotated files.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            salt = f.read().strip()
+        if salt:
+            return salt
+    except FileNotFoundError:
+        pass
+    salt = secrets.token_hex(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(salt + "\n")
+    print(f" Trace salt created: {path}")
+    return salt
+
+
+def redact_text(text: str, mode: str, salt: str) -> Dict:
+    """
+    Redact free text
+
+    Modes:
+        redact  keep wording, mask phone/Aadhaar-like numbers and emails
+        hash    keep only length and a salted hash
+        keep    unchanged (local debugging only)
+    """
+    if mode == "keep":
+        return {"text": text}
+    if mode == "hash":
+        return {"text": None, "length": len(text), "sha256": pseudonymize(text, salt)}
+    masked = _EMAIL.sub("<email>", text)
+    masked = _PHONE_OR_ID.sub("<number>", masked)
+    return {"text": masked}
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            return round(wav.getnframes() / float(wav.getframerate()), 3)
+    except Exception:
+        return None
+
+
+class TraceWriter:
+    """
+    Background JSONL writer with size-based rotation
+
+    Args:
+        path: Trace JSONL file
+        max_bytes: Rotate once the file reaches this size
+        backups: Rotated files kept
+        build: Optional item -> record function, run on the writer thread
+        max_pending_bytes: Items are dropped while this many raw bytes are queued
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 50 * 1024 * 1024,
+        backups: int = 5,
+        build: Optional[Callable[[Dict], Dict]] = None,
+        max_pending_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.build = build
+        self.max_pending_bytes = max_pending_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._queue: "queue.Queue[Optional[Tuple[Dict, int]]]" = queue.Queue(maxsize=10000)
+        self._pending_bytes = 0
+        self._pending_lock = threading.Lock()
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, item: Dict, size: int = 0):
+        """Never blocks the request path; drops items when the queue is full"""
+        with self._pending_lock:
+            if self._pending_bytes + size > self.max_pending_bytes:
+                self.dropped += 1
+                return
+            self._pending_bytes += size
+        try:
+            self._queue.put_nowait((item, size))
+        except queue.Full:
+            with self._pending_lock:
+                self._pending_bytes -= size
+            self.dropped += 1
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        f = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                queued = self._queue.get()
+                if queued is None:
+                    break
+                item, size = queued
+                try:
+                    record = self.build(item) if self.build else item
+                except Exception as e:
+                    print(f" Trace capture error: {e}")
+                    continue
+                finally:
+                    with self._pending_lock:
+                        self._pending_bytes -= size
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    f.flush()
+                if f.tell() >= self.max_bytes:
+                    f.close()
+                    self._rotate()
+                    f = open(self.path, "a", encoding="utf-8")
+        finally:
+            f.close()
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class TraceCaptureMiddleware:
+    """
+    Pure ASGI middleware recording anonymized request/response metadata
+
+    The request only copies what it saw (scope fields, raw body, response
+    chunks) onto the writer's queue; parsing, hashing, sampling and
+    redaction happen on the writer thread, off the event loop.
+
+    Args:
+        app: ASGI app
+        path: Trace JSONL file
+        text_mode: "redact", "hash" or "keep" for query/form text
+        audio_sample_rate: Fraction of audio uploads stored (0 = hash only)
+        max_body_bytes: Bodies larger than this are fingerprinted, not parsed
+        salt: Salt for pseudonymized identifiers (default: a random salt
+            persisted in "<path>.salt"; capture never runs unsalted)
+        max_sample_bytes: Total size of stored audio samples
+        max_samples: Number of stored audio samples
+    """
+
+    def __init__(
+        self,
+        app,
+        path: str,
+        text_mode: str = "hash",
+        audio_sample_rate: float = 0.0,
+        max_body_bytes: int = 20 * 1024 * 1024,
+        salt: Optional[str] = None,
+        max_file_bytes: int = 50 * 1024 * 1024,
+        backups: int = 5,
+        max_sample_bytes: int = 200 * 1024 * 1024,
+        max_samples: int = 1000,
+    ):
+        self.app = app
+        self.text_mode = text_mode
+        self.audio_sample_rate = audio_sample_rate
+        self.max_body_bytes = max_body_bytes
+        self.writer = TraceWriter(path, max_bytes=max_file_bytes, backups=backups, build=self._build_record)
+        self.salt = salt or load_or_create_salt(self.writer.path + ".salt")
+        self.samples_dir = os.path.join(os.path.dirname(self.writer.path), "samples")
+        self.max_sample_bytes = max_sample_bytes
+        self.max_samples = max_samples
+        self._samples = self._scan_samples()  # path -> size, oldest first
+        self._rng = random.Random()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        wall_ts = time.time()
+        request_chunks: List[bytes] = []
+        request_size = 0
+        response = {"status": None, "chunks": [], "size": 0}
+
+        async def receive_wrapper():
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                request_size += len(body)
+                if request_size <= self.max_body_bytes:
+                    request_chunks.append(body)
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                response["size"] += len(body)
+                if response["size"] <= self.max_body_bytes:
+                    response["chunks"].append(body)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            latency = time.perf_counter() - started
+            self.writer.write({
+                "scope": {key: scope.get(key) for key in ("method", "path", "query_string", "headers")},
+                "wall_ts": wall_ts,
+                "latency": latency,
+                "body": request_chunks,
+                "body_size": request_size,
+                "response": response,
+            }, size=min(request_size, self.max_body_bytes) + min(response["size"], self.max_body_bytes))
+
+    # Record building (writer thread)
+
+    def _build_record(self, item: Dict) -> Dict:
+        scope, wall_ts, latency = item["scope"], item["wall_ts"], item["latency"]
+        body, body_size, response = b"".join(item["body"]), item["body_size"], item["response"]
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+        content_type = headers.get("content-type", "")
+
+        record = {
+            "ts": round(wall_ts, 6),
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "query": self._redact_fields(parse_qsl((scope.get("query_string") or b"").decode("latin-1"))),
+            "content_type": content_type.split(";")[0],
+            "body_size": body_size,
+            "status": response["status"],
+            "latency_ms": round(latency * 1000, 3),
+        }
+
+        if headers.get("if-none-match"):
+            record["if_none_match"] = headers["if-none-match"]
+
+        if body_size > len(body):
+            record["body_truncated"] = True
+        elif content_type.startswith("application/x-www-form-urlencoded"):
+            record["form"] = self._redact_fields(parse_qsl(body.decode("utf-8", "replace")))
+        elif content_type.startswith("multipart/form-data"):
+            record["form"], record["files"] = self._parse_multipart(content_type, body)
+        elif content_type.startswith("application/json") and body:
+            try:
+                record["json"] = self._redact_json(json.loads(body))
+            except ValueError:
+                record["body_sha256"] = hashlib.sha256(body).hexdigest()
+
+        record["response"] = self._fingerprint_response(response)
+        return record
+
+    def _redact_fields(self, pairs) -> Dict:
+        fields = {}
+        for key, value in pairs:
+            if key in DROPPED_FIELDS:
+                fields[key] = None
+            elif key in PSEUDONYMIZED_FIELDS:
+                fields[key] = pseudonymize(value, self.salt)
+            elif key in ("RecordingDuration", "Digits", "language", "stream", "limit", "offset", "cursor", "fields",
+                         "intent", "disaster", "age"):
+                fields[key] = value
+            else:
+                fields[key] = redact_text(value, self.text_mode, self.salt)
+        return fields
+
+    def _redact_json(self, data):
+        if isinstance(data, str):
+            return redact_text(data, self.text_mode, self.salt)
+        if isinstance(data, list):
+            return [self._redact_json(item) for item in data]
+        if isinstance(data, dict):
+            return {
+                key: (value if key == "language" else self._redact_json(value))
+                for key, value in data.items()
+            }
+        return data
+
+    def _parse_multipart(self, content_type: str, body: bytes):
+        form_pairs, files = [], []
+        message = email.message_from_bytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+        )
+        for part in message.get_payload() if message.is_multipart() else []:
+            name = part.get_param("name", header="content-disposition")
+            filename = part.get_filename()
+            payload = part.get_payload(decode=True) or b""
+            if filename is None:
+                form_pairs.append((name, payload.decode("utf-8", "replace")))
+                continue
+
+            digest = hashlib.sha256(payload).hexdigest()
+            entry = {
+                "field": name,
+                "extension": os.path.splitext(filename)[1].lower(),
+                "content_type": part.get_content_type(),
+                "size": len(payload),
+                "sha256": digest,
+                "duration": _wav_duration(payload),
+                "sample": None,
+            }
+            if self.audio_sample_rate and self._rng.random() < self.audio_sample_rate:
+                os.makedirs(self.samples_dir, exist_ok=True)
+                sample_path = os.path.join(self.samples_dir, digest + entry["extension"])
+                if not os.path.exists(sample_path):
+                    fd = os.open(sample_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(payload)
+                    self._samples[sample_path] = len(payload)
+                    self._prune_samples()
+                entry["sample"] = os.path.relpath(sample_path, os.path.dirname(self.writer.path))
+            files.append(entry)
+        return self._redact_fields(form_pairs), files
+
+    def _scan_samples(self) -> "OrderedDict[str, int]":
+        """Samples already on disk, oldest first"""
+        try:
+            paths = [os.path.join(self.samples_dir, name) for name in os.listdir(self.samples_dir)]
+        except FileNotFoundError:
+            return OrderedDict()
+        paths = sorted((p for p in paths if os.path.isfile(p)), key=os.path.getmtime)
+        return OrderedDict((p, os.path.getsize(p)) for p in paths)
+
+    def _prune_samples(self):
+        """Delete the oldest samples beyond max_samples / max_sample_bytes"""
+        total = sum(self._samples.values())
+        while self._samples and (len(self._samples) > self.max_samples or total > self.max_sample_bytes):
+            path, size = self._samples.popitem(last=False)
+            total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _fingerprint_response(self, response: Dict) -> Dict:
+        body = b"".join(response["chunks"])
+        fingerprint = {
+            "size": response["size"],
+            "sha256": hashlib.sha256(body).hexdigest() if response["size"] == len(body) else None,
+        }
+        summary = summarize_response(body)
+        if summary:
+            fingerprint["summary"] = summary
+        return fingerprint
+
+
+def summarize_response(body: bytes) -> Optional[Dict]:
+    """Stable, anonymized summary of a JSON response (used to diff replays)"""
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    summary = {key: data[key] for key in SUMMARY_KEYS if key in data and not isinstance(data[key], (dict, list))}
+    for key in ("eligible_schemes", "schemes"):
+        if isinstance(data.get(key), list):
+            summary[key] = [s.get("scheme_id") for s in data[key] if isinstance(s, dict)]
+    if isinstance(data.get("results"), list):
+        summary["results"] = [
+            summarize_response(json.dumps(item).encode("utf-8")) for item in data["results"]
+        ]
+    return summary
+
+
+def install_trace_capture(app) -> bool:
+    """
+    Add TraceCaptureMiddleware when KM_TRACE_CAPTURE is set
+
+    Environment:
+        KM_TRACE_CAPTURE            trace file path (unset = disabled)
+        KM_TRACE_TEXT_MODE          hash | redact | keep (default hash)
+        KM_TRACE_AUDIO_SAMPLE_RATE  fraction of audio stored (default 0)
+        KM_TRACE_SAMPLE_MAX_MB      total size of stored audio (default 200)
+        KM_TRACE_SAMPLE_MAX_FILES   number of stored audio files (default 1000)
+        KM_TRACE_SALT               salt for pseudonymized identifiers
+                                    (unset = random, kept in <trace file>.salt)
+    """
+    path = os.getenv("KM_TRACE_CAPTURE")
+    if not path:
+        return False
+
+    app.add_middleware(
+        TraceCaptureMiddleware,
+        path=path,
+        text_mode=os.getenv("KM_TRACE_TEXT_MODE", "hash"),
+        audio_sample_rate=float(os.getenv("KM_TRACE_AUDIO_SAMPLE_RATE", "0")),
+        max_sample_bytes=int(float(os.getenv("KM_TRACE_SAMPLE_MAX_MB", "200")) * 1024 * 1024),
+        max_samples=int(os.getenv("KM_TRACE_SAMPLE_MAX_FILES", "1000")),
+        salt=os.getenv("KM_TRACE_SALT") or None,
+    )
+    print(f" Trace capture enabled: {path}")
+    return True
+
+
+def decode_sample(record_dir: str, entry: Dict) -> Optional[bytes]:
+    """Stored audio for a captured file entry, if it was sampled"""
+    if not entry.get("sample"):
+        return None
+    try:
+        with open(os.path.join(record_dir, entry["sample"]), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
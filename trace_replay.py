@@ -0,0 +1,255 @@
+"""
+Replay captured traffic (trace_capture.py) against any build
+
+    python trace_replay.py traces/main_app.jsonl --url http://localhost:8000
+    python trace_replay.py traces/main_app.jsonl* --speed 4      # 4x faster than captured
+    python trace_replay.py traces/main_app.jsonl --speed 0       # back-to-back, no pacing
+
+Requests are re-issued at their captured offsets (divided by --speed).
+Redacted text is replayed as captured; hash-only text is replaced by a
+synthetic query. Audio uses the stored sample when one was captured,
+otherwise a WAV of the captured duration. Twilio recording URLs point at
+a local recording server.
+
+Reports latency per endpoint (captured vs replayed) and output diffs
+(status, response fingerprint and summary).
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from backends import make_wav_bytes
+from benchmarks.generators import generate_queries
+from loadtest import RecordingServer, _percentile
+from trace_capture import decode_sample, summarize_response
+
+
+def load_traces(patterns: List[str]) -> List[Dict]:
+    """All records from the given files (rotated backups included), oldest first"""
+    records = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            record_dir = os.path.dirname(os.path.abspath(path))
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Partially written line
+                    record["_dir"] = record_dir
+                    records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def _seed(value: str) -> int:
+    return int(hashlib.sha256(value.encode("utf-8")).hexdigest()[:8], 16)
+
+
+class Replayer:
+    def __init__(self, records: List[Dict], args):
+        self.records = records
+        self.args = args
+        self.synthetic_queries = generate_queries(200, seed=args.seed)
+        self.recordings = RecordingServer([])
+        self.results: List[Dict] = []
+
+    # Request reconstruction
+
+    def _text(self, value) -> str:
+        """Captured text field back to a string"""
+        if not isinstance(value, dict):
+            return value
+        if value.get("text") is not None:
+            return value["text"]
+        key = value.get("sha256") or ""
+        return self.synthetic_queries[_seed(key) % len(self.synthetic_queries)]
+
+    def _fields(self, fields: Optional[Dict]) -> Dict:
+        return {key: self._text(value) for key, value in (fields or {}).items() if value is not None}
+
+    def _json(self, data):
+        if isinstance(data, dict) and set(data) <= {"text", "length", "sha256"} and "text" in data:
+            return self._text(data)
+        if isinstance(data, list):
+            return [self._json(item) for item in data]
+        if isinstance(data, dict):
+            return {key: self._json(value) for key, value in data.items()}
+        return data
+
+    def _audio(self, record: Dict, entry: Dict) -> bytes:
+        sample = decode_sample(record["_dir"], entry)
+        if sample is not None:
+            return sample
+        duration = entry.get("duration") or max(1.0, entry.get("size", 0) / 32000)
+        return make_wav_bytes(duration, seed=_seed(entry.get("sha256", "")))
+
+    def build_request(self, record: Dict) -> Dict:
+        request = {"method": record["method"], "url": record["path"], "params": self._fields(record.get("query"))}
+        if record.get("if_none_match"):
+            request["headers"] = {"If-None-Match": record["if_none_match"]}
+
+        form = record.get("form")
+        if record.get("files") is not None:
+            request["data"] = self._fields(form)
+            request["files"] = {
+                entry["field"]: (f"replay{entry['extension']}", self._audio(record, entry), entry["content_type"])
+                for entry in record["files"]
+            }
+        elif form is not None:
+            data = self._fields(form)
+            if "RecordingUrl" in form:
+                duration = float(form.get("RecordingDuration") or 3)
+                self.recordings.recordings.append(
+                    make_wav_bytes(duration, sample_rate=8000, seed=_seed(data.get("CallSid", "")))
+                )
+                data["RecordingUrl"] = self.recordings.url(len(self.recordings.recordings) - 1)
+            request["data"] = data
+        elif "json" in record:
+            request["json"] = self._json(record["json"])
+        return request
+
+    # Replay
+
+    async def _send(self, client: httpx.AsyncClient, record: Dict):
+        request = self.build_request(record)
+        started = time.perf_counter()
+        status, body, error = None, b"", None
+        try:
+            response = await client.request(**request)
+            status, body = response.status_code, response.content
+        except Exception as e:
+            error = str(e)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        self.results.append({
+            "record": record,
+            "status": status,
+            "error": error,
+            "latency_ms": latency_ms,
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "summary": summarize_response(body),
+        })
+
+    async def run(self):
+        args = self.args
+        await self.recordings.start()
+        limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=httpx.Timeout(args.timeout)) as client:
+            started = time.perf_counter()
+            if args.speed <= 0:
+                for record in self.records:
+                    await self._send(client, record)
+            else:
+                first_ts = self.records[0]["ts"]
+                tasks = []
+                for record in self.records:
+                    offset = (record["ts"] - first_ts) / args.speed
+                    await asyncio.sleep(max(0.0, started + offset - time.perf_counter()))
+                    tasks.append(asyncio.create_task(self._send(client, record)))
+                await asyncio.gather(*tasks)
+            wall = time.perf_counter() - started
+
+        await self.recordings.stop()
+        return wall
+
+
+def build_report(results: List[Dict], wall: float, max_diffs: int) -> Dict:
+    endpoints: Dict[str, Dict] = {}
+    diffs = []
+
+    for result in results:
+        record = result["record"]
+        name = f"{record['method']} {record['path']}"
+        ep = endpoints.setdefault(name, {"captured": [], "replayed": [], "status_diff": 0, "body_diff": 0,
+                                         "summary_diff": 0, "errors": 0})
+        ep["captured"].append(record["latency_ms"])
+        ep["replayed"].append(result["latency_ms"])
+        if result["error"]:
+            ep["errors"] += 1
+
+        captured = record.get("response", {})
+        problems = []
+        if result["status"] != record["status"]:
+            ep["status_diff"] += 1
+            problems.append(f"status {record['status']} -> {result['status']}")
+        if captured.get("sha256") and captured["sha256"] != result["sha256"]:
+            ep["body_diff"] += 1
+        if captured.get("summary") is not None and captured["summary"] != result["summary"]:
+            ep["summary_diff"] += 1
+            problems.append(f"summary {captured['summary']} -> {result['summary']}")
+        if problems and len(diffs) < max_diffs:
+            diffs.append({"endpoint": name, "ts": record["ts"], "diff": problems})
+
+    report = {"wall_seconds": round(wall, 2), "requests": len(results), "endpoints": {}, "diffs": diffs}
+    for name, ep in sorted(endpoints.items()):
+        captured, replayed = sorted(ep["captured"]), sorted(ep["replayed"])
+        report["endpoints"][name] = {
+            "requests": len(replayed),
+            "errors": ep["errors"],
+            "status_diff": ep["status_diff"],
+            "body_diff": ep["body_diff"],
+            "summary_diff": ep["summary_diff"],
+            **{f"captured_p{p}_ms": round(_percentile(captured, p), 1) for p in (50, 95, 99)},
+            **{f"replayed_p{p}_ms": round(_percentile(replayed, p), 1) for p in (50, 95, 99)},
+        }
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n Replayed {report['requests']} requests in {report['wall_seconds']}s")
+    print(f" {'endpoint':<34}{'reqs':>6}{'p50 cap/new':>16}{'p95 cap/new':>16}{'p99 cap/new':>16}"
+          f"{'status':>8}{'body':>6}{'summ':>6}")
+    for name, r in report["endpoints"].items():
+        print(
+            f" {name:<34}{r['requests']:>6}"
+            + "".join(f"{r[f'captured_p{p}_ms']:>8.0f}/{r[f'replayed_p{p}_ms']:<7.0f}" for p in (50, 95, 99))
+            + f"{r['status_diff']:>8}{r['body_diff']:>6}{r['summary_diff']:>6}"
+        )
+    for diff in report["diffs"]:
+        print(f" ⚠️ {diff['endpoint']} @ {diff['ts']}: {'; '.join(diff['diff'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured Kisaan Mitra traffic")
+    parser.add_argument("traces", nargs="+", help="Trace files or glob patterns")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Timing scale (2 = twice as fast, 0 = sequential without pacing)")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N records")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Connection pool size")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout (s)")
+    parser.add_argument("--max-diffs", type=int, default=20, help="Output diffs to list")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for synthetic stand-in queries")
+    parser.add_argument("-o", "--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    records = load_traces(args.traces)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit("No trace records found")
+
+    replayer = Replayer(records, args)
+    wall = asyncio.run(replayer.run())
+    report = build_report(replayer.results, wall, args.max_diffs)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), **report}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()